@@ -0,0 +1,149 @@
+import sqlite3
+from datetime import date, timedelta
+
+import numpy as np
+
+import db
+
+HOURS = 24
+WEEKDAYS = ["Пн", "Вт", "Ср", "Чт", "Пт", "Сб", "Вс"]
+
+
+class Cube:
+    """Секунды за диапазон дат в виде массива дни × часы × категории"""
+    def __init__(self, first: date, data: np.ndarray, categories: list[str]):
+        self.first = first
+        self.data = data
+        self.categories = categories
+
+    @property
+    def days(self) -> np.ndarray:
+        start = np.datetime64(self.first, "D")
+        return np.arange(start, start + len(self.data))
+
+
+def key_to_day(keys: np.ndarray) -> np.ndarray:
+    """Числа YYYYMMDD -> datetime64[D]"""
+    months = (keys // 10000 - 1970) * 12 + keys // 100 % 100 - 1
+    return months.astype("datetime64[M]").astype("datetime64[D]") + (keys % 100 - 1)
+
+
+def load_categories(con: sqlite3.Connection) -> tuple[list[str], np.ndarray]:
+    """Названия категорий и массив id -> индекс по оси категорий"""
+    rows = con.execute("SELECT id, name FROM categories ORDER BY id").fetchall()
+    index = np.zeros(rows[-1][0] + 1 if rows else 1, dtype=np.int64)
+    for i, (category_id, _) in enumerate(rows):
+        index[category_id] = i
+    return [name for _, name in rows], index
+
+
+def load_rows(con: sqlite3.Connection, date_from: date, date_to: date) -> np.ndarray:
+    rows = con.execute("""
+        SELECT date, hour, category_id, seconds
+        FROM track_hours
+        WHERE date BETWEEN ? AND ?
+    """, (db.date_key(date_from.isoformat()), db.date_key(date_to.isoformat()))).fetchall()
+    return np.array(rows, dtype=np.int64).reshape(-1, 4)
+
+
+def fill(data: np.ndarray, first: date, rows: np.ndarray, category_index: np.ndarray):
+    day = (key_to_day(rows[:, 0]) - np.datetime64(first, "D")).astype(np.int64)
+    flat = np.ravel_multi_index((day, rows[:, 1], category_index[rows[:, 2]]), data.shape)
+    data += np.bincount(flat, weights=rows[:, 3], minlength=data.size).astype(np.int64).reshape(data.shape)
+
+
+def load_cube(con: sqlite3.Connection, date_from: date, date_to: date) -> Cube:
+    categories, category_index = load_categories(con)
+    data = np.zeros(((date_to - date_from).days + 1, HOURS, len(categories)), dtype=np.int64)
+    fill(data, date_from, load_rows(con, date_from, date_to), category_index)
+    return Cube(date_from, data, categories)
+
+
+class Analytics:
+    """
+    Кэш куба за последние days дней между обновлениями GUI.
+    Закрытые дни загружаются один раз и перечитываются, только если изменились
+    их количество строк и сумма секунд или список категорий;
+    на каждом обновлении из базы читается только сегодняшний день.
+    """
+    def __init__(self, days: int = 365):
+        self.days = days
+        self._cube: Cube | None = None
+        self._key = None
+
+    def cube(self, con: sqlite3.Connection, today: date = None) -> Cube:
+        today = today or date.today()
+        first = today - timedelta(days=self.days - 1)
+        categories, category_index = load_categories(con)
+        signature = con.execute("""
+            SELECT COUNT(*), TOTAL(seconds) FROM track_hours WHERE date BETWEEN ? AND ?
+        """, (db.date_key(first.isoformat()), db.date_key((today - timedelta(1)).isoformat()))).fetchone()
+        key = (first, tuple(categories), signature)
+
+        if self._cube is None or key != self._key:
+            self._cube = load_cube(con, first, today)
+            self._key = key
+        else:
+            self._cube.data[-1] = 0
+            fill(self._cube.data, first, load_rows(con, today, today), category_index)
+        return self._cube
+
+
+def daily(cube: Cube) -> np.ndarray:
+    """Секунды по дням и категориям: дни × категории"""
+    return cube.data.sum(axis=1)
+
+
+def trend(cube: Cube, period: str = "week") -> tuple[np.ndarray, np.ndarray]:
+    """
+    Суммы по неделям ("week") или месяцам ("month"):
+    (начала периодов, периоды × категории)
+    """
+    days = cube.days
+    if period == "week":
+        # 1970-01-01 - четверг, сдвиг приводит к началу недели с понедельника
+        starts = days - (days.astype(np.int64) + 3) % 7
+    else:
+        starts = days.astype("datetime64[M]").astype("datetime64[D]")
+    labels, inverse = np.unique(starts, return_inverse=True)
+    sums = np.zeros((len(labels), len(cube.categories)), dtype=np.int64)
+    np.add.at(sums, inverse, daily(cube))
+    return labels, sums
+
+
+def rolling_mean(cube: Cube, window: int = 7) -> np.ndarray:
+    """Скользящее среднее по дням за window дней: дни × категории"""
+    totals = np.cumsum(daily(cube), axis=0, dtype=np.float64)
+    shifted = np.zeros_like(totals)
+    shifted[window:] = totals[:-window]
+    counts = np.minimum(np.arange(1, len(totals) + 1), window)[:, None]
+    return (totals - shifted) / counts
+
+
+def heatmap(cube: Cube, categories: list[str] = None) -> np.ndarray:
+    """Среднее время в секундах по дням недели и часам: 7 × 24"""
+    data = cube.data
+    if categories is not None:
+        data = data[..., [cube.categories.index(name) for name in categories]]
+    weekdays = (cube.days.astype(np.int64) + 3) % 7
+    sums = np.zeros((7, HOURS))
+    np.add.at(sums, weekdays, data.sum(axis=2))
+    counts = np.bincount(weekdays, minlength=7)[:, None]
+    return sums / np.maximum(counts, 1)
+
+
+def streaks(cube: Cube, min_seconds: int = 60) -> dict[str, tuple[int, int]]:
+    """
+    Серии дней подряд, в которые категории уделено не меньше min_seconds:
+    {категория: (текущая серия, самая длинная)}.
+    Ещё не начатый сегодняшний день текущую серию не прерывает.
+    """
+    active = daily(cube) >= min_seconds
+    total = np.cumsum(active, axis=0)
+    # Накопленная сумма минус её значение на последнем неактивном дне - длина серии
+    run = total - np.maximum.accumulate(np.where(active, 0, total), axis=0)
+    longest = run.max(axis=0, initial=0)
+    current = run[-1] if len(run) else np.zeros(len(cube.categories), dtype=np.int64)
+    if len(run) > 1:
+        current = np.where(active[-1], run[-1], run[-2])
+    return {name: (int(current[i]), int(longest[i])) for i, name in enumerate(cube.categories)}
@@ -0,0 +1,4 @@
+"""
+Воспроизводимые замеры производительности трекера и панели статистики.
+Запуск из корня репозитория: python -m benchmarks --help
+"""
@@ -0,0 +1,120 @@
+import argparse
+import json
+import os
+import platform
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+from benchmarks import generate
+
+# Метрики, по которым ищутся регрессии: медиана и p95 времени, пропускная способность
+LOWER_IS_BETTER = ("p50_ms", "p95_ms")
+HIGHER_IS_BETTER = ("_per_s",)
+
+
+def metrics(results: dict, prefix: str = ""):
+    """Плоский обход вложенных результатов: (путь, имя метрики, значение)"""
+    for key, value in results.items():
+        if isinstance(value, dict):
+            yield from metrics(value, f"{prefix}{key}.")
+        elif isinstance(value, (int, float)):
+            yield prefix + key, key, value
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list[str]:
+    """Регрессии относительно baseline: время выросло или пропускная способность упала больше чем на tolerance"""
+    old = {path: value for path, _, value in metrics(baseline)}
+    regressions = []
+    for path, name, value in metrics(results):
+        base = old.get(path)
+        if not base:
+            continue
+        if name in LOWER_IS_BETTER and value > base * (1 + tolerance):
+            regressions.append(f"{path}: {base:.3f} -> {value:.3f}")
+        elif name.endswith(HIGHER_IS_BETTER) and value < base * (1 - tolerance):
+            regressions.append(f"{path}: {base:.1f} -> {value:.1f}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Замеры производительности трекера и панели статистики")
+    parser.add_argument("--scenario", action="append", dest="scenarios",
+                        help="tick, loop, queries, charts, export; по умолчанию все")
+    parser.add_argument("--workdir", help="каталог для баз прогона; по умолчанию временный")
+    parser.add_argument("--history", help="готовая база истории вместо генерации")
+    parser.add_argument("--days", type=int, default=3 * 365)
+    parser.add_argument("--titles", type=int, default=500)
+    parser.add_argument("--categories", type=int, default=12)
+    parser.add_argument("--skew", type=float, default=1.2)
+    parser.add_argument("--ticks", type=int, default=20000, help="кадров окон на сценарий трекера")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", default="bench.json")
+    parser.add_argument("--baseline", help="результаты прошлого прогона для сравнения")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    args = parser.parse_args()
+
+    cwd = os.getcwd()
+    out = os.path.abspath(args.out)
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+    history = os.path.abspath(args.history) if args.history else None
+    workdir = os.path.abspath(args.workdir) if args.workdir else tempfile.mkdtemp(prefix="tracker-bench-")
+    os.makedirs(workdir, exist_ok=True)
+    if os.path.exists("config.json"):
+        shutil.copy("config.json", os.path.join(workdir, "config.json"))
+    os.chdir(workdir)
+    # Модули трекера читают config.json и track.db из текущего каталога при импорте
+    from benchmarks import scenarios
+
+    try:
+        results = {}
+        if not history:
+            history = os.path.join(workdir, "history.db")
+            if os.path.exists(history):
+                os.remove(history)
+            results["generate"] = generated = generate.generate(
+                history, args.days, args.titles, args.categories, args.skew, seed=args.seed)
+            generated["rows_per_s"] = generated["rows"] / generated["elapsed_s"]
+
+        setup = scenarios.Setup(history, args.ticks, args.repeat, args.seed)
+        for name in args.scenarios or list(scenarios.SCENARIOS):
+            print(f"{name}...", end=" ", flush=True)
+            started = time.perf_counter()
+            results[name] = scenarios.SCENARIOS[name](setup)
+            print(f"{time.perf_counter() - started:.1f} с")
+    finally:
+        os.chdir(cwd)
+        if not args.workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        "meta": {
+            "created": datetime.now().isoformat(timespec="seconds"),
+            "python": sys.version.split()[0],
+            "sqlite": sqlite3.sqlite_version,
+            "platform": platform.platform(),
+            "params": vars(args),
+        },
+        "results": results,
+    }
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"Результаты записаны в {out}")
+
+    if baseline:
+        regressions = compare(results, baseline["results"], args.tolerance)
+        for line in regressions:
+            print(f"Регрессия {line}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+import argparse
+import random
+from datetime import datetime
+from typing import Iterator
+
+import window_sources
+from categorizer import WindowInfo, ProcessInfo
+from window_sources import FAKE_PID, ReplayWindowSource, SYNTHETIC_APPS
+
+Frames = Iterator[tuple[WindowInfo | None, float]]
+
+
+def window(title: str, process_name: str, index: int) -> WindowInfo:
+    return WindowInfo(title, ProcessInfo(FAKE_PID + index, process_name, f"C:\\Apps\\{process_name}"))
+
+
+def _zipf_app(rng: random.Random, skew: float = 1.2) -> int:
+    weights = [1 / (rank + 1) ** skew for rank in range(len(SYNTHETIC_APPS))]
+    return rng.choices(range(len(SYNTHETIC_APPS)), weights)[0]
+
+
+def steady(count: int, seed: int = 0) -> Frames:
+    """Обычная работа: несколько приложений, переключение в среднем раз в минуту"""
+    rng = random.Random(seed)
+    for _ in range(count):
+        index = _zipf_app(rng)
+        yield window(*SYNTHETIC_APPS[index], index), max(1, round(rng.expovariate(1 / 60)))
+
+
+def churn(count: int, seed: int = 0) -> Frames:
+    """Частое переключение окон: каждый тик - новый отрезок"""
+    rng = random.Random(seed)
+    for _ in range(count):
+        index = _zipf_app(rng)
+        yield window(*SYNTHETIC_APPS[index], index), rng.randint(1, 3)
+
+
+def tabs(count: int, seed: int = 0) -> Frames:
+    """Браузер с множеством разных заголовков: промахи кэша категорий и новые приложения"""
+    rng = random.Random(seed)
+    pages = max(1, count // 4)
+    for _ in range(count):
+        page = rng.randrange(pages)
+        yield window(f"Страница {page} - Google Chrome", "chrome.exe", 0), rng.randint(2, 30)
+
+
+def idle(count: int, seed: int = 0) -> Frames:
+    """Работа с перерывами: примерно каждый пятый кадр - без активного окна"""
+    rng = random.Random(seed)
+    for _ in range(count):
+        if rng.random() < 0.2:
+            yield None, rng.randint(60, 900)
+        else:
+            index = _zipf_app(rng)
+            yield window(*SYNTHETIC_APPS[index], index), max(1, round(rng.expovariate(1 / 60)))
+
+
+FEEDS = {
+    "steady": steady,
+    "churn": churn,
+    "tabs": tabs,
+    "idle": idle,
+}
+
+
+def source(name: str, count: int, seed: int = 0, start: datetime = None) -> ReplayWindowSource:
+    """Источник окон для main.main() с виртуальным временем"""
+    return ReplayWindowSource(FEEDS[name](count, seed), start=start or datetime.now())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Запись сценария окон в файл для window_source.backend = replay")
+    parser.add_argument("feed", choices=list(FEEDS))
+    parser.add_argument("--count", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", default="frames.jsonl")
+    args = parser.parse_args()
+
+    window_sources.write_frames(args.out, FEEDS[args.feed](args.count, args.seed))
@@ -0,0 +1,139 @@
+import argparse
+import time
+from datetime import date, timedelta
+
+import numpy as np
+
+import db
+
+
+def zipf_weights(count: int, skew: float) -> np.ndarray:
+    weights = 1 / np.arange(1, count + 1) ** skew
+    return weights / weights.sum()
+
+
+def hour_profile() -> np.ndarray:
+    """Доля дневного времени по часам: активность с 8 до 23 с пиком после обеда"""
+    hours = np.arange(24)
+    profile = np.where((hours >= 8) & (hours <= 23), np.exp(-((hours - 14) / 5) ** 2), 0)
+    return profile / profile.sum()
+
+
+def intern_all(con, table: str, column: str, names: list[str], extra: dict = None) -> np.ndarray:
+    """Добавляет недостающие строки справочника, возвращает их id в порядке names"""
+    if extra:
+        con.executemany(f"INSERT INTO {table} ({column}, process_name) VALUES (?, ?) ON CONFLICT DO NOTHING",
+                        [(name, extra[name]) for name in names])
+    else:
+        con.executemany(f"INSERT INTO {table} ({column}) VALUES (?) ON CONFLICT DO NOTHING",
+                        [(name,) for name in names])
+    ids = dict(con.execute(f"SELECT {column}, id FROM {table}"))
+    return np.array([ids[name] for name in names], dtype=np.int64)
+
+
+def generate(path: str, days: int = 3 * 365, titles: int = 500, categories: int = 12,
+             skew: float = 1.2, apps_per_day: int = 40, seconds_per_day: int = 8 * 3600,
+             end: date = None, seed: int = 0) -> dict:
+    """
+    Заполняет базу path синтетической историей за days дней по end включительно:
+    track_days и track_hours, сводные таблицы пересчитываются в конце.
+    Популярность приложений распределена по Ципфу с параметром skew,
+    приложение i относится к категории i % categories. Результат зависит только от параметров и seed.
+    Существующие строки за те же дни дополняются.
+    """
+    started = time.perf_counter()
+    rng = np.random.default_rng(seed)
+    end = end or date.today()
+    first = end - timedelta(days=days - 1)
+    active = min(apps_per_day, titles)
+
+    # Выбор active приложений на день без повторов, с весами (Gumbel top-k)
+    keys = np.log(zipf_weights(titles, skew)) + rng.gumbel(size=(days, titles))
+    chosen = np.argpartition(-keys, active - 1, axis=1)[:, :active]
+    shares = zipf_weights(titles, skew)[chosen] * rng.lognormal(0, 0.5, size=chosen.shape)
+    weekdays = (np.arange(days) + first.weekday()) % 7
+    day_seconds = seconds_per_day * rng.uniform(0.5, 1.2, size=days) * np.where(weekdays >= 5, 0.6, 1)
+    seconds = np.floor(shares / shares.sum(axis=1, keepdims=True) * day_seconds[:, None]).astype(np.int64)
+
+    date_keys = np.array([db.date_key((first + timedelta(d)).isoformat()) for d in range(days)])
+    last_updated = [f"{db.date_str(int(key))} 23:59:59" for key in date_keys]
+    title_names = [f"App {i:04d}" for i in range(titles)]
+    category_names = [f"Category {i:02d}" for i in range(categories)]
+
+    # Часовые корзины: секунды категории за день по профилю, остаток - в час пика
+    category_of = np.arange(titles) % categories
+    per_category = np.zeros((days, categories), dtype=np.int64)
+    np.add.at(per_category, (np.repeat(np.arange(days), active), category_of[chosen].ravel()), seconds.ravel())
+    profile = hour_profile()
+    hours = np.floor(per_category[:, :, None] * profile).astype(np.int64)
+    hours[:, :, 14] += per_category - hours.sum(axis=2)
+
+    con = db.connect(path)
+    try:
+        db.ensure_schema(con)
+        app_ids = intern_all(con, "apps", "title", title_names,
+                             {name: f"app{i}" for i, name in enumerate(title_names)})
+        category_ids = intern_all(con, "categories", "name", category_names)
+        con.commit()
+
+        day_index, slot = np.nonzero(seconds)
+        track_rows = [
+            (int(app_ids[a]), int(date_keys[d]), int(category_ids[category_of[a]]), int(s), last_updated[d])
+            for d, a, s in zip(day_index, chosen[day_index, slot], seconds[day_index, slot])
+        ]
+        day_index, category_index, hour = np.nonzero(hours)
+        hour_rows = [
+            (int(date_keys[d]), int(h), int(category_ids[c]), int(s))
+            for d, c, h, s in zip(day_index, category_index, hour, hours[day_index, category_index, hour])
+        ]
+
+        # Построчные триггеры сводных таблиц заменяются одним пересчётом
+        con.execute("BEGIN IMMEDIATE")
+        try:
+            for trigger in db.ROLLUP_TRIGGERS:
+                con.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+            con.executemany("""
+                INSERT INTO track_days (app_id, date, category_id, seconds, last_updated)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT(app_id, date) DO UPDATE SET seconds = seconds + excluded.seconds
+            """, track_rows)
+            con.executemany("""
+                INSERT INTO track_hours (date, hour, category_id, seconds) VALUES (?, ?, ?, ?)
+                ON CONFLICT(date, hour, category_id) DO UPDATE SET seconds = seconds + excluded.seconds
+            """, hour_rows)
+            for statement in db.rollup_triggers():
+                con.execute(statement)
+            con.commit()
+        except BaseException:
+            con.rollback()
+            raise
+        db.rebuild_rollups(con)
+    finally:
+        con.close()
+
+    return {
+        "days": days,
+        "titles": titles,
+        "categories": categories,
+        "rows": len(track_rows),
+        "hour_rows": len(hour_rows),
+        "seconds": int(seconds.sum()),
+        "elapsed_s": time.perf_counter() - started,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Синтетическая история для track.db")
+    parser.add_argument("--db", default="bench.db")
+    parser.add_argument("--days", type=int, default=3 * 365)
+    parser.add_argument("--titles", type=int, default=500)
+    parser.add_argument("--categories", type=int, default=12)
+    parser.add_argument("--skew", type=float, default=1.2)
+    parser.add_argument("--apps-per-day", type=int, default=40)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    result = generate(args.db, args.days, args.titles, args.categories, args.skew,
+                      args.apps_per_day, seed=args.seed)
+    print(f"{result['rows']} строк track_days, {result['hour_rows']} строк track_hours "
+          f"за {result['elapsed_s']:.1f} с")
@@ -0,0 +1,206 @@
+import os
+import time
+from datetime import datetime, timedelta
+
+import matplotlib
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+import numpy as np
+
+import analytics
+import charts
+import csv_export
+import db
+import main
+import stats
+from benchmarks import feeds
+
+MODE_KEYS = {stats.MODE_ALL: "all", stats.MODE_TODAY: "today", stats.MODE_YESTERDAY: "yesterday"}
+
+
+class Setup:
+    """
+    Параметры прогона: history - база с синтетической историей.
+    Трекер пишет в db.DB_PATH текущего каталога, как и при обычном запуске.
+    """
+    def __init__(self, history: str, ticks: int = 20000, repeat: int = 20, seed: int = 0):
+        self.history = history
+        self.ticks = ticks
+        self.repeat = repeat
+        self.seed = seed
+
+
+def summarize(samples: list[float]) -> dict:
+    """Длительности в секундах -> миллисекунды: среднее и перцентили"""
+    ms = np.asarray(samples) * 1000
+    p50, p95, p99 = np.percentile(ms, [50, 95, 99])
+    return {
+        "count": len(ms),
+        "mean_ms": float(ms.mean()),
+        "p50_ms": float(p50),
+        "p95_ms": float(p95),
+        "p99_ms": float(p99),
+        "max_ms": float(ms.max()),
+    }
+
+
+def measure(fn, repeat: int) -> list[float]:
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+def tick(setup: Setup) -> dict:
+    """
+    Задержка одного тика трекера по каждому сценарию окон:
+    categorize + handle_restrictions + SessionLog.add со сбросом по порогу записей.
+    Сброс по интервалу ставит на колесо таймеров цикл трекера, здесь запись зависит только от max_entries.
+    """
+    results = {}
+    log = main.SessionLog(
+        db.writer(),
+        flush_interval=main.storage_cfg.get("flush_interval_seconds", 30),
+        max_entries=main.storage_cfg.get("flush_max_entries", 64)
+    )
+    for name, feed in feeds.FEEDS.items():
+        now = datetime.now()
+        samples = []
+        started = time.perf_counter()
+        for window, seconds in feed(setup.ticks, setup.seed):
+            now += timedelta(seconds=seconds)
+            day = now.date().isoformat()
+            tick_started = time.perf_counter()
+            if window:
+                category = main.categorize(window)
+                main.handle_restrictions(category, day)
+                log.add(category, day, seconds, now)
+            else:
+                log.close_span()
+            log.flush_if_due()
+            samples.append(time.perf_counter() - tick_started)
+        flush_started = time.perf_counter()
+        log.flush(wait=True)
+        finished = time.perf_counter()
+        results[name] = summarize(samples) | {
+            "ticks_per_s": len(samples) / (finished - started),
+            "flush_ms": (finished - flush_started) * 1000,
+        }
+    return results
+
+
+def loop(setup: Setup) -> dict:
+    """Полный цикл main.main() на воспроизводимом источнике, включая планировщик, сброс и перенос"""
+    results = {}
+    for name in ("steady", "churn"):
+        source = feeds.source(name, setup.ticks, setup.seed)
+        started = time.perf_counter()
+        main.main(source)
+        elapsed = time.perf_counter() - started
+        results[name] = {
+            "elapsed_ms": elapsed * 1000,
+            "frames_per_s": setup.ticks / elapsed,
+            "virtual_hours_per_s": source.monotonic() / 3600 / elapsed,
+        }
+    return results
+
+
+def queries(setup: Setup) -> dict:
+    """
+    Запросы одного обновления панели: статистика по режимам без кэша и через прогретый
+    stats.QueryCache (закрытые дни из памяти, с диска - только сегодняшний день), и аналитика
+    """
+    results = {}
+    con = db.connect_readonly(setup.history)
+    try:
+        cache = stats.QueryCache()
+        for mode, key in MODE_KEYS.items():
+            day = stats.mode_day(mode)
+            results[f"query_{key}"] = summarize(measure(lambda: stats.query_stats(con, mode, day), setup.repeat))
+            cache.query(con, mode, day)
+            results[f"cached_{key}"] = summarize(measure(lambda: cache.query(con, mode, day), setup.repeat))
+
+        results["cube_cold"] = summarize(measure(lambda: analytics.Analytics().cube(con), setup.repeat))
+        cached = analytics.Analytics()
+        cube = cached.cube(con)
+        results["cube_warm"] = summarize(measure(lambda: cached.cube(con), setup.repeat))
+        results["heatmap"] = summarize(measure(lambda: analytics.heatmap(cube), setup.repeat))
+        results["streaks"] = summarize(measure(lambda: analytics.streaks(cube), setup.repeat))
+    finally:
+        con.close()
+    return results
+
+
+def _chart(chart_class, data: list, repeat: int) -> dict:
+    """build - новый график с отрисовкой, patch - изменение значений уже построенного"""
+    fig, ax = plt.subplots(figsize=(8, 4), dpi=100)
+    try:
+        def build():
+            chart_class(ax, "#2E2E2E", "white").update(data)
+            fig.canvas.draw()
+
+        chart = chart_class(ax, "#2E2E2E", "white")
+        chart.update(data)
+        step = iter(range(1, 1 << 30))
+
+        def patch():
+            shift = next(step)
+            chart.update(np.asarray(data) + shift if chart_class is charts.HeatmapChart
+                         else [(label, value + shift) for label, value in data])
+            fig.canvas.draw()
+
+        # Построение с нуля на порядок дольше обновления, столько повторов не нужно
+        return {"build": summarize(measure(build, max(3, repeat // 4))),
+                "patch": summarize(measure(patch, repeat))}
+    finally:
+        plt.close(fig)
+
+
+def charts_draw(setup: Setup) -> dict:
+    """Отрисовка графиков панели (update_charts) на данных общей статистики"""
+    con = db.connect_readonly(setup.history)
+    try:
+        result = stats.query_stats(con, stats.MODE_ALL, None)
+        heatmap = analytics.heatmap(analytics.Analytics().cube(con))
+    finally:
+        con.close()
+    return {
+        "pie": _chart(charts.PieChart, result.category_data, setup.repeat),
+        "bar": _chart(charts.BarChart, result.app_data, setup.repeat),
+        "heatmap": _chart(charts.HeatmapChart, heatmap, setup.repeat),
+    }
+
+
+def export(setup: Setup) -> dict:
+    """Пропускная способность csv_export.export() по всей истории, без сжатия и с gzip"""
+    con = db.connect_readonly(setup.history)
+    try:
+        rows = con.execute("SELECT COUNT(*) FROM track_days").fetchone()[0]
+    finally:
+        con.close()
+    results = {}
+    for name, path in (("plain", "bench-export.csv"), ("gzip", "bench-export.csv.gz")):
+        def run():
+            message = csv_export.export(setup.history, path)
+            if not message.startswith("Данные успешно"):
+                raise RuntimeError(message)
+
+        samples = measure(run, max(1, setup.repeat // 10))
+        best = min(samples)
+        results[name] = summarize(samples) | {
+            "rows_per_s": rows / best,
+            "mb_per_s": os.path.getsize(path) / (1 << 20) / best,
+        }
+        os.remove(path)
+    return results
+
+
+SCENARIOS = {
+    "tick": tick,
+    "loop": loop,
+    "queries": queries,
+    "charts": charts_draw,
+    "export": export,
+}
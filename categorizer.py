@@ -1,17 +1,33 @@
 import time
+import hashlib
+import os
 import psutil
-import win32gui
-import win32process
 import json
-from jsonschema import validate
+from collections import OrderedDict, deque, namedtuple
+from jsonschema import validate, ValidationError
+try:
+    import win32gui
+    import win32process
+except ImportError:
+    # Без pywin32 доступны только источники окон, не опрашивающие систему
+    win32gui = win32process = None
 schema = {
     "type": "object",
     "properties": {
         "process_rules": {"type": "object"},
         "window_rules": {"type": "object"},
         "browser_specific": {"type": "object"},
-        # "blocklist": {"type": "array"},
-        "pomodoro": {"type": "object"}
+        "title_overrides": {"type": "object"},
+        "window_restrictions": {"type": "object"},
+        "blocklist": {"type": "object"},
+        "pomodoro": {"type": "object"},
+        "storage": {"type": "object"},
+        "window_source": {"type": "object"},
+        "tracker": {"type": "object"},
+        "retention": {"type": "object"},
+        "service": {"type": "object"},
+        "metrics": {"type": "object"},
+        "idle": {"type": "object"}
     },
     "required": ["process_rules", "window_rules"]
 }
@@ -45,10 +61,54 @@ default_cfg = """
     "wps": "WPS Office",
     "firefox": "Mozilla Firefox",
     "explorer": "Проводник"
+  },
+  "pomodoro": {
+    "enabled": false,
+    "work_minutes": 25,
+    "break_minutes": 5
+  },
+  "storage": {
+    "flush_interval_seconds": 30,
+    "flush_max_entries": 64
+  },
+  "window_source": {
+    "backend": "events"
+  },
+  "tracker": {
+    "min_interval_seconds": 1,
+    "max_interval_seconds": 5,
+    "interval_growth": 1.5,
+    "max_gap_seconds": 300,
+    "limit_warnings_minutes": [10, 5, 1]
+  },
+  "retention": {
+    "keep_months": 13,
+    "archive_dir": "archive",
+    "interval_hours": 24
+  },
+  "service": {
+    "socket": "tracker.sock",
+    "port": 8765,
+    "push_interval_seconds": 1
+  },
+  "metrics": {
+    "enabled": true,
+    "ring_size": 1024,
+    "dump_path": "",
+    "dump_interval_seconds": 60,
+    "profile_dir": "."
+  },
+  "idle": {
+    "backend": "auto",
+    "threshold_seconds": 300,
+    "suspended_interval_seconds": 30,
+    "category": "Простой"
   }
 }"""
+# Пример секции для включения помодоро: без "enabled": true get_pomodoro() считает его выключенным
 pomodoro_default = """
 "pomodoro": {
+    "enabled": true,
     "work_minutes": 25,
     "break_minutes": 5
   },
@@ -64,7 +124,7 @@ def load_config(path="config.json"):
         return  load_config()
 def get_pomodoro(cfg_json=load_config()) -> None | dict:
     pomodoro_cfg = cfg_json.get("pomodoro", None)
-    if not pomodoro_cfg:
+    if not pomodoro_cfg or not pomodoro_cfg.get("enabled", False):
         return None
     return {"work_minutes": pomodoro_cfg.get("work_minutes", 25),
             "break_minutes": pomodoro_cfg.get("break_minutes", 5)}
@@ -94,50 +154,274 @@ class Category:
     def __str__(self):
         return f"{self.display_title} : {self.name}"
 
+class ProcessCache:
+    """
+    Кэш сведений о процессах по ключу (pid, create_time).
+    Время создания отличает новый процесс с повторно выданным pid,
+    поэтому name()/exe() вызываются только для действительно новых процессов.
+    Неудачные запросы (например, нет доступа) кэшируются на failure_ttl секунд.
+    """
+    def __init__(self, failure_ttl: float = 10.0, sweep_interval: float = 60.0):
+        self.failure_ttl = failure_ttl
+        self.sweep_interval = sweep_interval
+        self._entries: dict[int, tuple[float, ProcessInfo]] = {}
+        self._failures: dict[int, float] = {}
+        self._next_sweep = time.monotonic() + sweep_interval
+
+    def get(self, pid: int) -> ProcessInfo | None:
+        """
+        Возвращает ProcessInfo или None, если процесс недавно не удалось прочитать.
+        Исключения psutil пробрасываются при первой неудаче.
+        """
+        now = time.monotonic()
+        if now >= self._next_sweep:
+            self._sweep(now)
+
+        expires = self._failures.get(pid)
+        if expires is not None:
+            if now < expires:
+                return None
+            del self._failures[pid]
+
+        try:
+            process = psutil.Process(pid)
+            created = process.create_time()
+            entry = self._entries.get(pid)
+            if entry and entry[0] == created:
+                return entry[1]
+            info = ProcessInfo(pid, process.name(), process.exe())
+        except psutil.NoSuchProcess:
+            self._entries.pop(pid, None)
+            raise
+        except psutil.Error:
+            self._entries.pop(pid, None)
+            self._failures[pid] = now + self.failure_ttl
+            raise
+
+        self._entries[pid] = (created, info)
+        return info
+
+    def _sweep(self, now: float):
+        # Ленивое удаление завершившихся процессов и устаревших неудач
+        self._next_sweep = now + self.sweep_interval
+        for pid in [pid for pid in self._entries if not psutil.pid_exists(pid)]:
+            del self._entries[pid]
+        for pid in [pid for pid, expires in self._failures.items() if expires <= now]:
+            del self._failures[pid]
+
+
+_process_cache = ProcessCache()
+
+
 def try_get_active_window_properties() -> None | WindowInfo:
     # window = pgw.getActiveWindow()
     window = win32gui.GetForegroundWindow()
     if not window: return None
     try:
         _,pid = win32process.GetWindowThreadProcessId(window)
-        process = psutil.Process(pid)
-        process_name = process.name()
-        exe_path = process.exe()
-        result = WindowInfo(win32gui.GetWindowText(window), ProcessInfo(pid, process_name, exe_path))
+        process_info = _process_cache.get(pid)
+        if not process_info:
+            return None
+        result = WindowInfo(win32gui.GetWindowText(window), process_info)
     except Exception as e:
         result = None
         print(f"Failed to resolve window's properties: {e}")
 
     return result
 
+class KeywordMatcher:
+    """
+    Автомат Ахо-Корасик для поиска ключевых слов в заголовке за один проход.
+    Каждому слову сопоставлен приоритет (меньше - важнее) и значение,
+    match() возвращает значение самого приоритетного найденного слова.
+    Время поиска зависит от длины текста, а не от количества слов.
+    """
+    def __init__(self):
+        self._goto: list[dict[str, int]] = [{}]
+        self._fail: list[int] = [0]
+        self._best: list[tuple | None] = [None]
+
+    def add(self, keyword: str, priority, value):
+        node = 0
+        for char in keyword:
+            nxt = self._goto[node].get(char)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[node][char] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._best.append(None)
+            node = nxt
+        best = self._best[node]
+        if best is None or priority < best[0]:
+            self._best[node] = (priority, value)
+
+    def build(self):
+        # Обход в ширину: ссылки неудач и лучшее совпадение с учётом суффиксов
+        queue = deque([0])
+        while queue:
+            node = queue.popleft()
+            for char, nxt in self._goto[node].items():
+                queue.append(nxt)
+                fail = self._fail[node]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                fail = self._goto[fail].get(char, 0)
+                self._fail[nxt] = fail if fail != nxt else 0
+                inherited = self._best[self._fail[nxt]]
+                own = self._best[nxt]
+                if inherited is not None and (own is None or inherited[0] < own[0]):
+                    self._best[nxt] = inherited
+        return self
+
+    def match(self, text: str):
+        goto, fail, best_at = self._goto, self._fail, self._best
+        best = best_at[0]
+        node = 0
+        for char in text:
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+            found = best_at[node]
+            if found is not None and (best is None or found[0] < best[0]):
+                best = found
+        return best[1] if best else None
+
+
+class RuleSet:
+    """Скомпилированные правила категоризации из config.json"""
+    def __init__(self, cfg: dict, version: int = 0):
+        self.config = cfg
+        self.version = version
+        self.process_rules: dict[str, str] = dict(cfg["process_rules"])
+        self.title_overrides: dict[str, str] = dict(cfg.get("title_overrides", {}))
+
+        # Побеждает первая категория в порядке конфига,
+        # внутри категории - последнее подходящее слово
+        self.title_matcher = KeywordMatcher()
+        for cat_index, (cat, kws) in enumerate(cfg["window_rules"].items()):
+            for kw_index, kw in enumerate(kws):
+                self.title_matcher.add(kw, (cat_index, -kw_index), (cat, kw))
+        self.title_matcher.build()
+
+    def resolve(self, process_name: str, title: str) -> tuple[str, str, str]:
+        """Возвращает (категория, отображаемое название, сырое название)"""
+        raw_title = process_name.removesuffix(".exe")
+        category = self.process_rules.get(process_name, None)
+        kw_title = raw_title
+        if not category:
+            found = self.title_matcher.match(title)
+            if found:
+                category, kw_title = found
+            else:
+                category = "Другое"
+        return category, self.title_overrides.get(kw_title, kw_title), raw_title
+
+
+CacheInfo = namedtuple("CacheInfo", ["hits", "misses", "evictions", "currsize", "maxsize"])
+
+
+class CategoryCache:
+    """LRU-кэш результатов категоризации по ключу (process_name, title)"""
+    def __init__(self, maxsize: int = 256):
+        self.maxsize = maxsize
+        self._data: OrderedDict[tuple[str, str], tuple[str, str, str]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: tuple[str, str]) -> tuple[str, str, str] | None:
+        result = self._data.get(key)
+        if result is None:
+            self.misses += 1
+            return None
+        self._data.move_to_end(key)
+        self.hits += 1
+        return result
+
+    def put(self, key: tuple[str, str], value: tuple[str, str, str]):
+        self._data[key] = value
+        self._data.move_to_end(key)
+        if len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        self._data.clear()
+
+    def info(self) -> CacheInfo:
+        return CacheInfo(self.hits, self.misses, self.evictions, len(self._data), self.maxsize)
+
+
+_category_cache = CategoryCache()
+
+
+def category_cache_info() -> CacheInfo:
+    return _category_cache.info()
+
+
+_ruleset: RuleSet | None = None
+_ruleset_stamp = None
+_ruleset_digest = None
+
+
+def get_ruleset(path="config.json") -> RuleSet:
+    """
+    Возвращает скомпилированные правила, пересобирая их только
+    при изменении mtime/размера файла и его содержимого.
+    """
+    global _ruleset, _ruleset_stamp, _ruleset_digest
+    try:
+        st = os.stat(path)
+    except OSError:
+        load_config(path)  # создаст конфиг по умолчанию
+        st = os.stat(path)
+    stamp = (st.st_mtime_ns, st.st_size)
+    if _ruleset is not None and stamp == _ruleset_stamp:
+        return _ruleset
+
+    with open(path, "rb") as f:
+        raw = f.read()
+    digest = hashlib.sha1(raw).digest()
+    _ruleset_stamp = stamp
+    if _ruleset is not None and digest == _ruleset_digest:
+        return _ruleset
+
+    try:
+        cfg = json.loads(raw.decode("utf-8"))
+        validate(cfg, schema)
+    except (ValueError, ValidationError) as e:
+        if _ruleset is None:
+            raise
+        print(f"Invalid config, keeping previous rules: {e}")
+        return _ruleset
+
+    _ruleset_digest = digest
+    # Старые результаты могли быть получены по прежним правилам
+    _category_cache.clear()
+    _ruleset = RuleSet(cfg, version=_ruleset.version + 1 if _ruleset else 1)
+    return _ruleset
+
+
 def categorize(window : WindowInfo) -> Category:
     if not window: raise Exception("Passed None as a window")
     if window.info.pid == -1: raise Exception(f"Invalid process info for {window}")
-    cfg = load_config()
-
-    category = cfg["process_rules"].get(window.info.process_name, None)
-    kw_title : str = ""
-    do_from_title = False
-    if not category:
-        for cat, kws in cfg["window_rules"].items():
-            if any(kw in window.title for kw in kws):
-                category = cat
-                for kw in kws:
-                    if kw in window.title:
-                        kw_title = kw
-                do_from_title = True
-                break
-        else:
-            category = "Другое"
-    raw_title = window.info.process_name.removesuffix(".exe") if not do_from_title else kw_title
+
+    ruleset = get_ruleset()
+    key = (window.info.process_name, window.title)
+    resolved = _category_cache.get(key)
+    if resolved is None:
+        resolved = ruleset.resolve(*key)
+        _category_cache.put(key, resolved)
+
+    name, display_title, raw_title = resolved
     return Category(
-        name = category,
-        display_title=cfg.get("title_overrides", raw_title).get(raw_title, raw_title),
-        raw_title=window.info.process_name.removesuffix(".exe"),
+        name = name,
+        display_title=display_title,
+        raw_title=raw_title,
         window=window
     )
 
-
 if __name__ == "__main__":
     print("Categorizer testing started.")
     print("waiting for 3..."); time.sleep(3)
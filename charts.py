@@ -0,0 +1,191 @@
+import matplotlib.pyplot as plt
+import numpy as np
+
+from analytics import WEEKDAYS
+
+COLORS = plt.cm.tab20.colors
+LEGEND_PARAMS = {
+    'loc': 'upper left',
+    'bbox_to_anchor': (0, 1),
+    'fontsize': 8
+}
+
+
+class Chart:
+    """
+    График, который при обновлении меняет уже созданные объекты matplotlib.
+    update() ничего не делает при тех же данных и пересоздаёт график
+    только когда меняется количество элементов.
+    """
+    def __init__(self, ax, bg_color: str, text_color: str):
+        self.ax = ax
+        self.bg_color = bg_color
+        self.text_color = text_color
+        self._fingerprint = None
+
+    def update(self, data) -> bool:
+        """Возвращает True, если график изменился и его нужно перерисовать"""
+        data = tuple(tuple(row) for row in data)
+        if data == self._fingerprint:
+            return False
+        if not data:
+            self.clear()
+        elif self.can_patch(data):
+            self.patch(data)
+        else:
+            self.build(data)
+        self._fingerprint = data
+        return True
+
+    def clear(self):
+        self.ax.clear()
+        self.ax.set_facecolor(self.bg_color)
+
+    def can_patch(self, data) -> bool:
+        return False
+
+    def build(self, data):
+        raise NotImplementedError
+
+    def patch(self, data):
+        raise NotImplementedError
+
+    def apply_theme(self, bg_color: str, text_color: str):
+        self.bg_color = bg_color
+        self.text_color = text_color
+        ax = self.ax
+        ax.figure.patch.set_facecolor(bg_color)
+        ax.set_facecolor(bg_color)
+        ax.tick_params(axis='both', colors=text_color)
+
+        for text in ax.texts:
+            text.set_color(text_color)
+
+        if ax.title.get_text():
+            ax.title.set_color(text_color)
+
+        if ax.get_legend():
+            ax.get_legend().get_title().set_color(text_color)
+            for text in ax.get_legend().get_texts():
+                text.set_color(text_color)
+
+
+class PieChart(Chart):
+    """Круговая диаграмма распределения по категориям"""
+    START_ANGLE = 140
+
+    def __init__(self, ax, bg_color: str, text_color: str):
+        super().__init__(ax, bg_color, text_color)
+        self._wedges = []
+
+    def clear(self):
+        super().clear()
+        self._wedges = []
+
+    def can_patch(self, data) -> bool:
+        return len(self._wedges) == len(data)
+
+    def build(self, data):
+        self.clear()
+        labels, sizes = zip(*data)
+        wedges, texts = self.ax.pie(
+            sizes,
+            # labels=percentages, # мне не нужно это на графике
+            colors=COLORS,
+            startangle=self.START_ANGLE,
+            wedgeprops={'linewidth': 1.5, 'edgecolor': 'w'},
+            pctdistance=0.85,
+            textprops={'color': self.text_color, 'fontsize': 9}
+        )
+        self._wedges = wedges
+
+        self.ax.axis('equal')
+        self.ax.set_title('Распределение по категориям',
+                          color=self.text_color, pad=20)
+
+        legend = self.ax.legend(
+            wedges,
+            labels,
+            title="Категории",
+            **LEGEND_PARAMS
+        )
+        legend.get_title().set_color(self.text_color)
+
+    def patch(self, data):
+        # Те же углы, что строит ax.pie
+        total = sum(size for _, size in data) or 1
+        theta = self.START_ANGLE
+        for wedge, (_, size) in zip(self._wedges, data):
+            end = theta + 360 * size / total
+            wedge.set_theta1(theta)
+            wedge.set_theta2(end)
+            theta = end
+
+        for text, (label, _) in zip(self.ax.get_legend().get_texts(), data):
+            text.set_text(label)
+
+
+class BarChart(Chart):
+    """Горизонтальная диаграмма топа приложений"""
+    def __init__(self, ax, bg_color: str, text_color: str):
+        super().__init__(ax, bg_color, text_color)
+        self._bars = None
+        self._bar_labels = []
+
+    def clear(self):
+        super().clear()
+        self._bars = None
+        self._bar_labels = []
+
+    def can_patch(self, data) -> bool:
+        return self._bars is not None and len(self._bars) == len(data)
+
+    def build(self, data):
+        self.clear()
+        labels, sizes = zip(*data)
+        self._bars = self.ax.barh(range(len(labels)), sizes, color=COLORS, tick_label=labels)
+        self._bar_labels = self.ax.bar_label(self._bars, padding=5, color=self.text_color, fmt='%d сек')
+        self.ax.tick_params(axis='both', colors=self.text_color)
+        self.ax.set_title('Топ приложений', color=self.text_color, pad=15)
+
+    def patch(self, data):
+        labels, sizes = zip(*data)
+        if labels != tuple(label for label, _ in self._fingerprint):
+            self.ax.set_yticks(range(len(labels)), labels)
+
+        for bar, annotation, size in zip(self._bars, self._bar_labels, sizes):
+            bar.set_width(size)
+            annotation.xy = (bar.get_x() + size, bar.get_y() + bar.get_height() / 2)
+            annotation.set_text('%d сек' % size)
+
+        self.ax.relim()
+        self.ax.autoscale_view(scaley=False)
+
+
+class HeatmapChart(Chart):
+    """Тепловая карта активности по дням недели и часам"""
+    def __init__(self, ax, bg_color: str, text_color: str):
+        super().__init__(ax, bg_color, text_color)
+        self._image = None
+
+    def clear(self):
+        super().clear()
+        self._image = None
+
+    def can_patch(self, data) -> bool:
+        return self._image is not None
+
+    def build(self, data):
+        self.clear()
+        minutes = np.asarray(data) / 60
+        self._image = self.ax.imshow(minutes, aspect='auto', cmap='viridis',
+                                     vmin=0, vmax=max(minutes.max(), 1))
+        self.ax.set_yticks(range(len(WEEKDAYS)), WEEKDAYS)
+        self.ax.set_xticks(range(0, 24, 2))
+        self.ax.tick_params(axis='both', colors=self.text_color)
+        self.ax.set_title('Среднее время по часам, мин', color=self.text_color, pad=15)
+
+    def patch(self, data):
+        minutes = np.asarray(data) / 60
+        self._image.set_data(minutes)
+        self._image.set_clim(0, max(minutes.max(), 1))
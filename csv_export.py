@@ -1,25 +1,227 @@
+import argparse
 import csv
+import gzip
 import os
 import sqlite3 as sql
+import threading
+from contextlib import nullcontext
+
+import db
+import retention
+
+
+class ExportCancelled(Exception):
+    pass
+
+
+def build_filter(date_from: str = None, date_to: str = None,
+                 categories: list[str] = None, titles: list[str] = None) -> tuple[str, list]:
+    """
+    Условие WHERE и параметры для фильтров экспорта.
+    Условие относится к столбцам db.track_select() (t - track_days, a - apps, c - categories):
+    даты сравниваются числовыми ключами и идут по индексу track_days_date,
+    а не по строке даты представления track.
+    """
+    conditions, params = [], []
+    if date_from:
+        conditions.append("t.date >= ?")
+        params.append(db.date_key(date_from))
+    if date_to:
+        conditions.append("t.date <= ?")
+        params.append(db.date_key(date_to))
+    if categories:
+        conditions.append(f"c.name IN ({', '.join('?' * len(categories))})")
+        params.extend(categories)
+    if titles:
+        conditions.append(f"a.title IN ({', '.join('?' * len(titles))})")
+        params.extend(titles)
+    return ("WHERE " + " AND ".join(conditions)) if conditions else "", params
+
+
+def open_output(export_path: str, compress: bool):
+    if compress:
+        return gzip.open(export_path, "wt", encoding="utf-16", newline='')
+    return open(export_path, "w+", encoding="utf-16", newline='')
 
-def export(path_to_db: str = "track.db", export_path: str = "export.csv") -> str | None:
-    try:
-        con = sql.connect(path_to_db)
-        cur = con.cursor()
 
-        cur.execute("SELECT * FROM track")
-        rows = cur.fetchall()
+def write_csv(con: sql.Connection, export_path: str, where_clause: str = "", params: list = (),
+              compress: bool = False, progress=None, cancel: threading.Event = None,
+              chunk_size: int = 1000, archives: list[str] = ()) -> int:
+    """
+    Пишет строки track, отобранные условием build_filter(), порциями, возвращает их количество.
+    Файлы archives подключаются по одному после живой базы.
+    """
+    sources = [(None, f"{db.track_select()} {where_clause}")] + [
+        (path, f"{db.track_select('archive.')} {where_clause}") for path in archives]
+    total = 0
+    for path, query in sources:
+        with retention.attached(con, path) if path else nullcontext():
+            total += con.execute(f"SELECT COUNT(*) FROM ({query})", params).fetchone()[0]
 
-        with open(export_path, "w+", encoding="utf-16", newline='') as f:
+    done = 0
+    try:
+        with open_output(export_path, compress) as f:
             csv_w = csv.writer(f, delimiter='\t')
-            csv_w.writerow([i[0] for i in cur.description])
-            csv_w.writerows(rows)
+            for path, query in sources:
+                with retention.attached(con, path) if path else nullcontext():
+                    cur = con.execute(query, params)
+                    try:
+                        if not path:
+                            csv_w.writerow([i[0] for i in cur.description])
+                        while rows := cur.fetchmany(chunk_size):
+                            if cancel and cancel.is_set():
+                                raise ExportCancelled()
+                            csv_w.writerows(rows)
+                            done += len(rows)
+                            if progress:
+                                progress(done, total)
+                    finally:
+                        # Архив нельзя отключить, пока по нему открыт запрос
+                        cur.close()
+    except ExportCancelled:
+        os.remove(export_path)
+        raise
+    return done
+
+
+def export(path_to_db: str = "track.db", export_path: str = "export.csv",
+           date_from: str = None, date_to: str = None,
+           categories: list[str] = None, titles: list[str] = None,
+           compress: bool = None, progress=None, cancel: threading.Event = None,
+           chunk_size: int = 1000) -> str | None:
+    """
+    Потоковый экспорт track в CSV: строки читаются порциями по chunk_size,
+    поэтому расход памяти не зависит от размера базы.
+    progress(done, total) вызывается после каждой порции,
+    установленный cancel прерывает экспорт и удаляет недописанный файл.
+    Месяцы, вынесенные в архивы, выгружаются, если попадают в диапазон дат.
+    """
+    if compress is None:
+        compress = export_path.endswith(".gz")
+    where_clause, params = build_filter(date_from, date_to, categories, titles)
+    try:
+        with db.read_pool(path_to_db).connection() as con:
+            archives = retention.archives_for(con, date_from, date_to)
+            write_csv(con, export_path, where_clause, params, compress, progress, cancel, chunk_size,
+                      archives)
 
-        dirpath = os.getcwd() + export_path
         return f"Данные успешно экспортированы в {export_path}"
+    except ExportCancelled:
+        return "Экспорт отменён"
+    except Exception as e:
+        return f"Не удалось экспортировать данные: {e}"
+
+
+def export_delta(path_to_db: str = "track.db", export_path: str = "delta.csv",
+                 name: str = "default", compress: bool = None, progress=None,
+                 cancel: threading.Event = None, chunk_size: int = 1000) -> str | None:
+    """
+    Инкрементальный экспорт: только строки, изменённые с прошлого экспорта с тем же name.
+    Отметка (watermark) - номер изменения из счётчика track_days.change_seq,
+    хранится в таблице export_watermarks и сдвигается только после успешной записи файла.
+    Строка, изменённая во время выгрузки, попадёт и в следующую дельту:
+    строки содержат полные значения, поэтому это безопасно.
+    Удаления из track в дельту не попадают.
+    """
+    if compress is None:
+        compress = export_path.endswith(".gz")
+    try:
+        con = db.connect(path_to_db)
+        try:
+            db.ensure_schema(con)
+            con.execute("""
+                CREATE TABLE IF NOT EXISTS export_watermarks(
+                    name TEXT PRIMARY KEY,
+                    watermark TIMESTAMP)
+                """)
+            row = con.execute("SELECT watermark FROM export_watermarks WHERE name = ?", (name,)).fetchone()
+            since = row[0] if row else 0
+            if isinstance(since, str):
+                # Отметка прежних версий - время last_updated: граничную секунду выгружаем ещё раз
+                since = con.execute(
+                    "SELECT COALESCE(MAX(change_seq), 0) FROM track_days WHERE last_updated < ?", (since,)
+                ).fetchone()[0]
+            # Отметку берём до выборки: всё, что изменится позже, попадёт в следующую дельту
+            watermark = con.execute("SELECT value FROM change_counter").fetchone()[0]
+
+            count = write_csv(con, export_path, "WHERE t.change_seq > ?", [since], compress, progress,
+                              cancel, chunk_size)
+
+            if watermark != since:
+                with con:
+                    con.execute("""
+                        INSERT INTO export_watermarks (name, watermark) VALUES (?, ?)
+                        ON CONFLICT(name) DO UPDATE SET watermark = excluded.watermark
+                    """, (name, watermark))
+        finally:
+            con.close()
+
+        return f"Изменения ({count} строк) экспортированы в {export_path}"
+    except ExportCancelled:
+        return "Экспорт отменён"
     except Exception as e:
         return f"Не удалось экспортировать данные: {e}"
 
+
+def import_delta(delta_path: str, path_to_db: str = "track.db", chunk_size: int = 1000) -> str | None:
+    """
+    Применяет файл export_delta() к другой базе одной транзакцией.
+    Строка заменяет существующую по (title, date), если она не старше её
+    (это делает триггер вставки представления track).
+    """
+    opener = gzip.open if delta_path.endswith(".gz") else open
+    try:
+        con = db.connect(path_to_db)
+        db.ensure_schema(con)
+        count = 0
+        try:
+            with opener(delta_path, "rt", encoding="utf-16", newline='') as f, con:
+                reader = csv.DictReader(f, delimiter='\t')
+                while rows := [row for _, row in zip(range(chunk_size), reader)]:
+                    con.executemany("""
+                        INSERT INTO track (title, process_name, category, seconds, date, last_updated)
+                        VALUES (:title, :process_name, :category, :seconds, :date, :last_updated)
+                    """, rows)
+                    count += len(rows)
+        finally:
+            con.close()
+        return f"Применено {count} строк из {delta_path}"
+    except Exception as e:
+        return f"Не удалось применить изменения: {e}"
+
+
+def export_async(on_done, **kwargs) -> threading.Event:
+    """
+    Запускает export() в фоновом потоке, по завершении вызывает on_done(сообщение).
+    Возвращает событие для отмены.
+    """
+    cancel = threading.Event()
+
+    def run():
+        on_done(export(cancel=cancel, **kwargs))
+
+    threading.Thread(target=run, daemon=True).start()
+    return cancel
+
+
 if __name__ == "__main__":
-    print("Export testing started.")
-    print(export())
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Экспорт track.db в CSV")
+    parser.add_argument("--db", default="track.db")
+    parser.add_argument("--out", default="export.csv")
+    parser.add_argument("--from", dest="date_from")
+    parser.add_argument("--to", dest="date_to")
+    parser.add_argument("--category", action="append", dest="categories")
+    parser.add_argument("--title", action="append", dest="titles")
+    parser.add_argument("--gzip", action="store_true", default=None)
+    parser.add_argument("--delta", metavar="NAME", help="экспортировать только изменения с прошлого запуска")
+    parser.add_argument("--apply", metavar="DELTA", help="применить файл изменений к --db")
+    args = parser.parse_args()
+
+    if args.apply:
+        print(import_delta(args.apply, args.db))
+    elif args.delta:
+        print(export_delta(args.db, args.out, args.delta, args.gzip))
+    else:
+        print(export(args.db, args.out, args.date_from, args.date_to,
+                     args.categories, args.titles, args.gzip,
+                     progress=lambda done, total: print(f"{done}/{total}", end="\r")))
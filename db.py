@@ -0,0 +1,569 @@
+import math
+import queue
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+import metrics
+
+DB_PATH = "track.db"
+# Размер кэша страниц в КиБ (отрицательное значение для PRAGMA cache_size)
+CACHE_KIB = 8192
+READ_CONNECTIONS = 3
+
+
+def connect(path: str = DB_PATH, readonly: bool = False) -> sqlite3.Connection:
+    """
+    Соединение с настроенными PRAGMA. База работает в режиме WAL:
+    читатели не блокируют писателя и видят последнее зафиксированное состояние.
+    """
+    if readonly:
+        con = sqlite3.connect(f"file:{path}?mode=ro", uri=True, check_same_thread=False)
+    else:
+        con = sqlite3.connect(path, check_same_thread=False)
+        con.execute("PRAGMA journal_mode = WAL")
+        # В WAL режим NORMAL не теряет целостность, а fsync делается только на контрольных точках
+        con.execute("PRAGMA synchronous = NORMAL")
+    con.execute(f"PRAGMA cache_size = -{CACHE_KIB}")
+    con.execute("PRAGMA temp_store = MEMORY")
+    con.execute("PRAGMA busy_timeout = 5000")
+    return con
+
+
+def connect_readonly(path: str = DB_PATH) -> sqlite3.Connection:
+    init(path)
+    return connect(path, readonly=True)
+
+
+SCHEMA_VERSION = 4
+
+# Дата хранится числом YYYYMMDD: ключи короче, сравнения и диапазоны - целочисленные
+SQL_DATE_KEY = "CAST(replace({}, '-', '') AS INTEGER)"
+SQL_DATE_STR = "printf('%04d-%02d-%02d', {0} / 10000, {0} / 100 % 100, {0} % 100)"
+
+TABLES = """
+    CREATE TABLE IF NOT EXISTS apps(
+        id INTEGER PRIMARY KEY,
+        title TEXT NOT NULL UNIQUE,
+        process_name TEXT);
+    CREATE TABLE IF NOT EXISTS categories(
+        id INTEGER PRIMARY KEY,
+        name TEXT NOT NULL UNIQUE);
+    CREATE TABLE IF NOT EXISTS track_days(
+        app_id INTEGER NOT NULL,
+        date INTEGER NOT NULL,
+        category_id INTEGER NOT NULL,
+        seconds INTEGER NOT NULL,
+        last_updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        PRIMARY KEY (app_id, date)) WITHOUT ROWID;
+    CREATE TABLE IF NOT EXISTS sessions(
+        id INTEGER PRIMARY KEY,
+        start TIMESTAMP,
+        end TIMESTAMP,
+        app_id INTEGER,
+        category_id INTEGER,
+        date INTEGER,
+        seconds INTEGER,
+        compacted INTEGER DEFAULT 0);
+    -- Отрезки, ещё не перенесённые в track_days
+    CREATE INDEX IF NOT EXISTS sessions_pending ON sessions(app_id, date) WHERE seconds > compacted;
+    CREATE INDEX IF NOT EXISTS sessions_date ON sessions(date, start);
+    CREATE INDEX IF NOT EXISTS track_days_date ON track_days(date);
+"""
+
+# Секунды по часам суток для аналитики; заполняется Compactor вместе с track_days
+HOURS_TABLE = """
+    CREATE TABLE IF NOT EXISTS track_hours(
+        date INTEGER NOT NULL,
+        hour INTEGER NOT NULL,
+        category_id INTEGER NOT NULL,
+        seconds INTEGER NOT NULL,
+        PRIMARY KEY (date, hour, category_id)) WITHOUT ROWID;
+"""
+
+# Итоги за месяцы, вынесенные из базы (retention.py): общая статистика берёт их отсюда,
+# не открывая файлы архивов
+ARCHIVE_TABLES = """
+    CREATE TABLE IF NOT EXISTS archive_months(
+        month INTEGER PRIMARY KEY,
+        path TEXT,
+        seconds INTEGER,
+        archived_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP);
+    CREATE TABLE IF NOT EXISTS archive_category(
+        category_id INTEGER PRIMARY KEY,
+        seconds INTEGER);
+    CREATE TABLE IF NOT EXISTS archive_title(
+        app_id INTEGER PRIMARY KEY,
+        category_id INTEGER,
+        seconds INTEGER);
+"""
+
+# Номер изменения строки track_days из монотонного счётчика change_counter:
+# инкрементальный экспорт выбирает строки новее отметки без повторов и пропусков,
+# чего не дают секундные метки last_updated. Существующие строки нумеруются по last_updated.
+CHANGE_TRACKING = """
+    ALTER TABLE track_days ADD COLUMN change_seq INTEGER NOT NULL DEFAULT 0;
+    DROP INDEX IF EXISTS track_days_last_updated;
+    UPDATE track_days SET change_seq = r.seq
+    FROM (SELECT app_id, date, DENSE_RANK() OVER (ORDER BY last_updated) AS seq FROM track_days) r
+    WHERE track_days.app_id = r.app_id AND track_days.date = r.date;
+    CREATE INDEX IF NOT EXISTS track_days_change_seq ON track_days(change_seq);
+    CREATE TABLE IF NOT EXISTS change_counter(value INTEGER NOT NULL);
+    INSERT INTO change_counter SELECT COALESCE(MAX(change_seq), 0) FROM track_days;
+    CREATE TRIGGER IF NOT EXISTS track_days_seq_insert AFTER INSERT ON track_days BEGIN
+        UPDATE change_counter SET value = value + 1;
+        UPDATE track_days SET change_seq = (SELECT value FROM change_counter)
+        WHERE app_id = NEW.app_id AND date = NEW.date;
+    END;
+    CREATE TRIGGER IF NOT EXISTS track_days_seq_update
+    AFTER UPDATE OF app_id, date, category_id, seconds, last_updated ON track_days BEGIN
+        UPDATE change_counter SET value = value + 1;
+        UPDATE track_days SET change_seq = (SELECT value FROM change_counter)
+        WHERE app_id = NEW.app_id AND date = NEW.date;
+    END;
+"""
+
+
+def track_select(schema: str = "") -> str:
+    """Строки в формате прежней таблицы track по track_days из схемы schema ("archive." и т.п.)"""
+    return f"""
+    SELECT a.title, a.process_name, c.name AS category, t.seconds,
+           {SQL_DATE_STR.format("t.date")} AS date, t.last_updated
+    FROM {schema}track_days t
+    JOIN apps a ON a.id = t.app_id
+    JOIN categories c ON c.id = t.category_id"""
+
+
+# Представление track сохраняет прежний вид таблицы для чтения и записи.
+# Вставка заменяет строку (title, date), если она не новее вставляемой.
+TRACK_VIEW = f"""
+    CREATE VIEW IF NOT EXISTS track AS{track_select()};
+
+    CREATE TRIGGER IF NOT EXISTS track_insert INSTEAD OF INSERT ON track BEGIN
+        INSERT INTO apps (title, process_name) VALUES (NEW.title, NEW.process_name)
+        ON CONFLICT(title) DO NOTHING;
+        INSERT INTO categories (name) VALUES (NEW.category)
+        ON CONFLICT(name) DO NOTHING;
+        INSERT INTO track_days (app_id, date, category_id, seconds, last_updated)
+        SELECT a.id, {SQL_DATE_KEY.format("NEW.date")}, c.id, NEW.seconds,
+               COALESCE(NEW.last_updated, CURRENT_TIMESTAMP)
+        FROM apps a, categories c
+        WHERE a.title = NEW.title AND c.name = NEW.category
+        ON CONFLICT(app_id, date) DO UPDATE SET
+            category_id = excluded.category_id,
+            seconds = excluded.seconds,
+            last_updated = excluded.last_updated
+        WHERE excluded.last_updated >= track_days.last_updated;
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS track_update INSTEAD OF UPDATE ON track BEGIN
+        INSERT INTO categories (name) VALUES (NEW.category)
+        ON CONFLICT(name) DO NOTHING;
+        UPDATE track_days SET
+            category_id = (SELECT id FROM categories WHERE name = NEW.category),
+            seconds = NEW.seconds,
+            last_updated = CURRENT_TIMESTAMP
+        WHERE app_id = (SELECT id FROM apps WHERE title = OLD.title)
+          AND date = {SQL_DATE_KEY.format("OLD.date")};
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS track_delete INSTEAD OF DELETE ON track BEGIN
+        DELETE FROM track_days
+        WHERE app_id = (SELECT id FROM apps WHERE title = OLD.title)
+          AND date = {SQL_DATE_KEY.format("OLD.date")};
+    END;
+"""
+
+# Перенос данных из таблиц track и sessions со строковыми ключами
+LEGACY_MIGRATION = f"""
+    DROP TRIGGER IF EXISTS track_rollup_update;
+    DROP TRIGGER IF EXISTS track_rollup_move;
+    DROP TRIGGER IF EXISTS track_rollup_delete;
+    DROP TRIGGER IF EXISTS track_rollup_insert;
+    DROP TABLE IF EXISTS rollup_day_category;
+    DROP TABLE IF EXISTS rollup_day_title;
+    DROP TABLE IF EXISTS rollup_category;
+    DROP TABLE IF EXISTS rollup_title;
+    DROP INDEX IF EXISTS track_date;
+    DROP INDEX IF EXISTS track_last_updated;
+    DROP INDEX IF EXISTS sessions_pending;
+    DROP INDEX IF EXISTS sessions_date;
+    ALTER TABLE track RENAME TO track_legacy;
+    ALTER TABLE sessions RENAME TO sessions_legacy;
+    {TABLES}
+    INSERT INTO apps (title, process_name)
+    SELECT title, MAX(process_name) FROM (
+        SELECT COALESCE(title, '') AS title, process_name FROM track_legacy
+        UNION ALL
+        SELECT COALESCE(title, ''), process_name FROM sessions_legacy)
+    GROUP BY title;
+    INSERT INTO categories (name)
+    SELECT COALESCE(category, '') FROM track_legacy
+    UNION
+    SELECT COALESCE(category, '') FROM sessions_legacy;
+    INSERT INTO track_days (app_id, date, category_id, seconds, last_updated)
+    SELECT a.id, {SQL_DATE_KEY.format("t.date")}, c.id, COALESCE(t.seconds, 0), t.last_updated
+    FROM track_legacy t
+    JOIN apps a ON a.title = COALESCE(t.title, '')
+    JOIN categories c ON c.name = COALESCE(t.category, '');
+    INSERT INTO sessions (id, start, end, app_id, category_id, date, seconds, compacted)
+    SELECT s.id, s.start, s.end, a.id, c.id, {SQL_DATE_KEY.format("s.date")}, s.seconds, s.compacted
+    FROM sessions_legacy s
+    JOIN apps a ON a.title = COALESCE(s.title, '')
+    JOIN categories c ON c.name = COALESCE(s.category, '');
+    DROP TABLE track_legacy;
+    DROP TABLE sessions_legacy;
+"""
+
+
+def date_key(day: str) -> int:
+    """'2024-04-01' -> 20240401"""
+    return int(day.replace("-", ""))
+
+
+def date_str(key: int) -> str:
+    """20240401 -> '2024-04-01'"""
+    return f"{key // 10000:04d}-{key // 100 % 100:02d}-{key % 100:02d}"
+
+
+def split_hours(end: datetime, seconds: int) -> list[tuple[int, int, int]]:
+    """Раскладывает seconds, закончившиеся в end, по часам: [(дата, час, секунды)]"""
+    parts = []
+    start = end - timedelta(seconds=seconds)
+    while seconds > 0:
+        hour_start = start.replace(minute=0, second=0, microsecond=0)
+        step = min(seconds, math.ceil((hour_start + timedelta(hours=1) - start).total_seconds()))
+        parts.append((int(start.strftime("%Y%m%d")), start.hour, step))
+        start += timedelta(seconds=step)
+        seconds -= step
+    return parts
+
+
+def add_hours(con: sqlite3.Connection, rows):
+    """Прибавляет к track_hours секунды отрезков [(конец, секунды, category_id)]"""
+    buckets: dict[tuple[int, int, int], int] = {}
+    for end, seconds, category_id in rows:
+        for day, hour, part in split_hours(datetime.fromisoformat(end), seconds):
+            key = (day, hour, category_id)
+            buckets[key] = buckets.get(key, 0) + part
+    con.executemany("""
+        INSERT INTO track_hours (date, hour, category_id, seconds) VALUES (?, ?, ?, ?)
+        ON CONFLICT(date, hour, category_id) DO UPDATE SET seconds = seconds + excluded.seconds
+    """, [key + (seconds,) for key, seconds in buckets.items()])
+
+
+def execute_script(con: sqlite3.Connection, script: str):
+    """Выполняет скрипт по одному оператору: в отличие от executescript, открытая транзакция не фиксируется"""
+    statement = ""
+    for line in script.splitlines(keepends=True):
+        statement += line
+        if sqlite3.complete_statement(statement):
+            con.execute(statement)
+            statement = ""
+
+
+def ensure_schema(con: sqlite3.Connection):
+    """
+    Создаёт таблицы, представление track и сводные таблицы, если их ещё нет.
+    База со старой схемой (track как таблица со строковыми ключами)
+    переводится на новую одной транзакцией.
+    """
+    if con.execute("PRAGMA user_version").fetchone()[0] < SCHEMA_VERSION:
+        with con:
+            con.execute("BEGIN IMMEDIATE")
+            # Версия перечитывается под блокировкой: схему могло обновить другое соединение,
+            # пока это ждало, а шаги вроде ALTER TABLE повторять нельзя
+            migrate(con, con.execute("PRAGMA user_version").fetchone()[0])
+    create_rollups(con)
+
+
+def migrate(con: sqlite3.Connection, version: int):
+    """Шаги от версии version до SCHEMA_VERSION внутри транзакции ensure_schema()"""
+    if version < 1:
+        legacy = con.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'track'"
+        ).fetchone()
+        if legacy:
+            # В самых старых базах журнала отрезков ещё нет
+            con.execute("""
+                CREATE TABLE IF NOT EXISTS sessions(
+                    id INTEGER PRIMARY KEY, start TIMESTAMP, end TIMESTAMP,
+                    title TEXT, process_name TEXT, category TEXT, date DATE,
+                    seconds INTEGER, compacted INTEGER DEFAULT 0)
+                """)
+        execute_script(con, (LEGACY_MIGRATION if legacy else TABLES) + TRACK_VIEW)
+    if version < 2:
+        # Часы уже перенесённых отрезков восстанавливаются по журналу sessions
+        con.execute(HOURS_TABLE)
+        add_hours(con, con.execute(
+            "SELECT end, compacted, category_id FROM sessions WHERE compacted > 0"
+        ).fetchall())
+    if version < 3:
+        execute_script(con, ARCHIVE_TABLES)
+    if version < 4:
+        execute_script(con, CHANGE_TRACKING)
+    con.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+
+_initialized: set[str] = set()
+_init_lock = threading.Lock()
+
+
+def init(path: str = DB_PATH):
+    """Создаёт базу и схему, чтобы к ней можно было подключаться только на чтение"""
+    with _init_lock:
+        if path in _initialized:
+            return
+        con = connect(path)
+        try:
+            ensure_schema(con)
+        finally:
+            con.close()
+        _initialized.add(path)
+
+
+ROLLUPS = {
+    # таблица: (ключевые столбцы, дополнительные столбцы)
+    "rollup_day_category": (("date", "category_id"), ()),
+    "rollup_day_title": (("date", "app_id"), ("category_id",)),
+    "rollup_category": (("category_id",), ()),
+    "rollup_title": (("app_id",), ("category_id",)),
+}
+
+
+def _rollup_add(table: str, row: str, seconds: str) -> str:
+    keys, extra = ROLLUPS[table]
+    columns = keys + extra
+    values = ", ".join(f"{row}.{c}" for c in columns)
+    updates = "".join(f", {c} = excluded.{c}" for c in extra)
+    return f"""
+            INSERT INTO {table} ({", ".join(columns)}, seconds) VALUES ({values}, {seconds})
+            ON CONFLICT({", ".join(keys)}) DO UPDATE SET seconds = seconds + excluded.seconds{updates};"""
+
+
+def _rollup_sub(table: str, row: str) -> str:
+    keys, _ = ROLLUPS[table]
+    where = " AND ".join(f"{c} IS {row}.{c}" for c in keys)
+    return f"""
+            UPDATE {table} SET seconds = seconds - {row}.seconds WHERE {where};
+            DELETE FROM {table} WHERE {where} AND seconds <= 0;"""
+
+
+def _rollup_backfill(table: str) -> str:
+    keys, extra = ROLLUPS[table]
+    columns = ", ".join(keys + extra)
+    return f"""
+        DELETE FROM {table};
+        INSERT INTO {table} ({columns}, seconds)
+        SELECT {columns}, SUM(seconds) FROM track_days GROUP BY {", ".join(keys)};"""
+
+
+ROLLUP_TRIGGERS = ["track_days_rollup_update", "track_days_rollup_move",
+                   "track_days_rollup_delete", "track_days_rollup_insert"]
+
+
+def rollup_triggers() -> list[str]:
+    """Триггеры track_days, поддерживающие сводные таблицы"""
+    same_key = " AND ".join(f"OLD.{c} IS NEW.{c}" for c in ("app_id", "date", "category_id"))
+    return [f"""
+        CREATE TRIGGER IF NOT EXISTS track_days_rollup_update AFTER UPDATE OF seconds ON track_days
+        WHEN {same_key} BEGIN{"".join(_rollup_add(t, "NEW", "NEW.seconds - OLD.seconds") for t in ROLLUPS)}
+        END""", f"""
+        CREATE TRIGGER IF NOT EXISTS track_days_rollup_move
+        AFTER UPDATE OF seconds, app_id, date, category_id ON track_days
+        WHEN NOT ({same_key}) BEGIN{"".join(_rollup_sub(t, "OLD") + _rollup_add(t, "NEW", "NEW.seconds") for t in ROLLUPS)}
+        END""", f"""
+        CREATE TRIGGER IF NOT EXISTS track_days_rollup_delete AFTER DELETE ON track_days
+        BEGIN{"".join(_rollup_sub(t, "OLD") for t in ROLLUPS)}
+        END""", f"""
+        CREATE TRIGGER IF NOT EXISTS track_days_rollup_insert AFTER INSERT ON track_days
+        BEGIN{"".join(_rollup_add(t, "NEW", "NEW.seconds") for t in ROLLUPS)}
+        END"""]
+
+
+def create_rollups(con: sqlite3.Connection):
+    """
+    Сводные таблицы для GUI: по (дата, категория), (дата, приложение)
+    и за всё время. Обновляются триггерами в той же транзакции, что и track_days.
+    Для существующей базы при первом создании заполняются из track_days.
+    """
+    exists = con.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'trigger' AND name = 'track_days_rollup_insert'"
+    ).fetchone()
+    if exists:
+        return
+
+    script = ["BEGIN;"]
+    for table, (keys, extra) in ROLLUPS.items():
+        columns = "".join(f"{c} INTEGER, " for c in keys + extra)
+        script.append(f"""
+        CREATE TABLE IF NOT EXISTS {table}(
+            {columns}seconds INTEGER,
+            PRIMARY KEY ({", ".join(keys)})) WITHOUT ROWID;""")
+        script.append(_rollup_backfill(table))
+    script.extend(f"{trigger};" for trigger in rollup_triggers())
+    script.append("""
+        COMMIT;""")
+    con.executescript("".join(script))
+
+
+def rebuild_rollups(con: sqlite3.Connection):
+    """Пересчитывает сводные таблицы по track_days"""
+    con.executescript("BEGIN;" + "".join(_rollup_backfill(t) for t in ROLLUPS) + "COMMIT;")
+
+
+class Writer:
+    """
+    Единственный поток записи в базу.
+    Задания fn(con, *args) выполняются по очереди на одном соединении,
+    submit() сразу возвращает Future, поэтому вызывающий поток не ждёт диска.
+    Ошибка открытия базы (файл не база, схему не обновить) поднимается из конструктора.
+    """
+    def __init__(self, path: str = DB_PATH):
+        self.path = path
+        self._queue: queue.Queue = queue.Queue()
+        self._ready = threading.Event()
+        self._error: BaseException | None = None
+        self._thread = threading.Thread(target=self._run, daemon=True, name="db-writer")
+        self._thread.start()
+        self._ready.wait()
+        if self._error:
+            self._thread.join()
+            raise self._error
+
+    def submit(self, fn, *args) -> Future:
+        future = Future()
+        self._queue.put((fn, args, future, time.perf_counter()))
+        return future
+
+    def call(self, fn, *args):
+        """Выполняет задание и ждёт результата"""
+        return self.submit(fn, *args).result()
+
+    def close(self):
+        self._queue.put(None)
+        self._thread.join()
+
+    def _run(self):
+        try:
+            con = connect(self.path)
+            try:
+                ensure_schema(con)
+            except BaseException:
+                con.close()
+                raise
+        except BaseException as e:
+            self._error = e
+            return
+        finally:
+            self._ready.set()
+        try:
+            while True:
+                item = self._queue.get()
+                if item is None:
+                    return
+                fn, args, future, queued = item
+                if not future.set_running_or_notify_cancel():
+                    continue
+                # Ожидание в очереди показывает, успевает ли поток записи за трекером
+                started = time.perf_counter()
+                metrics.registry.add("db.queue_wait", started - queued)
+                try:
+                    future.set_result(fn(con, *args))
+                except BaseException as e:
+                    future.set_exception(e)
+                metrics.registry.add("db." + getattr(fn, "__qualname__", "job"), time.perf_counter() - started)
+        finally:
+            con.close()
+
+
+class ReadPool:
+    """Пул переиспользуемых соединений только для чтения"""
+    def __init__(self, path: str = DB_PATH, size: int = READ_CONNECTIONS):
+        self.path = path
+        self._idle: queue.LifoQueue = queue.LifoQueue()
+        self._slots = threading.Semaphore(size)
+
+    @contextmanager
+    def connection(self):
+        self._slots.acquire()
+        try:
+            try:
+                con = self._idle.get_nowait()
+            except queue.Empty:
+                con = connect_readonly(self.path)
+            try:
+                yield con
+            finally:
+                # Незавершённая транзакция чтения удерживала бы старый снимок WAL
+                if con.in_transaction:
+                    con.rollback()
+                self._idle.put(con)
+        finally:
+            self._slots.release()
+
+
+_writers: dict[str, Writer] = {}
+_pools: dict[str, ReadPool] = {}
+_registry_lock = threading.Lock()
+
+
+def writer(path: str = DB_PATH) -> Writer:
+    with _registry_lock:
+        if path not in _writers:
+            _writers[path] = Writer(path)
+        return _writers[path]
+
+
+def read_pool(path: str = DB_PATH) -> ReadPool:
+    with _registry_lock:
+        if path not in _pools:
+            _pools[path] = ReadPool(path)
+        return _pools[path]
+
+
+def intern_app(con: sqlite3.Connection, title: str, process_name: str = None) -> int:
+    with con:
+        con.execute("INSERT INTO apps (title, process_name) VALUES (?, ?) ON CONFLICT(title) DO NOTHING",
+                    (title, process_name))
+    return con.execute("SELECT id FROM apps WHERE title = ?", (title,)).fetchone()[0]
+
+
+def intern_category(con: sqlite3.Connection, name: str) -> int:
+    with con:
+        con.execute("INSERT INTO categories (name) VALUES (?) ON CONFLICT(name) DO NOTHING", (name,))
+    return con.execute("SELECT id FROM categories WHERE name = ?", (name,)).fetchone()[0]
+
+
+class Interner:
+    """
+    Кэш id приложений и категорий.
+    Словари загружаются один раз, новые строки добавляются через поток записи,
+    поэтому известные значения переводятся в id без обращений к базе.
+    """
+    def __init__(self, writer: Writer):
+        self.writer = writer
+        self._apps: dict[str, int] = {}
+        self._categories: dict[str, int] = {}
+        self.reload()
+
+    def reload(self):
+        def load(con: sqlite3.Connection):
+            return (dict(con.execute("SELECT title, id FROM apps")),
+                    dict(con.execute("SELECT name, id FROM categories")))
+        self._apps, self._categories = self.writer.call(load)
+
+    def app_id(self, title: str, process_name: str = None) -> int:
+        app_id = self._apps.get(title)
+        if app_id is None:
+            app_id = self._apps[title] = self.writer.call(intern_app, title, process_name)
+        return app_id
+
+    def category_id(self, name: str) -> int:
+        category_id = self._categories.get(name)
+        if category_id is None:
+            category_id = self._categories[name] = self.writer.call(intern_category, name)
+        return category_id
@@ -1,10 +1,20 @@
+import json
+import math
 import tkinter as tk
 from tkinter import ttk
+import queue
 import threading
+import time
 
+import charts
 import csv_export
+import db
 import main
-from datetime import datetime, timedelta
+import metrics
+import service
+import stats
+from datetime import datetime
+from scheduler import Timer, TimerWheel
 import matplotlib.pyplot as plt
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 from tkinter import messagebox
@@ -17,15 +27,35 @@ class ActivityTrackerApp(tk.Tk):
         self.geometry("1400x900")
         self.resizable(False, False)
         self.minsize(1200, 800)
-        self.db_conn = main.get_db_connection()
+        self.stats_worker = stats.StatsWorker(db.connect_readonly)
+        self.table_rows: dict[str, tuple] = {}
+        self.sort_state: tuple[str, bool] | None = None
+        self.export_cancel: threading.Event | None = None
+        self.heatmap_window: tk.Toplevel | None = None
+        self.heatmap_data = None
+        self.diagnostics_window: tk.Toplevel | None = None
+        # Если запущен main.py --headless, окно подписывается на его итоги вместо своего трекера
+        self.service = service.ServiceClient.connect(main.cfg)
+        self.live = service.LiveTotals()
+        self.last_request = 0.0
+        # Все периодические обновления окна - таймеры одного колеса, его крутит единственный after()
+        self.timers = TimerWheel()
+        self.timers_job: str | None = None
+        self.timers_at = 0.0
+        self.tracker_events = TrackerEvents()
         self.theme_mode = "dark"  # Начальная тема
         self.setup_theme()
         self.setup_ui()
-        self.update_data()
         self.protocol("WM_DELETE_WINDOW", self.on_close)
+        # Скрытая панель диагностики
+        self.bind_all("<Control-Shift-D>", lambda e: self.toggle_diagnostics())
 
-        tracker_thread = threading.Thread(target=run_tracker, daemon=True)
-        tracker_thread.start()
+        if self.service:
+            self.service.subscribe()
+            self.request_data()
+            self.schedule(0.2, self.poll_service, interval=0.2, key="service")
+        else:
+            self.start_tracker()
         # self.bind("<Configure>", self.on_window_resize) # doesn't work
 
     def setup_theme(self):
@@ -75,17 +105,17 @@ class ActivityTrackerApp(tk.Tk):
         self.theme_btn.pack(side=tk.RIGHT, padx=5)
 
         # Остальные элементы управления...
-        self.mode_var = tk.StringVar(value="Общая статистика")
+        self.mode_var = tk.StringVar(value=stats.MODE_ALL)
         mode_menu = ttk.Combobox(
             control_frame,
             textvariable=self.mode_var,
-            values=["Общая статистика", "Статистика за день", "Статистика за вчера"],
+            values=stats.MODES,
             state="readonly",
             font=('Segoe UI', 10),
             width=20
         )
         mode_menu.pack(side=tk.LEFT, padx=5)
-        mode_menu.bind("<<ComboboxSelected>>", lambda e: self.update_data())
+        mode_menu.bind("<<ComboboxSelected>>", lambda e: self.request_data())
 
         self.toggle_btn = ttk.Button(
             control_frame,
@@ -101,6 +131,13 @@ class ActivityTrackerApp(tk.Tk):
         )
         self.export_btn.pack(side=tk.RIGHT, padx=5)
 
+        self.heatmap_btn = ttk.Button(
+            control_frame,
+            text="Тепловая карта",
+            command=self.toggle_heatmap
+        )
+        self.heatmap_btn.pack(side=tk.RIGHT, padx=5)
+
         # Таблица и графики...
         self.setup_table()
         self.setup_charts()
@@ -110,7 +147,39 @@ class ActivityTrackerApp(tk.Tk):
         self.status_bar.grid(row=1, column=0, sticky='ew')
 
     def export_to_csv(self):
-        messagebox.showinfo(title='Результат', message=csv_export.export())
+        # Повторное нажатие во время экспорта отменяет его
+        if self.export_cancel:
+            self.export_cancel.set()
+            return
+        self.export_events = queue.Queue()
+        self.export_cancel = csv_export.export_async(
+            lambda message: self.export_events.put(("done", message)),
+            progress=lambda done, total: self.export_events.put(("progress", (done, total)))
+        )
+        self.export_btn.config(text="Отмена")
+        self.schedule(0.1, self.poll_export, interval=0.1, key="export")
+
+    def poll_export(self):
+        progress, message = None, None
+        while True:
+            try:
+                kind, payload = self.export_events.get_nowait()
+            except queue.Empty:
+                break
+            if kind == "progress":
+                progress = payload
+            else:
+                message = payload
+        if progress:
+            done, total = progress
+            self.status_bar.config(text=f"Экспорт: {done} из {total} строк")
+        if message is None:
+            return
+        self.timers.cancel("export")
+        self.export_cancel = None
+        self.export_btn.config(text="Экспорт")
+        self.status_bar.config(text="Готово")
+        messagebox.showinfo(title='Результат', message=message)
 
     def toggle_theme(self):
         # Переключение между темами
@@ -128,25 +197,14 @@ class ActivityTrackerApp(tk.Tk):
         self.status_bar.config(text=f"Тема изменена на {'светлую' if self.theme_mode == 'light' else 'тёмную'}")
 
     def update_chart_colors(self):
-        # Обновление цветов графиков
-        for fig, ax in [(self.category_fig, self.category_ax),
-                        (self.apps_fig, self.apps_ax)]:
-            fig.patch.set_facecolor(self.bg_color)
-            ax.set_facecolor(self.bg_color)
-
-            for text in ax.texts:
-                text.set_color(self.text_color)
-
-            if ax.title.get_text():
-                ax.title.set_color(self.text_color)
-
-            if ax.get_legend():
-                ax.get_legend().get_title().set_color(self.text_color)
-                for text in ax.get_legend().get_texts():
-                    text.set_color(self.text_color)
-
-        self.category_canvas.draw_idle()
-        self.apps_canvas.draw_idle()
+        # Обновление цветов существующих графиков без их пересоздания
+        for chart in (self.category_chart, self.apps_chart):
+            chart.apply_theme(self.bg_color, self.text_color)
+        self.charts_stale = True
+        self.flush_charts()
+        if self.heatmap_window:
+            self.heatmap_chart.apply_theme(self.bg_color, self.text_color)
+            self.heatmap_canvas.draw_idle()
 
     def update_widget_styles(self):
         # Обновление стилей для виджетов
@@ -196,166 +254,350 @@ class ActivityTrackerApp(tk.Tk):
         self.stats_tree.pack(fill=tk.BOTH, expand=True)
 
     def sort_column(self, col, reverse):
+        self.sort_state = (col, reverse)
+        self.apply_sort()
+        self.stats_tree.heading(col, command=lambda: self.sort_column(col, not reverse))
+
+    def apply_sort(self):
+        col, reverse = self.sort_state
+        numeric = col in ('seconds', 'percentage')
         data = [(self.stats_tree.set(child, col), child) for child in self.stats_tree.get_children('')]
-        data.sort(reverse=reverse, key=lambda x: x[0].lower() if col != 'seconds' else float(x[0]))
+        data.sort(reverse=reverse, key=lambda x: x[0].lower() if not numeric else float(x[0]))
 
         for index, (val, child) in enumerate(data):
             self.stats_tree.move(child, '', index)
             tag = 'even' if index % 2 == 0 else 'odd'
             self.stats_tree.item(child, tags=(tag,))
 
-        self.stats_tree.heading(col, command=lambda: self.sort_column(col, not reverse))
+    def patch_table(self, rows: list[tuple]):
+        """Обновляет в таблице только изменившиеся строки, сохраняя выделение и прокрутку"""
+        new_rows = {f"row:{row[0]}": row for row in rows}
+        stale = [iid for iid in self.table_rows if iid not in new_rows]
+        if stale:
+            self.stats_tree.delete(*stale)
+
+        for index, (iid, values) in enumerate(new_rows.items()):
+            old = self.table_rows.get(iid)
+            if old is None:
+                self.stats_tree.insert('', index if not self.sort_state else 'end', iid=iid, values=values)
+            elif old != values:
+                self.stats_tree.item(iid, values=values)
+            if not self.sort_state and self.stats_tree.index(iid) != index:
+                self.stats_tree.move(iid, '', index)
+        self.table_rows = new_rows
+
+        if self.sort_state:
+            self.apply_sort()
 
     def setup_charts(self):
         self.chart_container = ttk.Frame(self.right_panel)
         self.chart_container.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+        self.charts_visible = True
+        # Данные, пришедшие пока графики скрыты, и необходимость перерисовки
+        self.pending_chart_data = None
+        self.charts_stale = False
 
         # Category chart
         self.category_fig, self.category_ax = plt.subplots(figsize=(8, 4), dpi=100)
         self.category_fig.patch.set_facecolor(self.bg_color)
         self.category_canvas = FigureCanvasTkAgg(self.category_fig, self.chart_container)
         self.category_canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True, pady=5)
+        self.category_chart = charts.PieChart(self.category_ax, self.bg_color, self.text_color)
 
         # App chart
         self.apps_fig, self.apps_ax = plt.subplots(figsize=(8, 4), dpi=100)
         self.apps_fig.patch.set_facecolor(self.bg_color)
         self.apps_canvas = FigureCanvasTkAgg(self.apps_fig, self.chart_container)
         self.apps_canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True, pady=5)
+        self.apps_chart = charts.BarChart(self.apps_ax, self.bg_color, self.text_color)
+
+        # После разворачивания окна применяем отложенные обновления
+        self.bind("<Map>", lambda e: self.flush_charts() if e.widget is self else None)
+
+    def charts_shown(self) -> bool:
+        return self.charts_visible and self.state() != "iconic"
 
     def update_charts(self, category_data, app_data):
-        # Очистка предыдущих графиков
-        self.category_ax.clear()
-        self.apps_ax.clear()
-
-        # Установка цветов в соответствии с темой
-        colors = plt.cm.tab20.colors
-        self.category_ax.set_facecolor(self.bg_color)
-        self.apps_ax.set_facecolor(self.bg_color)
-
-        legend_params = {
-            'loc': 'upper left',
-            'bbox_to_anchor': (0, 1),
-            'fontsize': 8
-        }
-
-        if category_data:
-            labels, sizes = zip(*category_data)
-            total = sum(sizes)
-            percentages = [f'{(s / total) * 100:.1f}%' for s in sizes]
-
-            wedges, texts = self.category_ax.pie(
-                sizes,
-                # labels=percentages, # мне не нужно это на графике
-                colors=colors,
-                startangle=140,
-                wedgeprops={'linewidth': 1.5, 'edgecolor': 'w'},
-                pctdistance=0.85,
-                textprops={'color': self.text_color, 'fontsize': 9}
-            )
-
-            self.category_ax.axis('equal')
-            self.category_ax.set_title('Распределение по категориям',
-                                       color=self.text_color, pad=20)
-
-            self.category_ax.legend(
-                wedges,
-                labels,
-                title="Категории",
-                **legend_params
-            )
-
-        if app_data:
-            labels, sizes = zip(*app_data)
-            bars = self.apps_ax.barh(labels, sizes, color=colors)
-            self.apps_ax.bar_label(bars, padding=5, color=self.text_color, fmt='%d сек')
-            self.apps_ax.tick_params(axis='both', colors=self.text_color)
-            self.apps_ax.set_title('Топ приложений', color=self.text_color, pad=15)
-
-        # Обновление canvas
-        self.category_canvas.draw()
-        self.apps_canvas.draw()
+        # Скрытые графики не рисуем, а запоминаем последние данные
+        self.pending_chart_data = (category_data, app_data)
+        self.flush_charts()
+
+    def flush_charts(self):
+        if not self.charts_shown():
+            return
+        if self.pending_chart_data:
+            category_data, app_data = self.pending_chart_data
+            self.pending_chart_data = None
+            if self.category_chart.update(category_data):
+                self.category_canvas.draw_idle()
+            if self.apps_chart.update(app_data):
+                self.apps_canvas.draw_idle()
+        if self.charts_stale:
+            self.charts_stale = False
+            self.category_canvas.draw_idle()
+            self.apps_canvas.draw_idle()
 
     def toggle_charts(self):
-        if self.chart_container.winfo_ismapped():
+        if self.charts_visible:
             self.chart_container.pack_forget()
+            self.charts_visible = False
             self.toggle_btn.config(text="▼ Показать графики")
         else:
             self.chart_container.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+            self.charts_visible = True
             self.toggle_btn.config(text="▲ Скрыть графики")
+            self.flush_charts()
+
+    def toggle_heatmap(self):
+        if self.heatmap_window:
+            self.close_heatmap()
+            return
+        self.heatmap_window = tk.Toplevel(self)
+        self.heatmap_window.title("Активность по часам")
+        self.heatmap_window.protocol("WM_DELETE_WINDOW", self.close_heatmap)
+
+        self.heatmap_fig, heatmap_ax = plt.subplots(figsize=(9, 4), dpi=100)
+        self.heatmap_fig.patch.set_facecolor(self.bg_color)
+        self.heatmap_canvas = FigureCanvasTkAgg(self.heatmap_fig, self.heatmap_window)
+        self.heatmap_canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+        self.heatmap_chart = charts.HeatmapChart(heatmap_ax, self.bg_color, self.text_color)
+        self.update_heatmap()
+        # Пока окно закрыто, карта не считается: запрашиваем свежую
+        self.request_data()
+
+    def close_heatmap(self):
+        plt.close(self.heatmap_fig)
+        self.heatmap_window.destroy()
+        self.heatmap_window = None
+
+    def update_heatmap(self):
+        # Данные считаются в StatsWorker, пока окно открыто, окно только перерисовывается
+        if self.heatmap_window and self.heatmap_data is not None:
+            if self.heatmap_chart.update(self.heatmap_data):
+                self.heatmap_canvas.draw_idle()
+
+    def toggle_diagnostics(self):
+        if self.diagnostics_window:
+            self.close_diagnostics()
+            return
+        self.diagnostics_window = tk.Toplevel(self)
+        self.diagnostics_window.title("Диагностика")
+        self.diagnostics_window.geometry("760x420")
+        self.diagnostics_window.protocol("WM_DELETE_WINDOW", self.close_diagnostics)
+
+        buttons = ttk.Frame(self.diagnostics_window)
+        buttons.pack(fill=tk.X, pady=5)
+        self.profile_btn = ttk.Button(buttons, command=self.toggle_profile)
+        self.profile_btn.pack(side=tk.LEFT, padx=5)
+        ttk.Button(buttons, text="Сохранить JSON", command=self.dump_metrics).pack(side=tk.LEFT, padx=5)
+
+        columns = ("count", "p50", "p95", "p99", "max")
+        self.metrics_tree = ttk.Treeview(self.diagnostics_window, columns=columns)
+        self.metrics_tree.heading("#0", text="Стадия")
+        self.metrics_tree.column("#0", width=260)
+        for col, text in zip(columns, ("Замеров", "p50, мс", "p95, мс", "p99, мс", "max, мс")):
+            self.metrics_tree.heading(col, text=text)
+            self.metrics_tree.column(col, width=90, anchor=tk.E)
+        self.metrics_tree.pack(fill=tk.BOTH, expand=True)
+        self.schedule(0, self.update_diagnostics, interval=1, key="diagnostics")
+
+    def close_diagnostics(self):
+        self.timers.cancel("diagnostics")
+        self.diagnostics_window.destroy()
+        self.diagnostics_window = None
+
+    def collect_metrics(self) -> dict:
+        # Трекер в демоне пишет метрики в своём процессе
+        snapshot = metrics.registry.snapshot()
+        if self.service:
+            try:
+                snapshot |= {f"service.{name}": value
+                             for name, value in self.service.request("metrics", timeout=1).items()}
+            except (OSError, service.ServiceError):
+                pass
+        return snapshot
+
+    def profiling(self) -> bool:
+        if self.service:
+            try:
+                return self.service.request("profile", timeout=1)["running"]
+            except (OSError, service.ServiceError):
+                return False
+        return metrics.profiler.wanted
+
+    def update_diagnostics(self):
+        if not self.diagnostics_window:
+            return
+        for name, value in self.collect_metrics().items():
+            values = (value["count"],) + tuple(
+                f"{value[key]:.3f}" for key in ("p50_ms", "p95_ms", "p99_ms", "max_ms"))
+            if self.metrics_tree.exists(name):
+                self.metrics_tree.item(name, values=values)
+            else:
+                self.metrics_tree.insert("", tk.END, iid=name, text=name, values=values)
+        self.profile_btn.config(text="Остановить профилирование" if self.profiling() else "cProfile трекера")
+
+    def toggle_profile(self):
+        # Профилируется поток трекера: в окне или в демоне
+        if self.service:
+            try:
+                result = self.service.request("profile", toggle=True)
+            except (OSError, service.ServiceError) as e:
+                self.status_bar.config(text=f"Не удалось переключить профилирование в службе: {e}")
+                return
+            running, path = result["running"], result["path"]
+        else:
+            running, path = metrics.profiler.toggle(), metrics.profiler.path
+        if not running and path:
+            self.status_bar.config(text=f"Профиль трекера будет сохранён в {path}")
+        self.profile_btn.config(text="Остановить профилирование" if running else "cProfile трекера")
 
-    def update_data(self):
+    def dump_metrics(self):
+        path = f"metrics-{datetime.now():%Y%m%d-%H%M%S}.json"
         try:
-            cur = self.db_conn.cursor()
-            today = datetime.now().date().isoformat()
-            yesterday = (datetime.now() - timedelta(1)).strftime("%Y-%m-%d")
-            mode = self.mode_var.get()
-
-            # Базовые условия для запросов
-            where_clause = "WHERE date = ?" if mode == "Статистика за день" or mode == "Статистика за вчера" else ""
-            params = (today,) if mode == "Статистика за день" else (yesterday,) if mode == "Статистика за вчера" else ()
-
-            # Получаем данные для категорий
-            category_query = f"""
-                SELECT category, SUM(seconds) 
-                FROM track 
-                {where_clause}
-                GROUP BY category 
-                ORDER BY SUM(seconds) DESC
-            """
-            category_data = cur.execute(category_query, params).fetchall()
-
-            # Получаем данные для приложений
-            app_query = f"""
-                SELECT title, SUM(seconds) 
-                FROM track 
-                {where_clause}
-                GROUP BY title 
-                ORDER BY SUM(seconds) DESC 
-                LIMIT 10
-            """
-            app_data = cur.execute(app_query, params).fetchall()
-
-            # Обновляем таблицу
-            self.stats_tree.delete(*self.stats_tree.get_children())
-            table_query = f"""
-                SELECT title, category, SUM(seconds) 
-                FROM track 
-                {where_clause}
-                GROUP BY title 
-                ORDER BY SUM(seconds) DESC
-            """
-            total_time_query = f"""
-                SELECT SUM(seconds)
-                FROM track
-                {where_clause}
-            """
-
-            total_time = cur.execute(total_time_query, params).fetchone()
-
-            # print(total_time)
-            for row in cur.execute(table_query, params):
-                percent = tuple([round(100 * row[2] / total_time[0] if total_time else 1, 2)])
-                self.stats_tree.insert('', 'end', values=row + percent)
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(self.collect_metrics(), f, ensure_ascii=False, indent=2)
+            self.status_bar.config(text=f"Метрики сохранены в {path}")
+        except OSError as e:
+            messagebox.showerror("Ошибка", f"Не удалось сохранить метрики: {e}")
+
+    def schedule(self, delay: float, fn, *args, **kwargs) -> Timer:
+        """TimerWheel.schedule() в главном потоке окна"""
+        timer = self.timers.schedule(delay, fn, *args, **kwargs)
+        self.arm_timers()
+        return timer
+
+    def arm_timers(self):
+        # after() перезаводится, только если ближайший срок стал раньше
+        deadline = self.timers.next_deadline()
+        if deadline is None or (self.timers_job and self.timers_at <= deadline):
+            return
+        if self.timers_job:
+            self.after_cancel(self.timers_job)
+        self.timers_at = deadline
+        self.timers_job = self.after(max(0, math.ceil((deadline - time.monotonic()) * 1000)), self.run_timers)
+
+    def run_timers(self):
+        self.timers_job = None
+        self.timers.advance()
+        self.arm_timers()
+
+    def start_tracker(self):
+        self.schedule(0, self.request_data, interval=5, key="refresh")
+        self.schedule(1, self.poll_notices, interval=1, key="notices")
+        tracker_thread = threading.Thread(target=run_tracker, args=(self.tracker_events,), daemon=True)
+        tracker_thread.start()
 
-            # Обновляем графики
+    def poll_notices(self):
+        while True:
+            try:
+                self.show_notice(self.tracker_events.notices.get_nowait())
+            except queue.Empty:
+                break
+
+    def show_notice(self, text: str):
+        # Помодоро и скорый лимит: в строку состояния и звуковой сигнал
+        self.status_bar.config(text=text)
+        self.bell()
+
+    def poll_service(self):
+        # События демона: сегодняшний день показывается прямо из присланных итогов,
+        # остальные режимы перечитываются из базы не чаще раза в 5 секунд
+        changed = False
+        while True:
+            try:
+                event = self.service.events.get_nowait()
+            except queue.Empty:
+                break
+            if event["event"] == "closed":
+                # Демон остановлен: трекер запускается в окне, как без демона
+                self.timers.cancel("service")
+                self.service = None
+                self.status_bar.config(text="Служба трекера остановлена, трекер запущен в окне")
+                self.start_tracker()
+                return
+            if event["event"] == "delta":
+                self.live.apply(event)
+                changed = True
+            elif event["event"] == "focus":
+                self.live.current = event["current"]
+            elif event["event"] == "notice":
+                self.show_notice(event["text"])
+        if changed:
+            if self.mode_var.get() == stats.MODE_TODAY and self.live.day == stats.mode_day(stats.MODE_TODAY):
+                self.show_stats(self.live.stats())
+            elif time.monotonic() - self.last_request >= 5:
+                self.request_data()
+
+    def request_data(self, force: bool = False):
+        # Запросы выполняются в фоне, результат забирает poll_results
+        mode = self.mode_var.get()
+        self.last_request = time.monotonic()
+        self.stats_worker.request(mode, stats.mode_day(mode), force, heatmap=self.heatmap_window is not None)
+        self.schedule(0.05, self.poll_results, key="results")
+
+    def poll_results(self):
+        while True:
+            try:
+                kind, payload = self.stats_worker.results.get_nowait()
+            except queue.Empty:
+                break
+            if kind == "data":
+                self.show_stats(payload)
+            elif kind == "error":
+                messagebox.showerror("Ошибка", f"Ошибка обновления данных: {str(payload)}")
+        if self.stats_worker.busy():
+            self.schedule(0.05, self.poll_results, key="results")
+
+    def show_stats(self, result: stats.Stats):
+        if result.mode != self.mode_var.get():
+            return
+        try:
+            stopwatch = metrics.registry.stopwatch("gui.")
+            total = result.total or 1
+            self.patch_table([row + (round(100 * row[2] / total, 2),) for row in result.table_rows])
+            stopwatch.lap("table")
 
-            self.update_charts(category_data, app_data)
+            # Обновляем графики
+            self.update_charts(result.category_data, result.app_data)
+            # Итоги от демона идут без тепловой карты: остаётся последняя из базы
+            if result.heatmap is not None:
+                self.heatmap_data = result.heatmap
+                self.update_heatmap()
+            stopwatch.lap("charts")
+            stopwatch.total("render")
 
             self.status_bar.config(text=f"Данные обновлены: {datetime.now().strftime('%H:%M:%S')}")
         except Exception as e:
             # raise e
             messagebox.showerror("Ошибка", f"Ошибка обновления данных: {str(e)}")
-        finally:
-            self.after(5000, self.update_data)
+
     def on_close(self):
-        self.db_conn.close()
+        if self.service:
+            self.service.close()
+        main.flush()
+        self.stats_worker.close()
         plt.close('all')
         self.destroy()
 
+class TrackerEvents:
+    """observer трекера в потоке окна: уведомления передаются окну через очередь"""
+    def __init__(self):
+        self.notices: queue.Queue[str] = queue.Queue()
+
+    def credit(self, category, day: str, seconds: float):
+        pass
+
+    def focus(self, category):
+        pass
+
+    def notify(self, kind: str, text: str):
+        self.notices.put(text)
+
 
-def run_tracker():
+def run_tracker(observer=None):
     from main import main
-    main()
+    main(observer=observer)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,164 @@
+import time
+from datetime import datetime, timedelta
+
+from categorizer import Category
+
+# process_name приложения простоя в базе: по нему recategorize.py не трогает время простоя
+IDLE_PROCESS = "idle"
+# Право на переключение рабочего стола: без него OpenInputDesktop не откроет экран блокировки
+DESKTOP_SWITCHDESKTOP = 0x0100
+
+
+class IdleSource:
+    """
+    Источник простоя для цикла трекера.
+    idle_seconds() - секунды с последнего ввода с клавиатуры или мыши,
+    locked() - заблокирован ли экран. Базовый класс никогда не сообщает о простое.
+    """
+    def idle_seconds(self) -> float:
+        return 0.0
+
+    def locked(self) -> bool:
+        return False
+
+
+class Win32IdleSource(IdleSource):
+    """GetLastInputInfo и проверка экрана блокировки через OpenInputDesktop/SwitchDesktop"""
+    def __init__(self):
+        import ctypes
+        from ctypes import wintypes
+
+        class LastInputInfo(ctypes.Structure):
+            _fields_ = [("cbSize", wintypes.UINT), ("dwTime", wintypes.DWORD)]
+
+        self._user32 = ctypes.windll.user32
+        self._kernel32 = ctypes.windll.kernel32
+        self._kernel32.GetTickCount.restype = wintypes.DWORD
+        self._user32.OpenInputDesktop.restype = wintypes.HANDLE
+        self._info = LastInputInfo()
+        self._info.cbSize = ctypes.sizeof(LastInputInfo)
+        self._byref = ctypes.byref
+        if not self._user32.GetLastInputInfo(self._byref(self._info)):
+            raise OSError("GetLastInputInfo failed")
+
+    def idle_seconds(self) -> float:
+        if not self._user32.GetLastInputInfo(self._byref(self._info)):
+            return 0.0
+        # Оба счётчика 32-битные и переполняются раз в 49.7 дня
+        return ((self._kernel32.GetTickCount() - self._info.dwTime) & 0xFFFFFFFF) / 1000
+
+    def locked(self) -> bool:
+        desktop = self._user32.OpenInputDesktop(0, False, DESKTOP_SWITCHDESKTOP)
+        if not desktop:
+            return True
+        try:
+            # На экране блокировки переключиться на рабочий стол пользователя нельзя
+            return not self._user32.SwitchDesktop(desktop)
+        finally:
+            self._user32.CloseDesktop(desktop)
+
+
+class FakeIdleSource(IdleSource):
+    """Простой по заданным вручную событиям; часы - те же, что у источника окон"""
+    def __init__(self, clock=time.monotonic):
+        self._clock = clock
+        self._last_input = clock()
+        self._locked = False
+
+    def touch(self):
+        """Ввод пользователя прямо сейчас"""
+        self._last_input = self._clock()
+
+    def set_idle(self, seconds: float):
+        self._last_input = self._clock() - seconds
+
+    def lock(self, locked: bool = True):
+        self._locked = locked
+
+    def idle_seconds(self) -> float:
+        return max(0.0, self._clock() - self._last_input)
+
+    def locked(self) -> bool:
+        return self._locked
+
+
+def create_idle_source(cfg: dict) -> IdleSource:
+    """Создаёт источник по секции idle конфига; без Windows простой не определяется"""
+    backend = cfg.get("idle", {}).get("backend", "auto")
+    if backend in ("auto", "win32"):
+        try:
+            return Win32IdleSource()
+        except (OSError, AttributeError) as e:
+            if backend == "win32":
+                print(f"Idle detection unavailable: {e}")
+    return IdleSource()
+
+
+class IdleMonitor:
+    """
+    Решает, кому засчитать прошедшее время.
+    Порции после последнего ввода придерживаются: если ввод появится раньше,
+    чем простой достигнет threshold секунд, они засчитываются окнам как обычно,
+    иначе (или при блокировке экрана) - псевдокатегории простоя, а трекер
+    переходит в режим suspended. Поэтому простой не приписывается окну,
+    бывшему в фокусе, а выход из простоя учитывается с момента ввода.
+    """
+    def __init__(self, source: IdleSource, threshold: float = 300, name: str = "Простой",
+                 suspended_interval: float = 30):
+        self.source = source
+        self.threshold = threshold
+        self.suspended_interval = suspended_interval
+        self.category = Category(name=name, display_title=name, raw_title=IDLE_PROCESS)
+        self.suspended = False
+        self._held: list[tuple[Category | None, str, float, datetime]] = []
+
+    @classmethod
+    def from_config(cls, cfg: dict, source: IdleSource = None) -> "IdleMonitor":
+        idle_cfg = cfg.get("idle", {})
+        return cls(
+            source or create_idle_source(cfg),
+            threshold=idle_cfg.get("threshold_seconds", 300),
+            name=idle_cfg.get("category", "Простой"),
+            suspended_interval=idle_cfg.get("suspended_interval_seconds", 30)
+        )
+
+    def resolve(self, parts: list[tuple[str, float, datetime]], category: Category | None,
+                now: datetime) -> list[tuple[Category, str, float, datetime]]:
+        """
+        parts - порции scheduler.elapsed(), прошедшие в окне category (None - окна не было).
+        Возвращает окончательные (категория, дата, секунды, окончание) в порядке времени.
+        """
+        self._held += [(category, day, seconds, end) for day, seconds, end in parts]
+        idle = self.source.idle_seconds()
+        if self.source.locked() or idle >= self.threshold:
+            self.suspended = True
+            resolved = [(self.category, day, seconds, end) for _, day, seconds, end in self._held]
+            self._held = []
+            return resolved
+
+        # При выходе из простоя время до ввода - ещё простой, после - снова окнам
+        before = self.category if self.suspended else None
+        self.suspended = False
+        last_input = now - timedelta(seconds=idle)
+        resolved, held = [], []
+        for category, day, seconds, end in self._held:
+            start = end - timedelta(seconds=seconds)
+            if end <= last_input:
+                resolved.append((before or category, day, seconds, end))
+            elif start >= last_input:
+                held.append((category, day, seconds, end))
+            else:
+                active = (last_input - start).total_seconds()
+                resolved.append((before or category, day, active, last_input))
+                held.append((category, day, seconds - active, end))
+        self._held = held
+        return [part for part in resolved if part[0] is not None]
+
+    def active(self) -> bool:
+        """Есть ли ввод: одна проверка источника, без порций и без выхода из suspended"""
+        return not self.source.locked() and self.source.idle_seconds() < self.threshold
+
+    def release(self) -> list[tuple[Category, str, float, datetime]]:
+        """Отдаёт придержанные порции окнам, например при остановке трекера"""
+        held, self._held = self._held, []
+        return [part for part in held if part[0] is not None]
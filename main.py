@@ -1,104 +1,377 @@
-import time
+import argparse
+import atexit
+import threading
 import sqlite3
-import psutil
-from datetime import datetime, timezone, date
+from concurrent.futures import Future
+from datetime import datetime, timedelta, date
 import categorizer
-from categorizer import try_get_active_window_properties as tgw, categorize, Category
+import db
+import metrics
+import window_sources
+from idle import IdleMonitor, IdleSource
+from retention import Retention
+from pomodoro import Pomodoro
+from restrictions import LimitWarnings, RestrictionEngine
+from scheduler import TickScheduler, TimerWheel
+from window_sources import WindowSource
+from categorizer import categorize, Category
 
 cfg = categorizer.load_config()
+storage_cfg = cfg.get("storage", {})
 
+# Журнал текущего трекера, нужен для сброса данных из GUI при закрытии
+_log = None
+# Остановка трекера из другого потока (демон)
+_stop = threading.Event()
 
-def get_db_connection():
-    con = sqlite3.connect("track.db", check_same_thread=False)
-
-    con.cursor().execute("""
-        CREATE TABLE IF NOT EXISTS track(
-            title TEXT,
-            process_name TEXT,
-            category TEXT,
-            seconds INTEGER,
-            date DATE,
-            last_updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            PRIMARY KEY (title, date))
-        """)
 
+def get_db_connection(path: str = db.DB_PATH):
+    con = db.connect(path)
+    db.ensure_schema(con)
     return con
 
 
-def handle_restrictions(category: Category):
-    con = get_db_connection()
-    cur = con.cursor()
-    kill = psutil.Process(category.window.info.pid).kill
-    today = date.today().isoformat()
-
-    # Получаем статистику за текущий день
-    cur.execute("""
-        SELECT SUM(seconds) 
-        FROM track 
-        WHERE title = ? AND date = ?
-    """, (category.display_title, today))
-
-    total_seconds = cur.fetchone()[0] or 0
-
-    if cfg.get("window_restrictions", None):
-        for name, params in cfg["window_restrictions"].items():
-            if name not in category.display_title:
-                continue
-
-            # Проверка дневного лимита
-            mins = params.get("max_minutes_per_day", None)
-            if mins and (total_seconds / 60) > mins:
-                kill()
-
-            # Мгновенная блокировка
-            if params.get("always_blocked", False):
-                kill()
-
-    blocklist = cfg.get("blocklist", None)
-    if blocklist:
-        categories = blocklist.get("categories", [])
-        processes = blocklist.get("processes", [])
-        apps = blocklist.get("apps", [])
-
-        if category.name in categories:
-            kill()
-        if category.window.info.process_name in processes:
-            kill()
-        if any(app in category.display_title for app in apps):
-            kill()
-
-
-def main():
-    con = get_db_connection()
-    cur = con.cursor()
-    today = date.today().isoformat()
+class Span:
+    """Непрерывный отрезок времени в одном окне"""
+    __slots__ = ("id", "start", "end", "title", "category", "app_id", "category_id", "date", "seconds")
+
+    def __init__(self, span_id: int, start: datetime, end: datetime, category: Category, day: str,
+                 app_id: int, category_id: int):
+        self.id = span_id
+        self.start = start
+        self.end = end
+        self.title = category.display_title
+        self.category = category.name
+        self.app_id = app_id
+        self.category_id = category_id
+        self.date = day
+        self.seconds = 0
+
+    def row(self) -> tuple:
+        return (self.id, self.start.isoformat(" ", "seconds"), self.end.isoformat(" ", "seconds"),
+                self.app_id, self.category_id, db.date_key(self.date), self.seconds)
+
+
+class SessionLog:
+    """
+    Журнал отрезков активности (таблица sessions).
+    Новая строка появляется только при смене окна или даты,
+    открытый отрезок сбрасывается раз в flush_interval секунд (таймер цикла трекера)
+    или раньше, когда изменённых отрезков набирается max_entries.
+    Все изменения передаются потоку записи и пишутся одной транзакцией через executemany,
+    и в том же задании Compactor переносит их в дневные итоги track_days:
+    читатели видят время не позже чем через flush_interval секунд.
+    Заголовок и категория хранятся как id из кэша Interner.
+    Дробные остатки секунд переносятся в следующий отрезок того же окна,
+    а при смене дня и остановке трекера округляются в последнем отрезке окна.
+    """
+    # Допустимый разрыв между соседними порциями времени одного отрезка
+    MAX_GAP = timedelta(seconds=1)
+
+    def __init__(self, writer: db.Writer,
+                 flush_interval: float = 30, max_entries: int = 64):
+        self.writer = writer
+        self.interner = db.Interner(writer)
+        self.flush_interval = flush_interval
+        self.max_entries = max_entries
+        self._open: Span | None = None
+        self._dirty: dict[int, Span] = {}
+        # (заголовок, дата) -> (дробный остаток, отрезок, в который он попадёт при округлении)
+        self._carry: dict[tuple[str, str], tuple[float, Span]] = {}
+        self._lock = threading.Lock()
+        self._last_write: Future | None = None
+        self._next_id = writer.call(
+            lambda con: con.execute("SELECT COALESCE(MAX(id), 0) + 1 FROM sessions").fetchone()[0]
+        )
+
+    def add(self, category: Category, day: str, seconds: float, end: datetime):
+        start = end - timedelta(seconds=seconds)
+        key = (category.display_title, day)
+        with self._lock:
+            span = self._open
+            if not (span and span.title == category.display_title and span.category == category.name
+                    and span.date == day and start - span.end <= self.MAX_GAP):
+                span = self._open = Span(
+                    self._next_id, start, end, category, day,
+                    self.interner.app_id(category.display_title, category.raw_title),
+                    self.interner.category_id(category.name)
+                )
+                self._next_id += 1
+                if self._carry and next(iter(self._carry))[1] != day:
+                    self._settle()
+
+            seconds += self._carry.pop(key, (0, None))[0]
+            # Сумма порций вроде 0.1 * 10 даёт 0.9999999: без допуска секунда терялась бы
+            whole = int(seconds + 1e-6)
+            if abs(seconds - whole) > 1e-6:
+                self._carry[key] = (seconds - whole, span)
+            span.end = end
+            if whole:
+                span.seconds += whole
+                self._dirty[span.id] = span
+
+    def _settle(self):
+        for rest, span in self._carry.values():
+            if rest >= 0.5:
+                span.seconds += 1
+                self._dirty[span.id] = span
+        self._carry.clear()
+
+    def settle(self):
+        """Округляет все дробные остатки, например перед остановкой трекера"""
+        with self._lock:
+            self._settle()
+
+    def close_span(self):
+        """Завершает текущий отрезок, например когда активного окна нет"""
+        with self._lock:
+            self._open = None
+
+    def flush_if_due(self):
+        if len(self._dirty) >= self.max_entries:
+            self.flush()
+
+    def flush(self, wait: bool = False):
+        with self._lock:
+            if self._dirty:
+                rows = [span.row() for span in self._dirty.values()]
+                self._dirty.clear()
+                self._last_write = self.writer.submit(self.write_spans, rows)
+                self._last_write.add_done_callback(report_write_error)
+            last_write = self._last_write
+        if wait and last_write:
+            last_write.result()
+
+    @staticmethod
+    def write_spans(con: sqlite3.Connection, rows: list[tuple]):
+        with con:
+            con.executemany("""
+                INSERT INTO sessions (id, start, end, app_id, category_id, date, seconds)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(id) DO UPDATE SET
+                    end = excluded.end,
+                    seconds = excluded.seconds
+            """, rows)
+        Compactor.compact(con)
+
+
+def report_write_error(future: Future):
+    if future.exception():
+        print(f"Failed to write tracked data: {future.exception()}")
+
+
+class Compactor:
+    """
+    Перенос ещё не учтённых секунд из sessions в дневные итоги track_days
+    и часовые корзины track_hours; выполняется потоком записи после каждого сброса журнала.
+    Столбец sessions.compacted хранит уже перенесённую часть отрезка,
+    поэтому открытые отрезки тоже попадают в track_days по мере роста.
+    """
+    @staticmethod
+    def compact(con: sqlite3.Connection):
+        with con:
+            # Новые секунды отрезка относятся к концу отрезка: по ним заполняются часовые корзины
+            db.add_hours(con, con.execute(
+                "SELECT end, seconds - compacted, category_id FROM sessions WHERE seconds > compacted"
+            ).fetchall())
+            # Если за день у приложения отрезки разных категорий (например, после смены конфига),
+            # день получает категорию последнего отрезка: при единственном MAX() SQLite
+            # берёт остальные столбцы из строки с максимумом
+            con.execute("""
+                INSERT INTO track_days (app_id, date, category_id, seconds)
+                SELECT app_id, date, category_id, seconds FROM (
+                    SELECT app_id, date, category_id, SUM(seconds - compacted) AS seconds, MAX(id)
+                    FROM sessions
+                    WHERE seconds > compacted
+                    GROUP BY app_id, date)
+                WHERE true
+                ON CONFLICT(app_id, date) DO UPDATE SET
+                    seconds = seconds + excluded.seconds,
+                    category_id = excluded.category_id,
+                    last_updated = CURRENT_TIMESTAMP
+            """)
+            con.execute("UPDATE sessions SET compacted = seconds WHERE seconds > compacted")
+
+
+# Ограничения проверяются по счётчикам в памяти, без запросов к базе на каждом тике
+_restrictions = RestrictionEngine(lambda: db.read_pool().connection())
+
+
+def flush():
+    """Сбрасывает накопленные трекером данные в базу и переносит их в track_days"""
+    if _log:
+        try:
+            _log.settle()
+            _log.flush(wait=True)
+        except sqlite3.Error as e:
+            print(f"Failed to flush tracked data: {e}")
+
+
+# Один обработчик на процесс: main() может запускаться повторно (демон, GUI), а flush() без трекера ничего не делает
+atexit.register(flush)
+
+
+def handle_restrictions(category: Category, day: str = None):
+    day = day or date.today().isoformat()
+    _restrictions.check(category, day)
+
+
+def stop():
+    """Просит цикл трекера завершиться после текущего ожидания"""
+    _stop.set()
+
+
+def main(source: WindowSource = None, observer=None, idle_source: IdleSource = None):
+    """
+    Цикл трекера. observer, если задан, получает каждую порцию времени
+    (observer.credit(category, day, seconds)), смену окна (observer.focus(category или None))
+    и уведомления помодоро и лимитов (observer.notify(kind, text)).
+    idle_source подменяет определение простоя из конфига, например FakeIdleSource для воспроизведения.
+    Всё периодическое - тик, сброс журнала с переносом в track_days, архивация, метрики,
+    помодоро и предупреждения о лимитах - стоит на одном колесе таймеров,
+    и поток спит до ближайшего срока или до смены окна.
+    """
+    global _log
+    _stop.clear()
+    dumper = metrics.configure(cfg)
+    writer = db.writer()
+    source = source or window_sources.create_source(cfg)
+    _restrictions.kills = source.kills
+    scheduler = TickScheduler.from_config(cfg, source.monotonic, source.now)
+    idle_monitor = IdleMonitor.from_config(cfg, idle_source)
+    wheel = TimerWheel(clock=source.monotonic)
+    _log = SessionLog(
+        writer,
+        flush_interval=storage_cfg.get("flush_interval_seconds", 30),
+        max_entries=storage_cfg.get("flush_max_entries", 64)
+    )
+
+    def notify(kind: str, text: str):
+        print(text)
+        if observer:
+            observer.notify(kind, text)
+
+    pomodoro = Pomodoro.from_config(cfg, wheel, notify)
+    warnings = LimitWarnings(_restrictions, wheel, notify,
+                             cfg.get("tracker", {}).get("limit_warnings_minutes", (10, 5, 1)))
+    # Окно, которое было активно с прошлого тика
+    current: Category | None = None
+    # Последнее, о чём сообщили observer.focus(): окно или простой
+    announced: str | None = None
+    # Фокус сменился во время простоя: окно перечитывается, чтобы после ввода время не ушло прежнему
+    refocused = False
+
+    def give(parts):
+        for category, day, seconds, end in parts:
+            _log.add(category, day, seconds, end)
+            if category is not idle_monitor.category:
+                _restrictions.record(category.display_title, day, seconds)
+            if observer:
+                observer.credit(category, day, seconds)
+
+    def credit():
+        # Прошедшее время засчитывается окну, бывшему в фокусе, или простою
+        give(idle_monitor.resolve(scheduler.elapsed(), current, source.now()))
+
+    # Время стадий тика: метрики tick.* в metrics.registry
+    stopwatch = metrics.registry.stopwatch("tick.")
+
+    def wake():
+        # Во время простоя ввод проверяется дёшево на обычном интервале опроса: трекинг,
+        # ограничения, предупреждения и помодоро возобновляются сразу, а не через suspended_interval
+        if not idle_monitor.suspended:
+            return
+        if idle_monitor.active():
+            wheel.schedule(0, tick, key="tick")
+        else:
+            wheel.schedule(scheduler.max_interval, wake, key="wake")
+
+    def tick():
+        nonlocal current, announced, refocused
+        try:
+            metrics.profiler.sync()
+            stopwatch.start()
+            was_suspended = idle_monitor.suspended
+            credit()
+            stopwatch.lap("credit")
+            if idle_monitor.suspended:
+                # За компьютером никого нет: окно не опрашивается, простой засчитывается реже, ввод ждёт wake()
+                if not was_suspended:
+                    warnings.focus(None)
+                    if pomodoro:
+                        pomodoro.pause()
+                if refocused:
+                    window = source.poll()
+                    current = categorize(window) if window else None
+                if observer and announced != idle_monitor.category.display_title:
+                    observer.focus(idle_monitor.category)
+                    announced = idle_monitor.category.display_title
+                return
+            if was_suspended and pomodoro:
+                pomodoro.start()
+
+            window = source.poll()
+            stopwatch.lap("poll")
+            category = categorize(window) if window else None
+            stopwatch.lap("categorize")
+            scheduler.note_focus(
+                (category and category.display_title) != (current and current.display_title)
+            )
+            if category:
+                handle_restrictions(category, scheduler.today.isoformat())
+            else:
+                _log.close_span()
+            warnings.focus(category and category.display_title)
+            stopwatch.lap("restrictions")
+            if observer and (category and category.display_title) != announced:
+                observer.focus(category)
+                announced = category and category.display_title
+            current = category
+
+            _log.flush_if_due()
+            stopwatch.lap("flush")
+            stopwatch.total()
+        finally:
+            refocused = False
+            if idle_monitor.suspended:
+                wheel.schedule(idle_monitor.suspended_interval, tick, key="tick")
+                wheel.schedule(scheduler.max_interval, wake, key="wake")
+            else:
+                wheel.schedule(scheduler.delay(), tick, key="tick")
+
+    wheel.schedule(0, tick, key="tick")
+    wheel.schedule(_log.flush_interval, _log.flush, interval=_log.flush_interval)
+    Retention(writer, cfg, source.now).schedule(wheel)
+    if dumper:
+        dumper.schedule(wheel)
+    if pomodoro:
+        pomodoro.start()
 
     try:
-        while True:
-            window = tgw()
-            if not window:
-                time.sleep(1)
-                continue
-
-            category = categorize(window)
-            handle_restrictions(category)
-
-            with con:
-                # Обновляем или создаем запись для текущего дня
-                cur.execute("""
-                    INSERT INTO track (title, process_name, category, seconds, date)
-                    VALUES (?, ?, ?, 1, ?)
-                    ON CONFLICT(title, date) DO UPDATE SET
-                        seconds = seconds + 1,
-                        last_updated = CURRENT_TIMESTAMP
-                """, (category.display_title, category.raw_title, category.name, today))
-
-                con.commit()
-            time.sleep(1)
+        while not source.exhausted and not _stop.is_set():
+            timeout = max(0.0, wheel.next_deadline() - source.monotonic())
+            if source.wait(timeout):
+                # Окно сменилось раньше срока: тик сразу, а не по расписанию.
+                # Во время простоя тоже - смена окна скорее всего значит, что пользователь вернулся
+                refocused = idle_monitor.suspended
+                wheel.schedule(0, tick, key="tick")
+            wheel.advance()
+
+        credit()
+        # Придержанное при остановке время простоем не стало: засчитываем его окнам
+        give(idle_monitor.release())
 
     except KeyboardInterrupt:
-        con.close()
-        print("Database connection closed")
+        pass
+    finally:
+        metrics.profiler.wanted = False
+        metrics.profiler.sync()
+        if dumper:
+            dumper.dump()
+        flush()
+        _log = None
+        source.close()
+        print("Tracker stopped")
 
 def insert_debug_entry(title: str, process_name: str, category: str,
                        seconds: int, target_date: str):
@@ -118,12 +391,10 @@ def insert_debug_entry(title: str, process_name: str, category: str,
     cur = con.cursor()
 
     try:
+        # Вставка в представление track заменяет существующую запись за эту дату
         cur.execute("""
             INSERT INTO track (title, process_name, category, seconds, date)
             VALUES (?, ?, ?, ?, ?)
-            ON CONFLICT(title, date) DO UPDATE SET
-                seconds = excluded.seconds,
-                last_updated = CURRENT_TIMESTAMP
         """, (title, process_name, category, seconds, target_date))
 
         con.commit()
@@ -142,4 +413,16 @@ if __name__ == "__main__":
     #     seconds=9999,
     #     process_name="sasdoas"
     # )
-    main()
+    parser = argparse.ArgumentParser(description="Трекер активности")
+    parser.add_argument("--headless", action="store_true",
+                        help="работать без окна и отвечать на запросы по локальному сокету (service.py)")
+    args = parser.parse_args()
+
+    if args.headless:
+        import service
+        try:
+            service.TrackerService(cfg).run()
+        except service.ServiceError as e:
+            print(e)
+    else:
+        main()
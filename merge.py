@@ -0,0 +1,286 @@
+import argparse
+import glob
+import hashlib
+import os
+import sqlite3
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import db
+import retention
+
+POLICY_SUM = "sum"
+POLICY_LATEST = "latest"
+POLICIES = [POLICY_SUM, POLICY_LATEST]
+
+MERGE_TABLES = """
+    CREATE TABLE IF NOT EXISTS merge_sources(
+        id INTEGER PRIMARY KEY,
+        path TEXT NOT NULL UNIQUE,
+        digest TEXT,
+        rows INTEGER,
+        seconds INTEGER,
+        merged_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP);
+    -- Вклад каждого источника: по нему итоги пересчитываются при повторном слиянии
+    CREATE TABLE IF NOT EXISTS merge_rows(
+        source_id INTEGER NOT NULL,
+        app_id INTEGER NOT NULL,
+        date INTEGER NOT NULL,
+        category_id INTEGER NOT NULL,
+        seconds INTEGER NOT NULL,
+        last_updated TIMESTAMP,
+        PRIMARY KEY (app_id, date, source_id, category_id)) WITHOUT ROWID;
+    CREATE INDEX IF NOT EXISTS merge_rows_source ON merge_rows(source_id);
+    CREATE TABLE IF NOT EXISTS merge_settings(
+        key TEXT PRIMARY KEY,
+        value TEXT);
+"""
+
+
+def file_digest(path: str) -> str:
+    """sha1 файла базы вместе с её WAL, если он есть"""
+    digest = hashlib.sha1()
+    for part in (path, path + "-wal"):
+        if not os.path.exists(part):
+            continue
+        with open(part, "rb") as f:
+            while chunk := f.read(1 << 20):
+                digest.update(chunk)
+    return digest.hexdigest()
+
+
+def archive_file(source: str, archive: str | None) -> str | None:
+    """
+    Файл архива месяца источника. retention.py записывает путь относительно
+    рабочего каталога трекера, поэтому сначала он ищется рядом с базой источника.
+    """
+    if not archive:
+        return None
+    candidates = [archive] if os.path.isabs(archive) else [
+        os.path.join(os.path.dirname(source), archive), archive]
+    return next((path for path in candidates if os.path.exists(path)), None)
+
+
+def archived_rows(con: sqlite3.Connection, source: str) -> list[tuple]:
+    """
+    Строки месяцев, вынесенных retention.py в файлы архива, в том же виде, что и строки track.
+    Месяц без файла (архивация без archive_dir или файл не скопирован) сохранился
+    только итогами за всё время, без дат: такой источник не сливается,
+    иначе его время молча пропало бы из отчёта.
+    """
+    if not con.execute("SELECT 1 FROM sqlite_master WHERE name = 'archive_months'").fetchone():
+        return []
+    rows = []
+    for month, archive in con.execute("SELECT month, path FROM archive_months ORDER BY month").fetchall():
+        path = archive_file(source, archive)
+        if path is None:
+            raise FileNotFoundError(f"нет файла архива за {month // 100}-{month % 100:02d}")
+        with retention.attached(con, f"file:{path}?mode=ro"):
+            rows += con.execute(f"""
+                SELECT a.title, MAX(a.process_name), c.name, {db.SQL_DATE_STR.format("t.date")},
+                       SUM(t.seconds), MAX(t.last_updated)
+                FROM archive.track_days t
+                JOIN apps a ON a.id = t.app_id
+                JOIN categories c ON c.id = t.category_id
+                GROUP BY a.title, c.name, t.date
+            """).fetchall()
+    return rows
+
+
+def aggregate(path: str, known_digest: str = None) -> tuple[str, str, list[tuple] | None]:
+    """
+    Выполняется в процессе пула: считает хэш источника и, если он изменился,
+    возвращает строки track вместе с архивами источника, сгруппированные по (title, category, date).
+    Читается представление или таблица track, поэтому подходят базы и старой, и новой схемы.
+    Вынесенные месяцы меняют и саму базу, поэтому хэша основного файла достаточно.
+    """
+    digest = file_digest(path)
+    if digest == known_digest:
+        return path, digest, None
+    con = db.connect(path, readonly=True)
+    try:
+        rows = con.execute("""
+            SELECT title, MAX(process_name), category, date, SUM(seconds), MAX(last_updated)
+            FROM track
+            GROUP BY title, category, date
+        """).fetchall()
+        archived = archived_rows(con, path)
+    finally:
+        con.close()
+    if archived:
+        # Поздние данные за уже вынесенный месяц лежат и в базе, и в архиве: ключи склеиваются
+        merged: dict[tuple, list] = {}
+        for title, process_name, category, day, seconds, last_updated in rows + archived:
+            row = merged.get((title, category, day))
+            if row is None:
+                merged[title, category, day] = [title, process_name, category, day, seconds, last_updated]
+            else:
+                row[1] = max(row[1] or "", process_name or "") or None
+                row[4] = (row[4] or 0) + (seconds or 0)
+                row[5] = max(row[5] or "", last_updated or "") or None
+        rows = [tuple(row) for row in merged.values()]
+    return path, digest, rows
+
+
+def expand_sources(patterns: list[str]) -> list[str]:
+    """Пути, маски и каталоги (все *.db внутри) -> отсортированный список файлов"""
+    paths = set()
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            pattern = os.path.join(pattern, "*.db")
+        paths.update(glob.glob(pattern) or [pattern])
+    return sorted(os.path.abspath(path) for path in paths)
+
+
+def ensure_merge_schema(con: sqlite3.Connection):
+    db.ensure_schema(con)
+    con.executescript(MERGE_TABLES)
+
+
+def stage_source(con: sqlite3.Connection, path: str, digest: str, rows: list[tuple]):
+    """Заменяет вклад источника в merge_rows и отмечает затронутые (приложение, дата)"""
+    con.execute("""
+        INSERT INTO merge_sources (path, digest, rows, seconds) VALUES (?, ?, ?, ?)
+        ON CONFLICT(path) DO UPDATE SET
+            digest = excluded.digest,
+            rows = excluded.rows,
+            seconds = excluded.seconds,
+            merged_at = CURRENT_TIMESTAMP
+    """, (path, digest, len(rows), sum(row[4] or 0 for row in rows)))
+    source_id = con.execute("SELECT id FROM merge_sources WHERE path = ?", (path,)).fetchone()[0]
+
+    con.execute("DELETE FROM merge_stage")
+    con.executemany("INSERT INTO merge_stage VALUES (?, ?, ?, ?, ?, ?)", rows)
+    con.execute("""
+        INSERT INTO apps (title, process_name)
+        SELECT title, MAX(process_name) FROM merge_stage WHERE true GROUP BY title
+        ON CONFLICT(title) DO NOTHING
+    """)
+    con.execute("""
+        INSERT INTO categories (name)
+        SELECT DISTINCT category FROM merge_stage WHERE true
+        ON CONFLICT(name) DO NOTHING
+    """)
+
+    con.execute("""
+        INSERT OR IGNORE INTO merge_affected
+        SELECT app_id, date FROM merge_rows WHERE source_id = ?
+    """, (source_id,))
+    con.execute("DELETE FROM merge_rows WHERE source_id = ?", (source_id,))
+    con.execute(f"""
+        INSERT INTO merge_rows (source_id, app_id, date, category_id, seconds, last_updated)
+        SELECT ?, a.id, {db.SQL_DATE_KEY.format("s.date")}, c.id, s.seconds, s.last_updated
+        FROM merge_stage s
+        JOIN apps a ON a.title = s.title
+        JOIN categories c ON c.name = s.category
+        WHERE s.date IS NOT NULL
+    """, (source_id,))
+    con.execute("""
+        INSERT OR IGNORE INTO merge_affected
+        SELECT app_id, date FROM merge_rows WHERE source_id = ?
+    """, (source_id,))
+
+
+def apply_affected(con: sqlite3.Connection, policy: str):
+    """
+    Пересчитывает track_days для затронутых ключей по вкладам всех источников.
+    sum: секунды складываются, категория и last_updated - от самой свежей строки;
+    latest: берётся самая свежая строка целиком.
+    Равные last_updated разрешаются по id источника и категории, поэтому результат
+    не зависит от порядка завершения процессов пула.
+    """
+    seconds = "SUM(seconds) OVER key" if policy == POLICY_SUM else "seconds"
+    con.execute("""
+        DELETE FROM track_days
+        WHERE (app_id, date) IN (SELECT app_id, date FROM merge_affected)
+    """)
+    con.execute(f"""
+        INSERT INTO track_days (app_id, date, category_id, seconds, last_updated)
+        SELECT app_id, date, category_id, seconds, last_updated FROM (
+            SELECT r.app_id, r.date, r.category_id, {seconds} AS seconds, r.last_updated,
+                   ROW_NUMBER() OVER (key ORDER BY r.last_updated DESC, r.source_id, r.category_id) AS rank
+            FROM merge_rows r
+            JOIN merge_affected m ON m.app_id = r.app_id AND m.date = r.date
+            WINDOW key AS (PARTITION BY r.app_id, r.date))
+        WHERE rank = 1
+    """)
+    con.execute("DELETE FROM merge_affected")
+
+
+def merge(sources: list[str], out_path: str, policy: str = POLICY_SUM,
+          workers: int = None, batch_size: int = 20, progress=None) -> dict:
+    """
+    Сливает базы sources в отчётную базу out_path.
+    Источники читаются и группируются параллельно в пуле процессов,
+    запись идёт одной транзакцией на batch_size источников.
+    Источники с неизменившимся хэшем пропускаются.
+    """
+    con = db.connect(out_path)
+    ensure_merge_schema(con)
+    con.executescript("""
+        CREATE TEMP TABLE IF NOT EXISTS merge_stage(
+            title TEXT, process_name TEXT, category TEXT, date TEXT, seconds INTEGER, last_updated TIMESTAMP);
+        CREATE TEMP TABLE IF NOT EXISTS merge_affected(
+            app_id INTEGER, date INTEGER, PRIMARY KEY (app_id, date)) WITHOUT ROWID;
+    """)
+    known = dict(con.execute("SELECT path, digest FROM merge_sources"))
+    stats = {"merged": 0, "skipped": 0, "failed": 0}
+
+    try:
+        with con:
+            row = con.execute("SELECT value FROM merge_settings WHERE key = 'policy'").fetchone()
+            if row and row[0] != policy:
+                # Другая политика: пересчитать все ключи
+                con.execute("INSERT OR IGNORE INTO merge_affected SELECT app_id, date FROM merge_rows")
+            con.execute("""
+                INSERT INTO merge_settings (key, value) VALUES ('policy', ?)
+                ON CONFLICT(key) DO UPDATE SET value = excluded.value
+            """, (policy,))
+            apply_affected(con, policy)
+
+        pending = 0
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {pool.submit(aggregate, path, known.get(path)): path for path in sources}
+            for done, future in enumerate(as_completed(futures), 1):
+                # Прочитанный результат больше не нужен пулу: строки источника не копятся до конца слияния
+                path = futures.pop(future)
+                try:
+                    path, digest, rows = future.result()
+                except Exception as e:
+                    print(f"Не удалось прочитать {path}: {e}")
+                    stats["failed"] += 1
+                    continue
+                if rows is None:
+                    stats["skipped"] += 1
+                else:
+                    stage_source(con, path, digest, rows)
+                    stats["merged"] += 1
+                    pending += 1
+                    if pending >= batch_size:
+                        apply_affected(con, policy)
+                        con.commit()
+                        pending = 0
+                if progress:
+                    progress(done, len(sources))
+        if pending:
+            apply_affected(con, policy)
+            con.commit()
+    finally:
+        if con.in_transaction:
+            con.rollback()
+        con.close()
+    return stats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Слияние баз track.db с нескольких компьютеров")
+    parser.add_argument("sources", nargs="+", help="файлы, маски или каталоги с базами")
+    parser.add_argument("--out", default="fleet.db")
+    parser.add_argument("--policy", choices=POLICIES, default=POLICY_SUM,
+                        help="sum - складывать время, latest - брать самую свежую запись")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--batch", type=int, default=20, help="источников на транзакцию")
+    args = parser.parse_args()
+
+    result = merge(expand_sources(args.sources), args.out, args.policy, args.workers, args.batch,
+                   progress=lambda done, total: print(f"{done}/{total}", end="\r"))
+    print(f"Слито: {result['merged']}, без изменений: {result['skipped']}, с ошибками: {result['failed']}")
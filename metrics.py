@@ -0,0 +1,191 @@
+import cProfile
+import json
+import os
+import threading
+import time
+from array import array
+from contextlib import contextmanager
+from datetime import datetime
+
+# Корзины гистограммы: степени двойки микросекунд, последняя - всё, что дольше ~35 минут
+BUCKETS = 32
+
+
+class Timings:
+    """
+    Длительности одной стадии: последние size значений в кольцевом буфере
+    (по ним считаются перцентили) и гистограмма по логарифмическим корзинам за всё время.
+    Запись - O(1) без выделения памяти, сортировка буфера - только при чтении.
+    """
+    def __init__(self, size: int = 1024):
+        self._ring = array("d", bytes(8 * size))
+        self._pos = 0
+        self._full = False
+        self._lock = threading.Lock()
+        self.histogram = [0] * BUCKETS
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, seconds: float):
+        bucket = int(seconds * 1e6).bit_length()
+        with self._lock:
+            self._ring[self._pos] = seconds
+            self._pos += 1
+            if self._pos == len(self._ring):
+                self._pos = 0
+                self._full = True
+            self.histogram[bucket if bucket < BUCKETS else BUCKETS - 1] += 1
+            self.count += 1
+            self.total += seconds
+            if seconds > self.max:
+                self.max = seconds
+
+    def recent(self) -> list[float]:
+        with self._lock:
+            return sorted(self._ring if self._full else self._ring[:self._pos])
+
+    def snapshot(self) -> dict:
+        recent = self.recent()
+
+        def percentile(p: float) -> float:
+            return recent[min(int(len(recent) * p / 100), len(recent) - 1)] * 1000 if recent else 0.0
+
+        return {
+            "count": self.count,
+            "mean_ms": self.total / self.count * 1000 if self.count else 0.0,
+            "p50_ms": percentile(50),
+            "p95_ms": percentile(95),
+            "p99_ms": percentile(99),
+            "max_ms": self.max * 1000,
+            # Верхняя граница корзины в мс -> число замеров
+            "histogram": {f"{(1 << bucket) / 1000:g}": n for bucket, n in enumerate(self.histogram) if n},
+        }
+
+
+class Metrics:
+    """Именованные Timings; при enabled=False запись ничего не делает"""
+    def __init__(self, size: int = 1024, enabled: bool = True):
+        self.size = size
+        self.enabled = enabled
+        self._timings: dict[str, Timings] = {}
+        self._lock = threading.Lock()
+
+    def timings(self, name: str) -> Timings:
+        found = self._timings.get(name)
+        if found is None:
+            with self._lock:
+                found = self._timings.setdefault(name, Timings(self.size))
+        return found
+
+    def add(self, name: str, seconds: float):
+        if self.enabled:
+            self.timings(name).add(seconds)
+
+    @contextmanager
+    def time(self, name: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - started)
+
+    def stopwatch(self, prefix: str = "") -> "Stopwatch":
+        return Stopwatch(self, prefix)
+
+    def snapshot(self) -> dict:
+        return {name: timings.snapshot() for name, timings in sorted(self._timings.items())}
+
+    def dump(self, path: str):
+        """Пишет снимок атомарно: читатель файла не увидит его наполовину записанным"""
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"created": datetime.now().isoformat(timespec="seconds"),
+                       "metrics": self.snapshot()}, f, ensure_ascii=False, indent=2)
+        os.replace(tmp, path)
+
+
+class Stopwatch:
+    """Замер стадий подряд: lap(name) записывает время с прошлой отметки"""
+    def __init__(self, metrics: Metrics, prefix: str = ""):
+        self.metrics = metrics
+        self.prefix = prefix
+        self._last = self._start = time.perf_counter()
+
+    def start(self):
+        self._last = self._start = time.perf_counter()
+
+    def lap(self, name: str):
+        now = time.perf_counter()
+        self.metrics.add(self.prefix + name, now - self._last)
+        self._last = now
+
+    def total(self, name: str = "total"):
+        self.metrics.add(self.prefix + name, time.perf_counter() - self._start)
+
+
+class Profiler:
+    """
+    Переключатель cProfile для одного потока. cProfile профилирует только поток,
+    в котором включён, поэтому toggle() лишь запоминает желаемое состояние,
+    а включение и выключение делает sync(), вызываемый в самом потоке (на каждом тике трекера).
+    """
+    def __init__(self, directory: str = "."):
+        self.directory = directory
+        self.wanted = False
+        # Файл, в который попадёт текущий или последний профиль
+        self.path: str | None = None
+        self._profile: cProfile.Profile | None = None
+
+    def toggle(self) -> bool:
+        self.wanted = not self.wanted
+        if self.wanted:
+            self.path = os.path.join(self.directory, f"profile-{datetime.now():%Y%m%d-%H%M%S}.prof")
+        return self.wanted
+
+    def sync(self):
+        if self.wanted == (self._profile is not None):
+            return
+        if self.wanted:
+            self._profile = cProfile.Profile()
+            self._profile.enable()
+        else:
+            self._profile.disable()
+            # Файл открывается через pstats или snakeviz
+            self._profile.dump_stats(self.path)
+            self._profile = None
+
+
+class Dumper:
+    """Периодическая запись снимка метрик в JSON, по секции metrics конфига"""
+    def __init__(self, metrics: Metrics, path: str, interval: float = 60):
+        self.metrics = metrics
+        self.path = path
+        self.interval = interval
+
+    def schedule(self, wheel):
+        """Запись на колесе таймеров трекера; последний снимок пишет сам трекер при остановке"""
+        return wheel.schedule(self.interval, self.dump, interval=self.interval)
+
+    def dump(self):
+        try:
+            self.metrics.dump(self.path)
+        except OSError as e:
+            print(f"Failed to dump metrics: {e}")
+
+
+# Общие метрики процесса: трекер, поток записи и GUI пишут сюда
+registry = Metrics()
+# cProfile для потока трекера
+profiler = Profiler()
+
+
+def configure(cfg: dict) -> Dumper | None:
+    """Применяет секцию metrics конфига; возвращает Dumper, если задан dump_path"""
+    metrics_cfg = cfg.get("metrics", {})
+    registry.enabled = metrics_cfg.get("enabled", True)
+    registry.size = metrics_cfg.get("ring_size", 1024)
+    profiler.directory = metrics_cfg.get("profile_dir", ".")
+    if metrics_cfg.get("dump_path"):
+        return Dumper(registry, metrics_cfg["dump_path"], metrics_cfg.get("dump_interval_seconds", 60))
+    return None
@@ -0,0 +1,42 @@
+import categorizer
+from scheduler import TimerWheel
+
+WORK = "work"
+BREAK = "break"
+
+
+class Pomodoro:
+    """
+    Чередование работы и перерыва по секции pomodoro конфига на таймерах колеса трекера.
+    notify(kind, text) получает сообщение при каждой смене фазы.
+    Простой прерывает цикл: после возвращения отсчёт начинается с новой работы.
+    """
+    KEY = "pomodoro"
+
+    def __init__(self, wheel: TimerWheel, notify, work_minutes: float = 25, break_minutes: float = 5):
+        self.wheel = wheel
+        self.notify = notify
+        self.durations = {WORK: work_minutes * 60, BREAK: break_minutes * 60}
+        self.phase: str | None = None
+
+    @classmethod
+    def from_config(cls, cfg: dict, wheel: TimerWheel, notify) -> "Pomodoro | None":
+        settings = categorizer.get_pomodoro(cfg)
+        if not settings:
+            return None
+        return cls(wheel, notify, settings["work_minutes"], settings["break_minutes"])
+
+    def start(self):
+        self._enter(WORK)
+
+    def pause(self):
+        self.wheel.cancel(self.KEY)
+        self.phase = None
+
+    def _enter(self, phase: str):
+        self.phase = phase
+        minutes = self.durations[phase] / 60
+        self.notify("pomodoro", f"Помодоро: {'работа' if phase == WORK else 'перерыв'} {minutes:g} мин")
+        self.wheel.cancel(self.KEY)
+        self.wheel.schedule(self.durations[phase], self._enter, BREAK if phase == WORK else WORK,
+                            key=self.KEY)
@@ -0,0 +1,254 @@
+import argparse
+import sqlite3
+
+import categorizer
+import db
+from categorizer import RuleSet
+from idle import IDLE_PROCESS
+
+# Строки, которые меняют категорию в текущей пачке приложений
+MOVED_TABLE = """
+    CREATE TEMP TABLE IF NOT EXISTS recategorize_moved(
+        app_id INTEGER,
+        date INTEGER,
+        old_id INTEGER,
+        new_id INTEGER,
+        seconds INTEGER,
+        PRIMARY KEY (app_id, date)) WITHOUT ROWID;
+"""
+
+# Итоги вынесенных месяцев (archive_title), которые меняют категорию в текущей пачке
+ARCHIVED_TABLE = """
+    CREATE TEMP TABLE IF NOT EXISTS recategorize_archived(
+        app_id INTEGER PRIMARY KEY,
+        old_id INTEGER,
+        new_id INTEGER,
+        seconds INTEGER);
+"""
+
+
+def process_key(ruleset: RuleSet, process_name: str) -> str:
+    """В базе хранится имя процесса без .exe, правила записаны с ним"""
+    if process_name in ruleset.process_rules:
+        return process_name
+    return process_name + ".exe"
+
+
+def plan(con: sqlite3.Connection, ruleset: RuleSet):
+    """
+    Считает новую категорию для каждого приложения в temp.recategorize_map.
+    Заголовок окна в базе не хранится, поэтому правила применяются
+    к сохранённому названию и имени процесса; каждая пара вычисляется один раз.
+    Простой (idle.IDLE_PROCESS) - не окно, правила к нему не применяются.
+    """
+    mapping = [
+        (app_id, ruleset.resolve(process_key(ruleset, process_name or ""), title)[0])
+        for app_id, title, process_name in con.execute(
+            "SELECT id, title, process_name FROM apps WHERE process_name IS NOT ?", (IDLE_PROCESS,))
+    ]
+    con.execute("""
+        CREATE TEMP TABLE IF NOT EXISTS recategorize_map(
+            app_id INTEGER PRIMARY KEY,
+            category TEXT)
+        """)
+    con.execute("DELETE FROM recategorize_map")
+    con.executemany("INSERT INTO recategorize_map VALUES (?, ?)", mapping)
+    con.commit()
+
+
+def report(con: sqlite3.Connection) -> list[tuple[str, str, int]]:
+    """[(из категории, в категорию, секунды)] по плану в recategorize_map"""
+    return con.execute("""
+        SELECT c.name, m.category, SUM(t.seconds)
+        FROM (SELECT app_id, category_id, SUM(seconds) AS seconds
+              FROM track_days GROUP BY app_id, category_id) t
+        JOIN recategorize_map m ON m.app_id = t.app_id
+        JOIN categories c ON c.id = t.category_id
+        WHERE c.name != m.category
+        GROUP BY c.name, m.category
+        ORDER BY 3 DESC
+    """).fetchall()
+
+
+def _move_rollups() -> list[str]:
+    """Поправки сводных таблиц по recategorize_moved групповыми запросами вместо построчных триггеров"""
+    statements = []
+    for table, (keys, extra) in db.ROLLUPS.items():
+        if "category_id" in keys:
+            others = [c for c in keys if c != "category_id"]
+            prefix = "".join(c + ", " for c in others)
+            match = " AND ".join(f"{table}.{c} = m.{c}" for c in keys)
+            statements += [f"""
+                INSERT INTO {table} ({prefix}category_id, seconds)
+                SELECT {prefix}new_id, SUM(seconds) FROM recategorize_moved
+                WHERE true GROUP BY {prefix}new_id
+                ON CONFLICT({", ".join(keys)}) DO UPDATE SET seconds = seconds + excluded.seconds
+                """, f"""
+                UPDATE {table} SET seconds = {table}.seconds - m.seconds
+                FROM (SELECT {prefix}old_id AS category_id, SUM(seconds) AS seconds
+                      FROM recategorize_moved GROUP BY {prefix}old_id) m
+                WHERE {match}
+                """, f"DELETE FROM {table} WHERE seconds <= 0"]
+        elif "category_id" in extra:
+            match = " AND ".join(f"{table}.{c} = m.{c}" for c in keys)
+            statements.append(f"""
+                UPDATE {table} SET category_id = m.new_id
+                FROM (SELECT DISTINCT {", ".join(keys)}, new_id FROM recategorize_moved) m
+                WHERE {match}
+                """)
+    return statements
+
+
+# archive_category и archive_title устроены как rollup_category и rollup_title, но без дат:
+# время приложения переносится целиком из категории, записанной в archive_title
+MOVE_ARCHIVED = [
+    """
+    INSERT INTO archive_category (category_id, seconds)
+    SELECT new_id, SUM(seconds) FROM recategorize_archived
+    WHERE true GROUP BY new_id
+    ON CONFLICT(category_id) DO UPDATE SET seconds = seconds + excluded.seconds
+    """, """
+    UPDATE archive_category SET seconds = archive_category.seconds - m.seconds
+    FROM (SELECT old_id AS category_id, SUM(seconds) AS seconds
+          FROM recategorize_archived GROUP BY old_id) m
+    WHERE archive_category.category_id = m.category_id
+    """,
+    "DELETE FROM archive_category WHERE seconds <= 0",
+    """
+    UPDATE archive_title SET category_id = m.new_id
+    FROM recategorize_archived m
+    WHERE archive_title.app_id = m.app_id
+    """,
+]
+
+
+def apply(con: sqlite3.Connection, batch_size: int = 500) -> int:
+    """
+    Переносит track_days в новые категории пачками по batch_size приложений,
+    каждая пачка - отдельная транзакция. Триггеры сводных таблиц на время пачки
+    удаляются, а сами таблицы правятся групповыми запросами в той же транзакции;
+    там же переносятся итоги вынесенных месяцев archive_category и archive_title.
+    Возвращает число изменённых строк track_days.
+    """
+    con.execute("""
+        INSERT INTO categories (name)
+        SELECT DISTINCT category FROM recategorize_map WHERE true
+        ON CONFLICT(name) DO NOTHING
+    """)
+    con.commit()
+    con.execute(MOVED_TABLE)
+    con.execute(ARCHIVED_TABLE)
+    app_ids = [app_id for app_id, in con.execute("SELECT app_id FROM recategorize_map ORDER BY app_id")]
+    move_rollups = _move_rollups()
+    changed = 0
+
+    for i in range(0, len(app_ids), batch_size):
+        batch = app_ids[i:i + batch_size]
+        con.execute("BEGIN IMMEDIATE")
+        try:
+            con.execute("DELETE FROM recategorize_moved")
+            con.execute("""
+                INSERT INTO recategorize_moved
+                SELECT t.app_id, t.date, t.category_id, n.id, t.seconds
+                FROM recategorize_map m
+                JOIN categories n ON n.name = m.category
+                JOIN track_days t ON t.app_id = m.app_id
+                WHERE m.app_id BETWEEN ? AND ? AND t.category_id != n.id
+            """, (batch[0], batch[-1]))
+            moved = con.execute("SELECT COUNT(*) FROM recategorize_moved").fetchone()[0]
+            if moved:
+                for trigger in db.ROLLUP_TRIGGERS:
+                    con.execute(f"DROP TRIGGER {trigger}")
+                con.execute("""
+                    UPDATE track_days SET category_id = m.new_id, last_updated = CURRENT_TIMESTAMP
+                    FROM recategorize_moved m
+                    WHERE track_days.app_id = m.app_id AND track_days.date = m.date
+                      AND track_days.app_id BETWEEN ? AND ?
+                """, (batch[0], batch[-1]))
+                for statement in move_rollups + db.rollup_triggers():
+                    con.execute(statement)
+
+            con.execute("DELETE FROM recategorize_archived")
+            con.execute("""
+                INSERT INTO recategorize_archived
+                SELECT a.app_id, a.category_id, n.id, a.seconds
+                FROM recategorize_map m
+                JOIN categories n ON n.name = m.category
+                JOIN archive_title a ON a.app_id = m.app_id
+                WHERE m.app_id BETWEEN ? AND ? AND a.category_id != n.id
+            """, (batch[0], batch[-1]))
+            for statement in MOVE_ARCHIVED:
+                con.execute(statement)
+            con.commit()
+            changed += moved
+        except BaseException:
+            con.rollback()
+            raise
+    return changed
+
+
+def apply_hours(con: sqlite3.Connection):
+    """
+    Переносит в новые категории журнал sessions и пересобирает по нему track_hours
+    за затронутые даты: часовые корзины не хранят приложение, поэтому их нельзя поправить на месте.
+    """
+    with con:
+        con.execute("""
+            CREATE TEMP TABLE IF NOT EXISTS recategorize_dates(date INTEGER PRIMARY KEY)
+            """)
+        con.execute("DELETE FROM recategorize_dates")
+        con.execute("""
+            INSERT OR IGNORE INTO recategorize_dates
+            SELECT s.date FROM sessions s
+            JOIN recategorize_map m ON m.app_id = s.app_id
+            JOIN categories n ON n.name = m.category
+            WHERE s.category_id != n.id
+        """)
+        con.execute("""
+            UPDATE sessions SET category_id = n.id
+            FROM recategorize_map m JOIN categories n ON n.name = m.category
+            WHERE sessions.app_id = m.app_id AND sessions.category_id != n.id
+        """)
+        con.execute("DELETE FROM track_hours WHERE date IN (SELECT date FROM recategorize_dates)")
+        db.add_hours(con, con.execute("""
+            SELECT end, compacted, category_id FROM sessions
+            WHERE date IN (SELECT date FROM recategorize_dates) AND compacted > 0
+        """).fetchall())
+
+
+def recategorize(con: sqlite3.Connection, ruleset: RuleSet = None, dry_run: bool = False,
+                 batch_size: int = 500) -> tuple[list[tuple[str, str, int]], int]:
+    """
+    Применяет текущие правила ко всей истории в базе.
+    Возвращает отчёт о перенесённых секундах и число изменённых строк (0 при dry_run).
+    Итоги вынесенных месяцев переносятся вместе со сводными таблицами,
+    строки в самих файлах архивов остаются в прежних категориях.
+    """
+    ruleset = ruleset or categorizer.get_ruleset()
+    plan(con, ruleset)
+    moves = report(con)
+    if dry_run or not moves:
+        return moves, 0
+    changed = apply(con, batch_size)
+    apply_hours(con)
+    return moves, changed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Пересчёт категорий истории по текущему config.json")
+    parser.add_argument("--db", default=db.DB_PATH)
+    parser.add_argument("--config", default="config.json")
+    parser.add_argument("--dry-run", action="store_true", help="только показать, сколько времени переедет")
+    parser.add_argument("--batch", type=int, default=500, help="приложений на транзакцию")
+    args = parser.parse_args()
+
+    con = db.connect(args.db)
+    db.ensure_schema(con)
+    moves, changed = recategorize(con, categorizer.get_ruleset(args.config), args.dry_run, args.batch)
+    con.close()
+    for old, new, seconds in moves:
+        print(f"{old} -> {new}: {seconds} сек")
+    if not moves:
+        print("Категории не изменились")
+    elif not args.dry_run:
+        print(f"Изменено строк: {changed}")
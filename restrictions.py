@@ -0,0 +1,190 @@
+import queue
+import sqlite3
+import threading
+import psutil
+import categorizer
+import db
+from categorizer import Category, KeywordMatcher
+
+
+class RestrictionEngine:
+    """
+    Проверка ограничений из window_restrictions и blocklist.
+    Индексы строятся один раз на каждую версию конфига,
+    дневное время по заголовкам хранится в памяти и читается из базы
+    только при запуске и при смене дня.
+    Завершение процессов выполняется в отдельном потоке; при kills=False
+    (например, при воспроизведении записи) окна только считаются заблокированными.
+    """
+    def __init__(self, reader, kills: bool = True):
+        # reader() возвращает контекстный менеджер соединения для чтения
+        self._reader = reader
+        self.kills = kills
+        self._version = None
+        self.day: str | None = None
+        self.usage: dict[str, float] = {}
+
+        self._blocked_categories: set[str] = set()
+        self._blocked_processes: set[str] = set()
+        self._apps = KeywordMatcher().build()
+        self._restrictions = KeywordMatcher().build()
+        # title -> (заблокировано всегда, лимит в секундах или None)
+        self._decisions: dict[str, tuple[bool, float | None]] = {}
+
+        self._kill_queue: queue.Queue[int] = queue.Queue()
+        self._pending_kills: set[int] = set()
+        self._pending_lock = threading.Lock()
+        self._killer: threading.Thread | None = None
+
+    def compile(self, cfg: dict):
+        blocklist = cfg.get("blocklist", None) or {}
+        self._blocked_categories = set(blocklist.get("categories", []))
+        self._blocked_processes = set(blocklist.get("processes", []))
+
+        self._apps = KeywordMatcher()
+        for app in blocklist.get("apps", []):
+            self._apps.add(app, 0, app)
+        self._apps.build()
+
+        # Приоритет: сначала полная блокировка, затем наименьший лимит
+        self._restrictions = KeywordMatcher()
+        for name, params in (cfg.get("window_restrictions", None) or {}).items():
+            always = bool(params.get("always_blocked", False))
+            mins = params.get("max_minutes_per_day", None)
+            limit = mins * 60 if mins else None
+            if not always and limit is None:
+                continue
+            priority = (not always, limit if limit is not None else float("inf"))
+            self._restrictions.add(name, priority, (always, limit))
+        self._restrictions.build()
+        self._decisions.clear()
+
+    def refresh(self, day: str):
+        ruleset = categorizer.get_ruleset()
+        if ruleset.version != self._version:
+            self.compile(ruleset.config)
+            self._version = ruleset.version
+        if day != self.day:
+            self.seed(day)
+
+    def seed(self, day: str):
+        """Загружает из базы время за день по каждому заголовку"""
+        self.day = day
+        try:
+            with self._reader() as con:
+                rows = con.execute("""
+                    SELECT a.title, r.seconds
+                    FROM rollup_day_title r
+                    JOIN apps a ON a.id = r.app_id
+                    WHERE r.date = ?
+                """, (db.date_key(day),)).fetchall()
+        except sqlite3.Error as e:
+            print(f"Failed to load today's usage: {e}")
+            rows = []
+        self.usage = {title: seconds or 0 for title, seconds in rows}
+
+    def record(self, title: str, day: str, seconds: float):
+        if day != self.day:
+            self.seed(day)
+        self.usage[title] = self.usage.get(title, 0) + seconds
+
+    def _decision(self, title: str) -> tuple[bool, float | None]:
+        decision = self._decisions.get(title)
+        if decision is None:
+            found = self._restrictions.match(title)
+            always, limit = found if found else (False, None)
+            always = always or self._apps.match(title) is not None
+            decision = self._decisions[title] = (always, limit)
+        return decision
+
+    def remaining(self, title: str) -> float | None:
+        """Секунды до дневного лимита окна; None, если лимита нет или окно заблокировано всегда"""
+        always, limit = self._decision(title)
+        if always or limit is None:
+            return None
+        return limit - self.usage.get(title, 0)
+
+    def is_blocked(self, category: Category) -> bool:
+        title = category.display_title
+        always, limit = self._decision(title)
+        return (always
+                or category.name in self._blocked_categories
+                or category.window.info.process_name in self._blocked_processes
+                or (limit is not None and self.usage.get(title, 0) > limit))
+
+    def check(self, category: Category, day: str) -> bool:
+        self.refresh(day)
+        if not self.is_blocked(category):
+            return False
+        self.kill(category.window.info.pid)
+        return True
+
+    def kill(self, pid: int):
+        if not self.kills:
+            return
+        with self._pending_lock:
+            if pid in self._pending_kills:
+                return
+            self._pending_kills.add(pid)
+            if self._killer is None:
+                self._killer = threading.Thread(target=self._kill_worker, daemon=True)
+                self._killer.start()
+        self._kill_queue.put(pid)
+
+    def _kill_worker(self):
+        while True:
+            pid = self._kill_queue.get()
+            try:
+                psutil.Process(pid).kill()
+            except psutil.Error as e:
+                print(f"Failed to kill process {pid}: {e}")
+            finally:
+                with self._pending_lock:
+                    self._pending_kills.discard(pid)
+
+
+class LimitWarnings:
+    """
+    Предупреждения "осталось N минут" по лимитам window_restrictions.
+    Пока в фокусе окно с лимитом, ждёт один таймер колеса - до ближайшего порога
+    при непрерывной работе в этом окне; при срабатывании остаток пересчитывается,
+    при смене окна таймер снимается. Каждый порог выдаётся не больше раза в день.
+    """
+    KEY = "limit-warning"
+
+    def __init__(self, engine: RestrictionEngine, wheel, notify, minutes=(10, 5, 1)):
+        self.engine = engine
+        self.wheel = wheel
+        self.notify = notify
+        self.thresholds = sorted((m * 60 for m in minutes), reverse=True)
+        self.title: str | None = None
+        self._day: str | None = None
+        self._warned: set[tuple[str, float]] = set()
+
+    def focus(self, title: str | None):
+        if title == self.title:
+            return
+        self.title = title
+        self.wheel.cancel(self.KEY)
+        if title:
+            self._plan(title)
+
+    def _plan(self, title: str):
+        if title != self.title:
+            return
+        remaining = self.engine.remaining(title)
+        if remaining is None or remaining <= 0:
+            return
+        if self.engine.day != self._day:
+            self._day = self.engine.day
+            self._warned.clear()
+
+        pending = [t for t in self.thresholds if (title, t) not in self._warned]
+        reached = [t for t in pending if remaining <= t]
+        if reached:
+            # Несколько порогов сразу (например, окно открыли с остатком 3 минуты) - одно сообщение
+            self._warned.update((title, t) for t in reached)
+            self.notify("limit", f"{title}: до дневного лимита осталось {max(1, round(remaining / 60))} мин")
+        ahead = [t for t in pending if remaining > t]
+        if ahead:
+            self.wheel.schedule(remaining - ahead[0], self._plan, title, key=self.KEY)
@@ -0,0 +1,228 @@
+import argparse
+import os
+import sqlite3
+from contextlib import contextmanager, nullcontext
+from datetime import date, datetime, timedelta
+
+import db
+from scheduler import Timer, TimerWheel
+
+# Таблицы файла архива: те же строки, что в живой базе, id приложений и категорий - из неё же
+ARCHIVE_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS archive.track_days(
+        app_id INTEGER NOT NULL,
+        date INTEGER NOT NULL,
+        category_id INTEGER NOT NULL,
+        seconds INTEGER NOT NULL,
+        last_updated TIMESTAMP,
+        PRIMARY KEY (app_id, date)) WITHOUT ROWID;
+    CREATE TABLE IF NOT EXISTS archive.track_hours(
+        date INTEGER NOT NULL,
+        hour INTEGER NOT NULL,
+        category_id INTEGER NOT NULL,
+        seconds INTEGER NOT NULL,
+        PRIMARY KEY (date, hour, category_id)) WITHOUT ROWID;
+    CREATE TABLE IF NOT EXISTS archive.sessions(
+        id INTEGER PRIMARY KEY,
+        start TIMESTAMP,
+        end TIMESTAMP,
+        app_id INTEGER,
+        category_id INTEGER,
+        date INTEGER,
+        seconds INTEGER,
+        compacted INTEGER DEFAULT 0);
+"""
+
+
+def archive_path(archive_dir: str, month: int) -> str:
+    return os.path.join(archive_dir, f"track-{month // 100}-{month % 100:02d}.db")
+
+
+def cutoff_month(keep_months: int, today: date = None) -> int:
+    """Первый месяц (YYYYMM), который остаётся в базе: текущий и keep_months - 1 предыдущих"""
+    today = today or date.today()
+    index = today.year * 12 + today.month - 1 - (keep_months - 1)
+    return (index // 12) * 100 + index % 12 + 1
+
+
+@contextmanager
+def attached(con: sqlite3.Connection, path: str, name: str = "archive"):
+    con.execute("ATTACH DATABASE ? AS " + name, (path,))
+    try:
+        yield con
+    finally:
+        if con.in_transaction:
+            con.rollback()
+        con.execute("DETACH DATABASE " + name)
+
+
+def archives_for(con: sqlite3.Connection, date_from: str = None, date_to: str = None) -> list[str]:
+    """Файлы архивов за месяцы, пересекающиеся с диапазоном дат"""
+    low = db.date_key(date_from) // 100 if date_from else 0
+    high = db.date_key(date_to) // 100 if date_to else 999999
+    rows = con.execute("""
+        SELECT path FROM archive_months
+        WHERE month BETWEEN ? AND ? AND path IS NOT NULL
+        ORDER BY month
+    """, (low, high)).fetchall()
+    return [path for path, in rows if os.path.exists(path)]
+
+
+def enable_incremental_vacuum(con: sqlite3.Connection):
+    """auto_vacuum меняется только полным VACUUM, поэтому переключение делается один раз"""
+    if con.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+        con.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        con.execute("VACUUM")
+
+
+def archive_month(con: sqlite3.Connection, month: int, archive_dir: str | None) -> int:
+    """
+    Выносит месяц из базы: строки track_days, track_hours и перенесённые отрезки sessions
+    копируются в файл архива (если задан archive_dir) и удаляются,
+    а итоги месяца добавляются в archive_category и archive_title.
+    Сводные таблицы за дни уменьшаются триггерами удаления, поэтому итоги за всё время
+    складываются из rollup_* и archive_*. Возвращает число вынесенных секунд.
+    """
+    low, high = month * 100, month * 100 + 99
+    path = None
+    if archive_dir:
+        os.makedirs(archive_dir, exist_ok=True)
+        path = archive_path(archive_dir, month)
+    with attached(con, path) if path else nullcontext():
+        if path:
+            con.executescript(ARCHIVE_SCHEMA)
+            con.execute(f"PRAGMA archive.user_version = {db.SCHEMA_VERSION}")
+        with con:
+            if path:
+                # Повторный вынос месяца (поздние данные) дополняет архив
+                con.execute("""
+                    INSERT INTO archive.track_days
+                    SELECT app_id, date, category_id, seconds, last_updated
+                    FROM track_days WHERE date BETWEEN ? AND ?
+                    ON CONFLICT(app_id, date) DO UPDATE SET
+                        seconds = seconds + excluded.seconds,
+                        last_updated = excluded.last_updated
+                """, (low, high))
+                con.execute("""
+                    INSERT INTO archive.track_hours
+                    SELECT date, hour, category_id, seconds
+                    FROM track_hours WHERE date BETWEEN ? AND ?
+                    ON CONFLICT(date, hour, category_id) DO UPDATE SET seconds = seconds + excluded.seconds
+                """, (low, high))
+                con.execute("""
+                    INSERT OR REPLACE INTO archive.sessions
+                    SELECT * FROM sessions WHERE date BETWEEN ? AND ? AND seconds = compacted
+                """, (low, high))
+
+            con.execute("""
+                INSERT INTO archive_category (category_id, seconds)
+                SELECT category_id, SUM(seconds) FROM track_days
+                WHERE date BETWEEN ? AND ?
+                GROUP BY category_id
+                ON CONFLICT(category_id) DO UPDATE SET seconds = seconds + excluded.seconds
+            """, (low, high))
+            # Категория приложения - последнего дня месяца с ним (единственный MAX() выбирает строку)
+            con.execute("""
+                INSERT INTO archive_title (app_id, category_id, seconds)
+                SELECT app_id, category_id, seconds FROM (
+                    SELECT app_id, category_id, SUM(seconds) AS seconds, MAX(date)
+                    FROM track_days
+                    WHERE date BETWEEN ? AND ?
+                    GROUP BY app_id)
+                WHERE true
+                ON CONFLICT(app_id) DO UPDATE SET
+                    seconds = seconds + excluded.seconds,
+                    category_id = excluded.category_id
+            """, (low, high))
+            seconds = con.execute(
+                "SELECT TOTAL(seconds) FROM track_days WHERE date BETWEEN ? AND ?", (low, high)
+            ).fetchone()[0]
+            con.execute("""
+                INSERT INTO archive_months (month, path, seconds) VALUES (?, ?, ?)
+                ON CONFLICT(month) DO UPDATE SET
+                    path = COALESCE(excluded.path, path),
+                    seconds = seconds + excluded.seconds,
+                    archived_at = CURRENT_TIMESTAMP
+            """, (month, path, int(seconds)))
+
+            con.execute("DELETE FROM track_days WHERE date BETWEEN ? AND ?", (low, high))
+            con.execute("DELETE FROM track_hours WHERE date BETWEEN ? AND ?", (low, high))
+            con.execute("DELETE FROM sessions WHERE date BETWEEN ? AND ? AND seconds = compacted",
+                        (low, high))
+    return int(seconds)
+
+
+def apply_retention(con: sqlite3.Connection, keep_months: int, archive_dir: str | None,
+                    today: date = None) -> list[int]:
+    """
+    Выносит все закрытые месяцы старше keep_months и освобождает место в файле.
+    today - дата по часам трекера. Текущий месяц и месяц вчерашнего дня не выносятся никогда:
+    отрезки вчерашнего дня журнал трекера ещё может дописать (округление остатков при смене дня),
+    а удалённая строка sessions записалась бы заново и попала в track_days второй раз.
+    По той же причине пропускаются месяцы с ещё не перенесёнными отрезками.
+    Место освобождается, только если база уже в режиме auto_vacuum = INCREMENTAL:
+    однократный полный VACUUM для перехода делает запуск retention.py из командной строки.
+    """
+    if keep_months < 1:
+        raise ValueError(f"keep_months must be at least 1, got {keep_months}")
+    today = today or date.today()
+    yesterday = today - timedelta(days=1)
+    cutoff = min(cutoff_month(keep_months, today), yesterday.year * 100 + yesterday.month) * 100
+    pending = {month for month, in con.execute(
+        "SELECT DISTINCT date / 100 FROM sessions WHERE seconds > compacted")}
+    months = [month for month, in con.execute("""
+        SELECT DISTINCT date / 100 FROM track_days WHERE date < ?
+        UNION
+        SELECT DISTINCT date / 100 FROM track_hours WHERE date < ?
+        ORDER BY 1
+    """, (cutoff, cutoff)) if month not in pending]
+    for month in months:
+        archive_month(con, month, archive_dir)
+    if months:
+        con.execute("PRAGMA incremental_vacuum")
+    return months
+
+
+class Retention:
+    """
+    Периодический вынос старых месяцев через поток записи, по секции retention конфига.
+    clock() - текущее время трекера (source.now у воспроизведения), по нему выбираются месяцы.
+    """
+    def __init__(self, writer: db.Writer, cfg: dict, clock=datetime.now):
+        retention_cfg = cfg.get("retention", {})
+        self.writer = writer
+        self.clock = clock
+        self.keep_months = retention_cfg.get("keep_months", 13)
+        self.archive_dir = retention_cfg.get("archive_dir", "archive")
+        self.interval = retention_cfg.get("interval_hours", 24) * 3600
+
+    def run_once(self):
+        return self.writer.submit(apply_retention, self.keep_months, self.archive_dir, self.clock().date())
+
+    def schedule(self, wheel: TimerWheel) -> Timer:
+        # Первый проход сразу после запуска, дальше - раз в interval с разбросом до минуты
+        return wheel.schedule(0, self._run, interval=self.interval, jitter=60)
+
+    def _run(self):
+        self.run_once().add_done_callback(report_error)
+
+
+def report_error(future):
+    if future.exception():
+        print(f"Failed to archive old data: {future.exception()}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Вынос старых месяцев из track.db в архивы")
+    parser.add_argument("--db", default=db.DB_PATH)
+    parser.add_argument("--keep-months", type=int, default=13)
+    parser.add_argument("--archive-dir", default="archive",
+                        help="пустая строка - только итоги, без файлов архива")
+    args = parser.parse_args()
+
+    con = db.connect(args.db)
+    db.ensure_schema(con)
+    enable_incremental_vacuum(con)
+    months = apply_retention(con, args.keep_months, args.archive_dir or None)
+    con.close()
+    print(f"Вынесено месяцев: {len(months)}" + (f" ({', '.join(map(str, months))})" if months else ""))
@@ -0,0 +1,270 @@
+import math
+import random
+import time
+from datetime import datetime, timedelta, date
+
+
+class TickScheduler:
+    """
+    Учёт времени цикла трекера по монотонным часам.
+    elapsed() возвращает реально прошедшее с прошлого тика время,
+    разбитое по календарным датам, поэтому задержки обработки
+    не теряются, а смена суток не пишет данные в прошлый день.
+    Интервал опроса растёт, пока фокус не меняется, и сбрасывается после переключения.
+    """
+    def __init__(self, clock=time.monotonic, now=datetime.now,
+                 min_interval: float = 1.0, max_interval: float = 5.0,
+                 growth: float = 1.5, max_gap: float = 300.0):
+        self._clock = clock
+        self._now = now
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.growth = growth
+        # Больший разрыв считаем сном системы и не засчитываем
+        self.max_gap = max_gap
+        self.interval = min_interval
+        self._last = clock()
+        self.today: date = now().date()
+
+    @classmethod
+    def from_config(cls, cfg: dict, clock=time.monotonic, now=datetime.now) -> "TickScheduler":
+        tracker_cfg = cfg.get("tracker", {})
+        return cls(
+            clock, now,
+            min_interval=tracker_cfg.get("min_interval_seconds", 1.0),
+            max_interval=tracker_cfg.get("max_interval_seconds", 5.0),
+            growth=tracker_cfg.get("interval_growth", 1.5),
+            max_gap=tracker_cfg.get("max_gap_seconds", 300.0)
+        )
+
+    def elapsed(self) -> list[tuple[str, float, datetime]]:
+        """Возвращает [(дата, секунды, время окончания)] с момента прошлого вызова"""
+        mono = self._clock()
+        wall = self._now()
+        seconds = mono - self._last
+        self._last = mono
+        self.today = wall.date()
+        if seconds <= 0 or seconds > self.max_gap:
+            return []
+
+        parts = []
+        start = wall - timedelta(seconds=seconds)
+        while start.date() < wall.date():
+            midnight = datetime.combine(start.date() + timedelta(days=1), datetime.min.time())
+            parts.append((start.date().isoformat(), (midnight - start).total_seconds(), midnight))
+            start = midnight
+        parts.append((wall.date().isoformat(), (wall - start).total_seconds(), wall))
+        return parts
+
+    def note_focus(self, changed: bool):
+        if changed:
+            self.interval = self.min_interval
+        else:
+            self.interval = min(self.max_interval, self.interval * self.growth)
+
+    def delay(self) -> float:
+        """Сколько ждать до следующего тика с учётом времени, ушедшего на обработку"""
+        return max(0.0, self._last + self.interval - self._clock())
+
+
+class Timer:
+    """Задание колеса таймеров; due - номинальный срок без разброса"""
+    __slots__ = ("due", "expires", "fn", "args", "interval", "jitter", "key", "level", "slot")
+
+    def __init__(self, due: float, fn, args: tuple, interval: float | None, jitter: float, key):
+        self.due = due
+        self.expires = 0
+        self.fn = fn
+        self.args = args
+        self.interval = interval
+        self.jitter = jitter
+        self.key = key
+        # Положение в колесе; None - таймер не запланирован
+        self.level: int | None = None
+        self.slot = 0
+
+    @property
+    def pending(self) -> bool:
+        return self.level is not None
+
+
+class TimerWheel:
+    """
+    Иерархическое колесо таймеров для периодических и разовых заданий.
+    Время делится на тики по resolution секунд; уровень l состоит из SLOTS ячеек
+    по SLOTS**l тиков. Таймер кладётся в ячейку по сроку, поэтому постановка,
+    отмена и срабатывание стоят O(1), а при наступлении ячейки верхнего уровня
+    её таймеры раскладываются по нижним.
+    Занятые ячейки отмечены битами, поэтому next_deadline() и advance() перескакивают
+    пустые участки: ожидающий поток просыпается, только когда пора что-то выполнить.
+    Таймеры с одинаковым key объединяются (остаётся более ранний),
+    jitter сдвигает срок периодического задания на случайную долю секунд вперёд.
+    Не потокобезопасно: таймеры ставятся и выполняются в одном потоке.
+    """
+    BITS = 8
+    SLOTS = 1 << BITS
+    MASK = SLOTS - 1
+    LEVELS = 4
+    # Запас на погрешность float при переводе секунд в тики
+    EPSILON = 1e-6
+
+    def __init__(self, resolution: float = 0.05, clock=time.monotonic, rng=random.random):
+        self.resolution = resolution
+        self._clock = clock
+        self._rng = rng
+        self._now = self._tick(clock())
+        self._slots = [[[] for _ in range(self.SLOTS)] for _ in range(self.LEVELS)]
+        self._occupied = [0] * self.LEVELS
+        # Самый ранний срок в каждой ячейке: next_deadline() не перебирает таймеры
+        self._earliest = [[0] * self.SLOTS for _ in range(self.LEVELS)]
+        # Ближайшая раскладка ячейки верхних уровней (может быть раньше настоящей после отмены)
+        self._horizon = math.inf
+        self._keys: dict = {}
+        self._count = 0
+
+    def __len__(self) -> int:
+        return self._count
+
+    def _tick(self, seconds: float) -> int:
+        return math.floor(seconds / self.resolution + self.EPSILON)
+
+    def schedule(self, delay: float, fn, *args, interval: float = None, jitter: float = 0.0,
+                 key=None) -> Timer:
+        """
+        Выполнить fn(*args) через delay секунд, а с interval - повторять каждые interval секунд.
+        Если таймер с тем же key уже ждёт и сработает не позже, возвращается он.
+        """
+        due = self._clock() + max(delay, 0.0)
+        if key is not None:
+            pending = self._keys.get(key)
+            if pending is not None:
+                if pending.due <= due:
+                    return pending
+                self.cancel(pending)
+        timer = Timer(due, fn, args, interval, jitter, key)
+        self._arm(timer, due)
+        if key is not None:
+            self._keys[key] = timer
+        return timer
+
+    def cancel(self, timer_or_key):
+        timer = timer_or_key if isinstance(timer_or_key, Timer) else self._keys.get(timer_or_key)
+        if timer is None or timer.level is None:
+            return
+        cell = self._slots[timer.level][timer.slot]
+        cell.remove(timer)
+        if not cell:
+            self._occupied[timer.level] &= ~(1 << timer.slot)
+        elif timer.expires == self._earliest[timer.level][timer.slot]:
+            self._earliest[timer.level][timer.slot] = min(other.expires for other in cell)
+        timer.level = None
+        self._count -= 1
+        if timer.key is not None and self._keys.get(timer.key) is timer:
+            del self._keys[timer.key]
+
+    def _arm(self, timer: Timer, due: float):
+        # Разброс только вперёд: задание не срабатывает раньше срока
+        if timer.jitter:
+            due += self._rng() * timer.jitter
+        timer.expires = max(math.ceil(due / self.resolution - self.EPSILON), self._now + 1)
+        self._insert(timer)
+        self._count += 1
+
+    def _insert(self, timer: Timer):
+        delta = timer.expires - self._now
+        level = min((delta.bit_length() - 1) // self.BITS, self.LEVELS - 1) if delta > 0 else 0
+        position = timer.expires
+        if delta >= 1 << (self.BITS * self.LEVELS):
+            # Дальше горизонта колеса: ждём в последней ячейке и раскладываемся заново
+            position = self._now + (1 << (self.BITS * self.LEVELS)) - 1
+        shift = self.BITS * level
+        slot = (position >> shift) & self.MASK
+        if level and (position >> shift) << shift < self._horizon:
+            self._horizon = (position >> shift) << shift
+        cell = self._slots[level][slot]
+        if not cell or timer.expires < self._earliest[level][slot]:
+            self._earliest[level][slot] = timer.expires
+        cell.append(timer)
+        self._occupied[level] |= 1 << slot
+        timer.level = level
+        timer.slot = slot
+
+    def _first(self, level: int) -> int | None:
+        """Тик начала первой занятой ячейки уровня после текущей (для уровня 0 - срок таймеров)"""
+        bits = self._occupied[level]
+        if not bits:
+            return None
+        shift = self.BITS * level
+        block = self._now >> shift
+        current = block & self.MASK
+        # Поворот битов: ячейка current + 1 становится младшей
+        rotated = ((bits >> (current + 1)) | (bits << (self.SLOTS - current - 1))) & ((1 << self.SLOTS) - 1)
+        distance = (rotated & -rotated).bit_length()
+        return (block + distance) << shift
+
+    def next_deadline(self) -> float | None:
+        """Время (по clock) ближайшего срабатывания или None, если таймеров нет"""
+        best = self._first(0)
+        if best is not None and best <= self._horizon:
+            return best * self.resolution
+        for level in range(1, self.LEVELS):
+            start = self._first(level)
+            if start is None or (best is not None and start >= best):
+                continue
+            # Раскладка ячейки верхнего уровня сама по себе не повод просыпаться
+            expires = self._earliest[level][(start >> (self.BITS * level)) & self.MASK]
+            best = expires if best is None else min(best, expires)
+        return None if best is None else best * self.resolution
+
+    def advance(self) -> int:
+        """Выполняет всё, что наступило к текущему времени; возвращает число сработавших таймеров"""
+        target = self._tick(self._clock())
+        fired = 0
+        while True:
+            event = self._first(0)
+            cascade = self._horizon <= target and (event is None or self._horizon <= event)
+            if cascade:
+                event = self._horizon
+            elif event is None or event > target:
+                break
+            self._now = event
+            if cascade:
+                for level in range(self.LEVELS - 1, 0, -1):
+                    shift = self.BITS * level
+                    if event & ((1 << shift) - 1):
+                        continue
+                    slot = (event >> shift) & self.MASK
+                    cell = self._slots[level][slot]
+                    if cell:
+                        self._slots[level][slot] = []
+                        self._occupied[level] &= ~(1 << slot)
+                        for timer in cell:
+                            self._insert(timer)
+                self._horizon = min((tick for tick in map(self._first, range(1, self.LEVELS)) if tick is not None),
+                                    default=math.inf)
+
+            slot = event & self.MASK
+            cell = self._slots[0][slot]
+            if cell:
+                self._slots[0][slot] = []
+                self._occupied[0] &= ~(1 << slot)
+                for timer in cell:
+                    self._fire(timer, target)
+                    fired += 1
+        self._now = max(self._now, target)
+        return fired
+
+    def _fire(self, timer: Timer, target: int):
+        timer.level = None
+        self._count -= 1
+        if timer.interval:
+            # Пропущенные периоды не наверстываются: следующий срок - ближайший в будущем
+            now = target * self.resolution
+            timer.due += timer.interval * max(1, math.ceil((now - timer.due) / timer.interval))
+            self._arm(timer, timer.due)
+        elif timer.key is not None and self._keys.get(timer.key) is timer:
+            del self._keys[timer.key]
+        try:
+            timer.fn(*timer.args)
+        except Exception as e:
+            print(f"Scheduled job {getattr(timer.fn, '__qualname__', timer.fn)} failed: {e}")
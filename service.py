@@ -0,0 +1,393 @@
+import argparse
+import asyncio
+import json
+import os
+import queue
+import socket
+import sys
+import threading
+from contextlib import closing
+from datetime import date
+
+import categorizer
+import db
+import main
+import metrics
+import stats
+from categorizer import Category
+
+# Подписчик, у которого накопилось больше неотправленных байт, отключается
+MAX_BUFFER = 1 << 20
+
+
+class ServiceError(Exception):
+    pass
+
+
+def endpoint(cfg: dict) -> tuple[str, str | int]:
+    """
+    ("unix", путь к сокету) или ("tcp", порт на 127.0.0.1).
+    На Windows asyncio не поддерживает Unix-сокеты, поэтому там используется TCP на localhost.
+    """
+    service_cfg = cfg.get("service", {})
+    if sys.platform != "win32" and hasattr(socket, "AF_UNIX"):
+        return "unix", service_cfg.get("socket", "tracker.sock")
+    return "tcp", service_cfg.get("port", 8765)
+
+
+def encode(message: dict) -> bytes:
+    return (json.dumps(message, ensure_ascii=False) + "\n").encode("utf-8")
+
+
+class LiveTotals:
+    """
+    Итоги текущего дня в памяти: {заголовок: [категория, секунды]}.
+    Каждое изменение получает номер версии, поэтому подписчику отправляются
+    только строки, изменившиеся с прошлой отправки.
+    В клиенте те же итоги собираются из присланных дельт через apply().
+    """
+    def __init__(self):
+        self.day: str | None = None
+        self.titles: dict[str, list] = {}
+        self.current: dict | None = None
+        self.version = 0
+        self._reset_version = 0
+        self._changed: dict[str, int] = {}
+
+    def reset(self, day: str):
+        self.day = day
+        self.titles.clear()
+        self._changed.clear()
+        self.version += 1
+        self._reset_version = self.version
+
+    def seed(self, con, day: str):
+        """Начальные итоги дня из сводной таблицы: то, что трекер записал до запуска демона"""
+        self.reset(day)
+        for title, category, seconds in con.execute("""
+            SELECT a.title, c.name, r.seconds
+            FROM rollup_day_title r
+            JOIN apps a ON a.id = r.app_id
+            JOIN categories c ON c.id = r.category_id
+            WHERE r.date = ?
+        """, (db.date_key(day),)):
+            self.titles[title] = [category, seconds]
+
+    def add(self, title: str, category: str, day: str, seconds: float):
+        if day != self.day:
+            self.reset(day)
+        self.version += 1
+        row = self.titles.setdefault(title, [category, 0])
+        row[0] = category
+        row[1] += seconds
+        self._changed[title] = self.version
+
+    def delta(self, since: int) -> dict | None:
+        """Изменения после версии since или весь день, если он сменился; None - изменений нет"""
+        if since >= self.version:
+            return None
+        if since < self._reset_version:
+            titles, reset = self.titles, True
+        else:
+            titles = {title: self.titles[title] for title, version in self._changed.items() if version > since}
+            reset = False
+        return {
+            "day": self.day,
+            "version": self.version,
+            "reset": reset,
+            "titles": {title: [category, int(seconds)] for title, (category, seconds) in titles.items()},
+        }
+
+    def apply(self, message: dict):
+        if message.get("reset") or message["day"] != self.day:
+            self.day = message["day"]
+            self.titles.clear()
+        self.titles.update(message["titles"])
+        self.version = message["version"]
+        if "current" in message:
+            self.current = message["current"]
+
+    def categories(self) -> list[tuple[str, int]]:
+        totals: dict[str, float] = {}
+        for category, seconds in self.titles.values():
+            totals[category] = totals.get(category, 0) + seconds
+        return sorted(((name, int(seconds)) for name, seconds in totals.items()), key=lambda r: -r[1])
+
+    def top(self, limit: int = None) -> list[tuple[str, str, int]]:
+        rows = sorted(((title, category, int(seconds)) for title, (category, seconds) in self.titles.items()),
+                      key=lambda r: -r[2])
+        return rows[:limit] if limit else rows
+
+    def stats(self, mode: str = stats.MODE_TODAY) -> stats.Stats:
+        """Результат в том же виде, что stats.query_stats() за сегодня"""
+        category_data = self.categories()
+        table_rows = self.top()
+        app_data = [(title, seconds) for title, _, seconds in table_rows[:10]]
+        return stats.Stats(mode, self.day, category_data, app_data, table_rows,
+                           sum(seconds for _, seconds in category_data))
+
+
+class TrackerService:
+    """
+    Трекер без окна: владеет базой и отвечает на запросы по локальному сокету.
+    Протокол - строки JSON. Запрос {"id": n, "method": ..., ...},
+    ответ {"id": n, "result": ...} или {"id": n, "error": ...}.
+    Методы: today, top (limit), categories, current, subscribe, unsubscribe,
+    metrics и profile (toggle) для панели диагностики.
+    Подписчик получает события {"event": "delta", ...} с изменившимися строками дня
+    не чаще раза в push_interval секунд, {"event": "focus", "current": ...} при смене окна
+    и {"event": "notice", "kind": ..., "text": ...} - смена фазы помодоро, скорый лимит.
+    Ответы строятся из итогов в памяти, без обращений к базе.
+    """
+    def __init__(self, cfg: dict):
+        self.kind, self.address = endpoint(cfg)
+        self.push_interval = cfg.get("service", {}).get("push_interval_seconds", 1)
+        self.totals = LiveTotals()
+        self.loop: asyncio.AbstractEventLoop | None = None
+        # Подписчик -> последняя отправленная ему версия итогов
+        self._subscribers: dict[asyncio.StreamWriter, int] = {}
+
+    # Вызываются из потока трекера (observer в main.main)
+    def credit(self, category: Category, day: str, seconds: float):
+        self.loop.call_soon_threadsafe(self.totals.add, category.display_title, category.name, day, seconds)
+
+    def focus(self, category: Category | None):
+        current = {"title": category.display_title, "category": category.name} if category else None
+        self.loop.call_soon_threadsafe(self._focus, current)
+
+    def notify(self, kind: str, text: str):
+        self.loop.call_soon_threadsafe(self._broadcast, {"event": "notice", "kind": kind, "text": text})
+
+    def _focus(self, current: dict | None):
+        self.totals.current = current
+        self._broadcast({"event": "focus", "current": current})
+
+    def _broadcast(self, event: dict):
+        data = encode(event)
+        for writer in list(self._subscribers):
+            self._send(writer, data)
+
+    def _send(self, writer: asyncio.StreamWriter, data: bytes):
+        if writer.is_closing():
+            self._subscribers.pop(writer, None)
+        elif writer.transport.get_write_buffer_size() > MAX_BUFFER:
+            # Клиент не читает события: не копим их в памяти
+            self._subscribers.pop(writer, None)
+            writer.close()
+        else:
+            writer.write(data)
+
+    def respond(self, request: dict, writer: asyncio.StreamWriter):
+        method = request.get("method")
+        totals = self.totals
+        if method == "today":
+            categories = totals.categories()
+            return {"day": totals.day, "total": sum(seconds for _, seconds in categories),
+                    "categories": categories, "current": totals.current}
+        if method == "top":
+            limit = request.get("limit", 10)
+            if not isinstance(limit, int) or isinstance(limit, bool):
+                raise ServiceError(f"limit must be an integer, got {limit!r}")
+            return totals.top(limit)
+        if method == "categories":
+            return totals.categories()
+        if method == "current":
+            return totals.current
+        if method == "subscribe":
+            # Первое событие - весь день, дальше только изменения
+            snapshot = totals.delta(-1) or {}
+            self._send(writer, encode({"event": "delta", **snapshot, "current": totals.current}))
+            self._subscribers[writer] = totals.version
+            return {"day": totals.day, "version": totals.version}
+        if method == "metrics":
+            return metrics.registry.snapshot()
+        if method == "profile":
+            # cProfile потока трекера: toggle=true включает или выключает запись
+            if request.get("toggle"):
+                metrics.profiler.toggle()
+            return {"running": metrics.profiler.wanted, "path": metrics.profiler.path}
+        if method == "unsubscribe":
+            self._subscribers.pop(writer, None)
+            return None
+        raise ServiceError(f"unknown method: {method}")
+
+    async def _client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while line := await reader.readline():
+                request_id = None
+                try:
+                    request = json.loads(line)
+                    if not isinstance(request, dict):
+                        raise ServiceError("request must be an object")
+                    request_id = request.get("id")
+                    response = {"id": request_id, "result": self.respond(request, writer)}
+                except (TypeError, ValueError, ServiceError) as e:
+                    # Неверные параметры - ошибка запроса, а не повод рвать соединение
+                    response = {"id": request_id, "error": str(e)}
+                writer.write(encode(response))
+                await writer.drain()
+        except (ConnectionError, asyncio.CancelledError):
+            # CancelledError - остановка демона, соединение просто закрывается
+            pass
+        finally:
+            self._subscribers.pop(writer, None)
+            writer.close()
+
+    def push(self):
+        # У большинства подписчиков одна и та же версия: дельта кодируется один раз
+        encoded: dict[int, bytes | None] = {}
+        for writer, since in list(self._subscribers.items()):
+            if since not in encoded:
+                delta = self.totals.delta(since)
+                encoded[since] = encode({"event": "delta", **delta}) if delta else None
+            if encoded[since]:
+                self._send(writer, encoded[since])
+                if writer in self._subscribers:
+                    self._subscribers[writer] = self.totals.version
+
+    async def _push(self):
+        while True:
+            await asyncio.sleep(self.push_interval)
+            self.push()
+
+    async def _start_server(self) -> asyncio.AbstractServer:
+        if self.kind == "unix":
+            remove_stale_socket(self.address)
+            return await asyncio.start_unix_server(self._client, self.address)
+        return await asyncio.start_server(self._client, "127.0.0.1", self.address)
+
+    async def serve(self, source=None):
+        """Запускает сервер и трекер (в потоке пула), работает до остановки трекера"""
+        self.loop = asyncio.get_running_loop()
+        server = await self._start_server()
+        push = asyncio.create_task(self._push())
+        tracker = self.loop.run_in_executor(None, main.main, source, self)
+        print(f"Tracker service listening on {self.address}")
+        try:
+            await tracker
+        finally:
+            # При Ctrl+C цикл трекера доработает в своём потоке и сбросит данные в базу
+            main.stop()
+            push.cancel()
+            server.close()
+            # Последние секунды дня уходят подписчикам до закрытия соединений
+            self.push()
+            for writer in list(self._subscribers):
+                writer.close()
+                try:
+                    await writer.wait_closed()
+                except (ConnectionError, asyncio.CancelledError):
+                    pass
+            if self.kind == "unix" and os.path.exists(self.address):
+                os.remove(self.address)
+
+    def run(self, source=None):
+        with closing(main.get_db_connection()) as con:
+            self.totals.seed(con, date.today().isoformat())
+        try:
+            asyncio.run(self.serve(source))
+        except KeyboardInterrupt:
+            pass
+
+
+def remove_stale_socket(path: str):
+    """Удаляет файл сокета, оставшийся после аварийного завершения; отказывает, если демон уже работает"""
+    if not os.path.exists(path):
+        return
+    with closing(socket.socket(socket.AF_UNIX)) as probe:
+        try:
+            probe.connect(path)
+        except OSError:
+            os.remove(path)
+            return
+    raise ServiceError(f"Tracker service is already running ({path})")
+
+
+class ServiceClient:
+    """
+    Синхронный клиент демона для GUI и скриптов.
+    Ответы и события читаются в фоновом потоке; события складываются в очередь events,
+    при разрыве соединения туда попадает {"event": "closed"}.
+    """
+    def __init__(self, cfg: dict = None, timeout: float = 2):
+        kind, address = endpoint(cfg or categorizer.load_config())
+        if kind == "unix":
+            sock = socket.socket(socket.AF_UNIX)
+            sock.settimeout(timeout)
+            sock.connect(address)
+        else:
+            sock = socket.create_connection(("127.0.0.1", address), timeout)
+        sock.settimeout(None)
+        self._sock = sock
+        self._lock = threading.Lock()
+        self._next_id = 0
+        self._responses: dict[int, queue.Queue] = {}
+        self.events: queue.Queue = queue.Queue()
+        threading.Thread(target=self._read, daemon=True).start()
+
+    @classmethod
+    def connect(cls, cfg: dict = None) -> "ServiceClient | None":
+        """Клиент, если демон запущен, иначе None"""
+        try:
+            return cls(cfg)
+        except OSError:
+            return None
+
+    def request(self, method: str, timeout: float = 5, **params):
+        with self._lock:
+            self._next_id += 1
+            request_id = self._next_id
+            waiter = self._responses[request_id] = queue.Queue(1)
+            self._sock.sendall(encode({"id": request_id, "method": method, **params}))
+        try:
+            response = waiter.get(timeout=timeout)
+        except queue.Empty:
+            raise ServiceError(f"no response to {method}")
+        finally:
+            self._responses.pop(request_id, None)
+        if response.get("error"):
+            raise ServiceError(response["error"])
+        return response["result"]
+
+    def subscribe(self) -> dict:
+        return self.request("subscribe")
+
+    def close(self):
+        try:
+            self._sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self._sock.close()
+
+    def _read(self):
+        try:
+            with self._sock.makefile("rb") as f:
+                for line in f:
+                    message = json.loads(line)
+                    if "event" in message:
+                        self.events.put(message)
+                    elif waiter := self._responses.get(message.get("id")):
+                        waiter.put(message)
+        except (OSError, ValueError):
+            pass
+        self.events.put({"event": "closed"})
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Запросы к запущенному трекеру (main.py --headless)")
+    parser.add_argument("method", choices=["today", "top", "categories", "current", "metrics", "watch"])
+    parser.add_argument("--limit", type=int, default=10, help="число приложений для top")
+    args = parser.parse_args()
+
+    client = ServiceClient.connect()
+    if not client:
+        print("Трекер не запущен")
+        sys.exit(1)
+    with closing(client):
+        if args.method == "watch":
+            client.subscribe()
+            while (event := client.events.get())["event"] != "closed":
+                print(json.dumps(event, ensure_ascii=False))
+        else:
+            params = {"limit": args.limit} if args.method == "top" else {}
+            print(json.dumps(client.request(args.method, **params), ensure_ascii=False, indent=2))
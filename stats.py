@@ -0,0 +1,276 @@
+import queue
+import sqlite3
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+
+import analytics
+import db
+import metrics
+
+MODE_ALL = "Общая статистика"
+MODE_TODAY = "Статистика за день"
+MODE_YESTERDAY = "Статистика за вчера"
+MODES = [MODE_ALL, MODE_TODAY, MODE_YESTERDAY]
+
+
+class Stats:
+    """Результат запросов для одного режима отображения"""
+    def __init__(self, mode: str, day: str | None, category_data: list, app_data: list,
+                 table_rows: list, total: int, heatmap=None):
+        self.mode = mode
+        self.day = day
+        self.category_data = category_data
+        self.app_data = app_data
+        self.table_rows = table_rows
+        self.total = total
+        # Среднее время по дням недели и часам за последний год
+        self.heatmap = heatmap
+
+
+def mode_day(mode: str, now: datetime = None) -> str | None:
+    """Дата, за которую показывается статистика, или None для всего времени"""
+    now = now or datetime.now()
+    if mode == MODE_TODAY:
+        return now.date().isoformat()
+    if mode == MODE_YESTERDAY:
+        return (now - timedelta(1)).strftime("%Y-%m-%d")
+    return None
+
+
+class Totals:
+    """
+    Секунды по категориям и приложениям за диапазон дат.
+    Части складываются и вычитаются: всё время = закрытые дни + сегодня.
+    """
+    __slots__ = ("categories", "titles")
+
+    def __init__(self, categories: dict[str, int], titles: dict[str, tuple[str, int]]):
+        self.categories = categories
+        # title -> (категория, секунды)
+        self.titles = titles
+
+    def __add__(self, other: "Totals") -> "Totals":
+        categories = dict(self.categories)
+        for name, seconds in other.categories.items():
+            categories[name] = categories.get(name, 0) + seconds
+        titles = dict(self.titles)
+        for title, (category, seconds) in other.titles.items():
+            # Категория приложения - из более поздней части
+            titles[title] = (category, seconds + titles.get(title, ("", 0))[1])
+        return Totals(categories, titles)
+
+    def __sub__(self, other: "Totals") -> "Totals":
+        titles = dict(self.titles)
+        for title, (_, seconds) in other.titles.items():
+            if title in titles:
+                category, left = titles[title]
+                titles[title] = (category, left - seconds)
+        return Totals(subtract(self.categories, other.categories),
+                      {title: row for title, row in titles.items() if row[1] > 0})
+
+    def stats(self, mode: str, day: str | None) -> Stats:
+        category_data = sorted(self.categories.items(), key=lambda r: -r[1])
+        table_rows = sorted(((title, category, seconds) for title, (category, seconds) in self.titles.items()),
+                            key=lambda r: -r[2])
+        # Топ приложений и общее время считаются из уже полученных строк
+        app_data = [(title, seconds) for title, _, seconds in table_rows[:10]]
+        total = sum(seconds for _, seconds in category_data)
+        return Stats(mode, day, category_data, app_data, table_rows, total)
+
+
+def subtract(totals: dict[str, int], other: dict[str, int]) -> dict[str, int]:
+    result = {name: seconds - other.get(name, 0) for name, seconds in totals.items()}
+    return {name: seconds for name, seconds in result.items() if seconds > 0}
+
+
+def _sources(day: str | None) -> tuple[str, str, dict]:
+    # Сводные таблицы: за день - по дате, иначе за всё время вместе с итогами архивов
+    if day:
+        category_source = "(SELECT category_id, seconds FROM rollup_day_category WHERE date = :day)"
+        title_source = """(
+            SELECT app_id, category_id, seconds, 0 AS archived FROM rollup_day_title WHERE date = :day)"""
+        return category_source, title_source, {"day": db.date_key(day)}
+    category_source = """(
+        SELECT category_id, seconds FROM rollup_category
+        UNION ALL
+        SELECT category_id, seconds FROM archive_category)"""
+    # Категория приложения берётся из живых данных, если они есть
+    title_source = """(
+        SELECT app_id, category_id, seconds, 0 AS archived FROM rollup_title
+        UNION ALL
+        SELECT app_id, category_id, seconds, 1 FROM archive_title)"""
+    return category_source, title_source, {}
+
+
+def load_categories(con: sqlite3.Connection, day: str | None) -> dict[str, int]:
+    """Секунды по категориям за день или за всё время: строк столько, сколько категорий"""
+    category_source, _, params = _sources(day)
+    return dict(con.execute(f"""
+        SELECT c.name, r.seconds
+        FROM (SELECT category_id, SUM(seconds) AS seconds
+              FROM {category_source}
+              GROUP BY category_id) r
+        JOIN categories c ON c.id = r.category_id
+    """, params).fetchall())
+
+
+def load_totals(con: sqlite3.Connection, day: str | None) -> Totals:
+    _, title_source, params = _sources(day)
+    titles = con.execute(f"""
+        SELECT a.title, c.name, r.seconds
+        FROM (SELECT app_id, category_id, SUM(seconds) AS seconds, MIN(archived)
+              FROM {title_source}
+              GROUP BY app_id) r
+        JOIN apps a ON a.id = r.app_id
+        JOIN categories c ON c.id = r.category_id
+    """, params).fetchall()
+    return Totals(load_categories(con, day), {title: (category, seconds) for title, category, seconds in titles})
+
+
+def load_signature(con: sqlite3.Connection, day: str | None) -> tuple[int, int]:
+    """
+    Сверка итогов по приложениям без чтения самих строк: секунды и секунды, взвешенные id приложения.
+    Перенос времени между приложениями при тех же итогах по категориям меняет вторую сумму.
+    """
+    _, title_source, params = _sources(day)
+    return con.execute(f"""
+        SELECT COALESCE(SUM(seconds), 0), COALESCE(SUM(app_id * seconds), 0) FROM {title_source}
+    """, params).fetchone()
+
+
+def query_stats(con: sqlite3.Connection, mode: str, day: str | None) -> Stats:
+    return load_totals(con, day).stats(mode, day)
+
+
+@contextmanager
+def _snapshot(con: sqlite3.Connection):
+    """Несколько запросов видят одно состояние базы, даже если трекер пишет между ними"""
+    con.execute("BEGIN")
+    try:
+        yield
+    finally:
+        con.rollback()
+
+
+class QueryCache:
+    """
+    Кэш итогов по диапазонам дат для StatsWorker.
+    Прошедшие дни не меняются, поэтому их итоги хранятся без срока (последние max_days дней),
+    а всё время складывается из закэшированных закрытых дней и живых строк сегодняшнего дня.
+    Историю всё же переписывают перенос вчерашних секунд сразу после полуночи,
+    recategorize.py и merge.py, поэтому закэшированное сверяется с итогами по категориям
+    и подписью load_signature по приложениям - это несколько строк вместо всей таблицы приложений.
+    Суммы подписи линейны, поэтому подпись закрытой части - разность всего времени и сегодняшнего дня.
+    """
+    def __init__(self, max_days: int = 32):
+        self.max_days = max_days
+        # день -> (итоги, подпись)
+        self._days: OrderedDict[str, tuple[Totals, tuple]] = OrderedDict()
+        # (сегодня, всё время без сегодняшнего дня, подпись)
+        self._closed: tuple[str, Totals, tuple] | None = None
+
+    def query(self, con: sqlite3.Connection, mode: str, day: str | None, today: str = None) -> Stats:
+        today = today or date.today().isoformat()
+        with _snapshot(con):
+            if day == today:
+                return query_stats(con, mode, day)
+            if day:
+                return self._day(con, day).stats(mode, day)
+            live = load_totals(con, today)
+            return (self._closed_part(con, today, live) + live).stats(mode, day)
+
+    def _day(self, con: sqlite3.Connection, day: str) -> Totals:
+        cached = self._days.get(day)
+        signature = load_signature(con, day)
+        if cached is None or cached[1] != signature or cached[0].categories != load_categories(con, day):
+            cached = self._days[day] = (load_totals(con, day), signature)
+            if len(self._days) > self.max_days:
+                self._days.popitem(last=False)
+        self._days.move_to_end(day)
+        return cached[0]
+
+    def _closed_part(self, con: sqlite3.Connection, today: str, live: Totals) -> Totals:
+        signature = tuple(a - b for a, b in zip(load_signature(con, None), load_signature(con, today)))
+        if self._closed and self._closed[0] == today and self._closed[2] == signature:
+            closed = subtract(load_categories(con, None), live.categories)
+            if closed == self._closed[1].categories:
+                return self._closed[1]
+        part = load_totals(con, None) - live
+        self._closed = (today, part, signature)
+        return part
+
+
+class StatsWorker:
+    """
+    Фоновый поток запросов статистики для GUI.
+    Запросы выполняются на собственном соединении, результаты
+    складываются в очередь results и забираются главным потоком по таймеру окна.
+    Если данные в базе (PRAGMA data_version) и режим не изменились, запрос не выполняется.
+    Итоги закрытых дней кэшируются в QueryCache, массивы аналитики - в Analytics,
+    а тепловая карта считается, только пока открыто её окно (heatmap=True), и только при изменении данных,
+    поэтому переключение режима не перечитывает историю.
+    """
+    def __init__(self, connect):
+        self._connect = connect
+        self.analytics = analytics.Analytics()
+        self.cache = QueryCache()
+        self._jobs: queue.Queue = queue.Queue()
+        self.results: queue.Queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def request(self, mode: str, day: str | None, force: bool = False, heatmap: bool = False):
+        self._jobs.put((mode, day, force, heatmap))
+
+    def busy(self) -> bool:
+        return self._jobs.unfinished_tasks > 0 or not self.results.empty()
+
+    def close(self):
+        self._jobs.put(None)
+
+    def _run(self):
+        con = self._connect()
+        last_key = None
+        last_version = None
+        heatmap, heatmap_version = None, None
+        try:
+            while True:
+                job = self._jobs.get()
+                # Из накопившихся запросов важен только последний
+                while job is not None:
+                    try:
+                        newer = self._jobs.get_nowait()
+                    except queue.Empty:
+                        break
+                    self._jobs.task_done()
+                    job = newer
+                if job is None:
+                    self._jobs.task_done()
+                    return
+
+                mode, day, force, want_heatmap = job
+                try:
+                    version = con.execute("PRAGMA data_version").fetchone()[0]
+                    stale_heatmap = want_heatmap and version != heatmap_version
+                    if force or (mode, day) != last_key or version != last_version or stale_heatmap:
+                        with metrics.registry.time("gui.query"):
+                            result = self.cache.query(con, mode, day)
+                        if want_heatmap:
+                            if force or stale_heatmap:
+                                with metrics.registry.time("gui.analytics"):
+                                    heatmap = analytics.heatmap(self.analytics.cube(con))
+                                heatmap_version = version
+                            result.heatmap = heatmap
+                        self.results.put(("data", result))
+                        last_key, last_version = (mode, day), version
+                    else:
+                        self.results.put(("unchanged", None))
+                except sqlite3.Error as e:
+                    last_key = heatmap_version = None
+                    self.results.put(("error", e))
+                finally:
+                    self._jobs.task_done()
+        finally:
+            con.close()
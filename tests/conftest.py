@@ -0,0 +1,13 @@
+import pytest
+
+import db
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    """Пустой рабочий каталог и свои потоки записи и пулы чтения: track.db каждый раз новая"""
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(db, "_writers", {})
+    monkeypatch.setattr(db, "_pools", {})
+    monkeypatch.setattr(db, "_initialized", set())
+    return tmp_path
@@ -0,0 +1,62 @@
+import csv
+import threading
+
+import csv_export
+import db
+
+
+def connect(path):
+    con = db.connect(path)
+    db.ensure_schema(con)
+    return con
+
+
+def read_titles(path):
+    with open(path, encoding="utf-16", newline='') as f:
+        return sorted(row["title"] for row in csv.DictReader(f, delimiter='\t'))
+
+
+def track(con):
+    return con.execute("SELECT title, category, seconds, date FROM track ORDER BY title, date").fetchall()
+
+
+def test_delta_exports_only_changes_since_the_watermark(workdir):
+    source = connect("source.db")
+    with source:
+        source.executemany("INSERT INTO track (title, process_name, category, seconds, date) VALUES (?, ?, ?, ?, ?)",
+                           [("Code", "code", "Работа", 120, "2024-04-01"), ("Steam", "steam", "Игры", 60, "2024-04-01")])
+
+    csv_export.export_delta("source.db", "first.csv")
+    assert read_titles("first.csv") == ["Code", "Steam"]
+    csv_export.export_delta("source.db", "empty.csv")
+    assert read_titles("empty.csv") == []
+
+    with source:
+        source.execute("UPDATE track SET seconds = 90 WHERE title = 'Steam'")
+        source.execute("INSERT INTO track (title, process_name, category, seconds, date) "
+                       "VALUES ('Docs', 'docs', 'Учёба', 30, '2024-04-02')")
+    # Отменённая выгрузка отметку не сдвигает
+    cancel = threading.Event()
+    cancel.set()
+    assert csv_export.export_delta("source.db", "cancelled.csv", cancel=cancel) == "Экспорт отменён"
+    csv_export.export_delta("source.db", "second.csv")
+    assert read_titles("second.csv") == ["Docs", "Steam"]
+
+    for path in ("first.csv", "second.csv"):
+        csv_export.import_delta(path, "target.db")
+    assert track(connect("target.db")) == track(source)
+
+
+def test_legacy_timestamp_watermark_is_converted(workdir):
+    source = connect("source.db")
+    with source:
+        source.executemany("INSERT INTO track VALUES (?, ?, ?, ?, ?, ?)",
+                           [("Code", "code", "Работа", 120, "2024-04-01", "2024-04-01 10:00:00"),
+                            ("Steam", "steam", "Игры", 60, "2024-04-01", "2024-04-01 11:00:00")])
+        source.execute("CREATE TABLE export_watermarks(name TEXT PRIMARY KEY, watermark TIMESTAMP)")
+        source.execute("INSERT INTO export_watermarks VALUES ('default', '2024-04-01 11:00:00')")
+
+    # Граничная секунда прежней отметки выгружается ещё раз
+    csv_export.export_delta("source.db", "delta.csv")
+    assert read_titles("delta.csv") == ["Steam"]
+    assert source.execute("SELECT watermark FROM export_watermarks").fetchone() == (2,)
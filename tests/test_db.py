@@ -0,0 +1,69 @@
+import sqlite3
+
+import pytest
+
+import db
+
+
+def test_writer_reports_a_broken_database(workdir):
+    (workdir / "track.db").write_bytes(b"not a database" * 512)
+    with pytest.raises(sqlite3.DatabaseError):
+        db.Writer("track.db")
+
+
+def test_legacy_track_table_migrates_to_the_view(workdir):
+    con = db.connect(db.DB_PATH)
+    con.execute("""
+        CREATE TABLE track(title TEXT, process_name TEXT, category TEXT, seconds INTEGER, date DATE,
+                           last_updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP, PRIMARY KEY (title, date))
+        """)
+    rows = [("Code", "code", "Работа", 120, "2024-03-31", "2024-03-31 20:00:00"),
+            ("Steam", "steam", "Игры", 60, "2024-04-01", "2024-04-01 21:00:00")]
+    with con:
+        con.executemany("INSERT INTO track VALUES (?, ?, ?, ?, ?, ?)", rows)
+    db.ensure_schema(con)
+
+    assert con.execute("PRAGMA user_version").fetchone()[0] == db.SCHEMA_VERSION
+    assert con.execute("SELECT * FROM track ORDER BY date").fetchall() == rows
+    assert con.execute("SELECT type FROM sqlite_master WHERE name = 'track'").fetchone() == ("view",)
+
+
+def test_v1_database_migrates_and_the_view_writes_through(workdir):
+    con = db.connect(db.DB_PATH)
+    with con:
+        db.execute_script(con, db.TABLES + db.TRACK_VIEW)
+        con.executemany("INSERT INTO track VALUES (?, ?, ?, ?, ?, ?)", [
+            ("Code", "code", "Работа", 120, "2024-03-31", "2024-03-31 20:00:00"),
+            ("Steam", "steam", "Игры", 60, "2024-04-01", "2024-04-01 21:00:00"),
+        ])
+        con.execute("PRAGMA user_version = 1")
+    db.ensure_schema(con)
+
+    assert con.execute("PRAGMA user_version").fetchone()[0] == db.SCHEMA_VERSION
+    # Существующие строки пронумерованы по last_updated, счётчик продолжает с последнего номера
+    assert con.execute("SELECT change_seq FROM track_days ORDER BY date").fetchall() == [(1,), (2,)]
+    assert con.execute("SELECT value FROM change_counter").fetchone() == (2,)
+    assert con.execute("SELECT COUNT(*) FROM track_hours").fetchone() == (0,)
+    assert con.execute("SELECT COUNT(*) FROM archive_months").fetchone() == (0,)
+
+    def rows():
+        return con.execute("""
+            SELECT a.title, c.name, t.seconds, t.change_seq FROM track_days t
+            JOIN apps a ON a.id = t.app_id JOIN categories c ON c.id = t.category_id ORDER BY t.date
+        """).fetchall()
+
+    with con:
+        # Более старая строка не заменяет сохранённую
+        con.execute("INSERT INTO track VALUES ('Code', 'code', 'Работа', 5, '2024-03-31', '2024-03-01 00:00:00')")
+        con.execute("INSERT INTO track (title, process_name, category, seconds, date) "
+                    "VALUES ('Docs', 'docs', 'Учёба', 30, '2024-04-02')")
+        con.execute("UPDATE track SET seconds = 90, category = 'Отдых' WHERE title = 'Steam'")
+    assert rows() == [("Code", "Работа", 120, 1), ("Steam", "Отдых", 90, 4), ("Docs", "Учёба", 30, 3)]
+    assert dict(con.execute("""
+        SELECT c.name, r.seconds FROM rollup_category r JOIN categories c ON c.id = r.category_id
+    """).fetchall()) == {"Работа": 120, "Отдых": 90, "Учёба": 30}
+
+    with con:
+        con.execute("DELETE FROM track WHERE title = 'Docs'")
+    assert [title for title, *_ in rows()] == ["Code", "Steam"]
+    assert con.execute("SELECT SUM(seconds) FROM rollup_title").fetchone() == (210,)
@@ -0,0 +1,48 @@
+from datetime import datetime
+
+import main
+from categorizer import ProcessInfo, WindowInfo
+from idle import IdleSource
+from window_sources import FAKE_PID, ReplayWindowSource
+
+RETURN = 620.0
+
+
+class Away(IdleSource):
+    """Ввода нет с начала до RETURN, дальше пользователь за компьютером"""
+    def __init__(self, source: ReplayWindowSource):
+        self.source = source
+
+    def idle_seconds(self) -> float:
+        now = self.source.monotonic()
+        return now if now < RETURN else 0.0
+
+    def locked(self) -> bool:
+        return False
+
+
+class Observer:
+    def __init__(self, source: ReplayWindowSource):
+        self.source = source
+        self.focused = []
+
+    def credit(self, category, day, seconds):
+        pass
+
+    def focus(self, category):
+        self.focused.append((self.source.monotonic(), category and category.name))
+
+    def notify(self, kind, text):
+        pass
+
+
+def test_input_resumes_tracking_before_the_suspended_tick(workdir):
+    window = WindowInfo("Code", ProcessInfo(FAKE_PID, "code", "code.exe"))
+    source = ReplayWindowSource([(window, 900)], start=datetime(2024, 4, 1, 9, 0))
+    observer = Observer(source)
+    main.main(source, observer, Away(source))
+
+    idle_name = main.cfg["idle"]["category"]
+    resumed = [at for at, name in observer.focused if at >= RETURN and name != idle_name]
+    assert idle_name in [name for _, name in observer.focused]
+    assert resumed and resumed[0] - RETURN <= main.cfg["tracker"]["max_interval_seconds"]
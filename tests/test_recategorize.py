@@ -0,0 +1,54 @@
+import pytest
+
+import db
+import recategorize
+import retention
+from categorizer import RuleSet
+from idle import IDLE_PROCESS
+
+RULES = RuleSet({"process_rules": {"Telegram.exe": "Соцсети", "steam.exe": "Игры"}, "window_rules": {}})
+
+
+@pytest.fixture
+def con(workdir):
+    con = db.connect(db.DB_PATH)
+    db.ensure_schema(con)
+    yield con
+    con.close()
+
+
+def add(con, rows):
+    with con:
+        con.executemany("INSERT INTO track (title, process_name, category, seconds, date) VALUES (?, ?, ?, ?, ?)",
+                        rows)
+
+
+def all_time(con, table):
+    return dict(con.execute(f"""
+        SELECT c.name, t.seconds FROM {table} t JOIN categories c ON c.id = t.category_id
+    """).fetchall())
+
+
+def test_idle_time_keeps_its_category(con):
+    add(con, [("Простой", IDLE_PROCESS, "Простой", 720, "2024-04-01"),
+              ("Telegram", "Telegram", "Другое", 300, "2024-04-01")])
+    moves, _ = recategorize.recategorize(con, RULES)
+    assert moves == [("Другое", "Соцсети", 300)]
+    assert dict(con.execute("SELECT title, category FROM track").fetchall()) == \
+        {"Простой": "Простой", "Telegram": "Соцсети"}
+
+
+def test_archive_totals_move_with_rollups(con):
+    add(con, [("Telegram", "Telegram", "Другое", 200, "2024-01-10"),
+              ("Discord", "Discord", "Другое", 100, "2024-01-10"),
+              ("Steam", "steam", "Другое", 50, "2024-01-11"),
+              ("Telegram", "Telegram", "Другое", 300, "2024-04-01")])
+    retention.archive_month(con, 202401, None)
+    recategorize.recategorize(con, RULES)
+
+    assert all_time(con, "rollup_category") == {"Соцсети": 300}
+    assert all_time(con, "archive_category") == {"Соцсети": 200, "Другое": 100, "Игры": 50}
+    assert dict(con.execute("""
+        SELECT a.title, c.name FROM archive_title t
+        JOIN apps a ON a.id = t.app_id JOIN categories c ON c.id = t.category_id
+    """).fetchall()) == {"Telegram": "Соцсети", "Discord": "Другое", "Steam": "Игры"}
@@ -0,0 +1,43 @@
+from datetime import date, datetime
+
+import pytest
+
+import db
+import main
+import retention
+from window_sources import ReplayWindowSource, synthetic_frames
+
+
+def totals(con):
+    live = con.execute("SELECT TOTAL(seconds) FROM track_days").fetchone()[0]
+    archived = con.execute("SELECT TOTAL(seconds) FROM archive_category").fetchone()[0]
+    return live, archived
+
+
+def test_replay_across_month_boundary_keeps_totals(workdir, monkeypatch):
+    monkeypatch.setitem(main.cfg, "retention", {"keep_months": 1, "archive_dir": "archive", "interval_hours": 24})
+    # Около трёх суток с 31 марта: март выносится, пока трекер пишет апрель
+    frames = list(synthetic_frames(400, seed=1, mean_seconds=600))
+    main.main(ReplayWindowSource(frames, start=datetime(2024, 3, 31, 9, 0)))
+
+    con = db.connect(db.DB_PATH)
+    assert con.execute("SELECT month FROM archive_months").fetchall() == [(202403,)]
+    assert sum(totals(con)) == sum(seconds for _, seconds in frames)
+
+
+def test_yesterday_and_current_month_stay(workdir):
+    con = db.connect(db.DB_PATH)
+    db.ensure_schema(con)
+    with con:
+        con.executemany("INSERT INTO track (title, process_name, category, seconds, date) VALUES (?, ?, ?, ?, ?)",
+                        [("A", "a", "Работа", 60, "2024-03-31"), ("A", "a", "Работа", 30, "2024-04-01")])
+    assert retention.apply_retention(con, 1, None, today=date(2024, 4, 1)) == []
+    assert retention.apply_retention(con, 1, None, today=date(2024, 4, 2)) == [202403]
+    assert totals(con) == (30, 60)
+
+
+def test_keep_months_must_be_positive(workdir):
+    con = db.connect(db.DB_PATH)
+    db.ensure_schema(con)
+    with pytest.raises(ValueError):
+        retention.apply_retention(con, 0, None, today=date(2024, 4, 2))
@@ -0,0 +1,76 @@
+import pytest
+
+from scheduler import TimerWheel
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return Clock()
+
+
+def run(wheel: TimerWheel, clock: Clock, until: float):
+    """Крутит колесо так же, как цикл трекера: спит до next_deadline() и выполняет наступившее"""
+    while (deadline := wheel.next_deadline()) is not None and deadline <= until:
+        clock.now = max(clock.now, deadline)
+        wheel.advance()
+    clock.now = until
+    wheel.advance()
+
+
+def test_timers_on_upper_levels_cascade_down_and_fire_on_time(clock):
+    wheel = TimerWheel(resolution=0.05, clock=clock)
+    fired = []
+    # 0.5 с - уровень 0, 20 с и 5000 с - ячейки уровней 1 и 2, раскладываемые при наступлении
+    for delay in (5000, 0.5, 20, 20.3):
+        wheel.schedule(delay, lambda d=delay: fired.append((d, clock.now)))
+    run(wheel, clock, 6000)
+    assert [delay for delay, _ in fired] == [0.5, 20, 20.3, 5000]
+    for delay, at in fired:
+        assert delay <= at <= delay + wheel.resolution
+    assert len(wheel) == 0 and wheel.next_deadline() is None
+
+
+def test_cancel_removes_cascaded_and_keyed_timers(clock):
+    wheel = TimerWheel(resolution=0.05, clock=clock)
+    fired = []
+    far = wheel.schedule(100, fired.append, "far")
+    wheel.schedule(30, fired.append, "keyed", key="job")
+    wheel.schedule(40, fired.append, "near")
+    # Тот же key с более поздним сроком не заменяет ждущий таймер, с более ранним - заменяет
+    wheel.schedule(50, fired.append, "later", key="job")
+    wheel.schedule(10, fired.append, "earlier", key="job")
+    assert len(wheel) == 3
+
+    run(wheel, clock, 35)
+    wheel.cancel(far)
+    wheel.cancel("job")
+    assert not far.pending and len(wheel) == 1
+    run(wheel, clock, 200)
+    assert fired == ["earlier", "near"]
+
+
+def test_jitter_only_delays_and_does_not_drift(clock):
+    wheel = TimerWheel(resolution=0.05, clock=clock, rng=lambda: 0.5)
+    fired = []
+    wheel.schedule(10, lambda: fired.append(clock.now), interval=10, jitter=2)
+    run(wheel, clock, 45)
+    # Каждый срок сдвинут вперёд на rng() * jitter, а период отсчитывается от номинального срока
+    assert fired == pytest.approx([11, 21, 31, 41])
+
+
+def test_missed_periods_are_not_replayed(clock):
+    wheel = TimerWheel(resolution=0.05, clock=clock)
+    fired = []
+    wheel.schedule(1, lambda: fired.append(clock.now), interval=1)
+    clock.now = 10.5
+    wheel.advance()
+    run(wheel, clock, 12.5)
+    assert fired == pytest.approx([10.5, 11, 12])
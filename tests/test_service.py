@@ -0,0 +1,39 @@
+import asyncio
+import json
+
+import main
+import service
+
+
+class Writer:
+    """Запись ответов вместо сокета"""
+    def __init__(self):
+        self.lines = []
+        self.closed = False
+
+    def write(self, data: bytes):
+        self.lines += [json.loads(line) for line in data.splitlines()]
+
+    async def drain(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+
+def test_bad_params_get_an_error_reply(workdir):
+    tracker = service.TrackerService(main.cfg)
+    tracker.totals.add("Code", "Работа", "2024-04-01", 30)
+    writer = Writer()
+
+    async def talk():
+        reader = asyncio.StreamReader()
+        for request in ({"id": 1, "method": "top", "limit": "x"}, {"id": 2, "method": "nope"},
+                        {"id": 3, "method": "top", "limit": 1}):
+            reader.feed_data(service.encode(request))
+        reader.feed_eof()
+        await tracker._client(reader, writer)
+
+    asyncio.run(talk())
+    assert [(r["id"], "error" in r) for r in writer.lines] == [(1, True), (2, True), (3, False)]
+    assert writer.lines[2]["result"] == [["Code", "Работа", 30]]
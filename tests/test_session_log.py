@@ -0,0 +1,83 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+import db
+import main
+from categorizer import Category
+
+DAY = "2024-04-01"
+START = datetime(2024, 4, 1, 10, 0)
+
+
+@pytest.fixture
+def log(workdir):
+    return main.SessionLog(db.writer(), flush_interval=30, max_entries=1000)
+
+
+def day_rows(con):
+    return con.execute("""
+        SELECT a.title, c.name, t.seconds FROM track_days t
+        JOIN apps a ON a.id = t.app_id JOIN categories c ON c.id = t.category_id
+    """).fetchall()
+
+
+def test_day_takes_the_category_of_the_latest_span(log):
+    work, games = Category("Работа", "PyCharm", "pycharm64"), Category("Игры", "PyCharm", "pycharm64")
+    log.add(work, DAY, 60, START + timedelta(seconds=60))
+    log.add(games, DAY, 30, START + timedelta(seconds=90))
+    log.flush(wait=True)
+    con = db.connect(db.DB_PATH)
+    assert day_rows(con) == [("PyCharm", "Игры", 90)]
+    assert con.execute("SELECT seconds FROM rollup_category").fetchall() == [(90,)]
+
+    log.add(work, DAY, 10, START + timedelta(seconds=100))
+    log.flush(wait=True)
+    assert day_rows(con) == [("PyCharm", "Работа", 100)]
+    assert con.execute("""
+        SELECT c.name, r.seconds FROM rollup_day_category r JOIN categories c ON c.id = r.category_id
+    """).fetchall() == [("Работа", 100)]
+
+
+def add_ticks(log, category, day, start, step, count):
+    end = start
+    for _ in range(count):
+        end += timedelta(seconds=step)
+        log.add(category, day, step, end)
+    return end
+
+
+def test_fractional_seconds_carry_over_and_settle(log):
+    code, term = Category("Работа", "Code", "code"), Category("Работа", "Terminal", "term")
+    # 25 порций по 0.1 с: 2 целые секунды, 0.5 ждут следующего отрезка того же окна
+    end = add_ticks(log, code, DAY, START, 0.1, 25)
+    end = add_ticks(log, term, DAY, end, 0.4, 1)
+    end = add_ticks(log, code, DAY, end, 0.3, 1)
+    log.flush(wait=True)
+    con = db.connect(db.DB_PATH)
+    assert day_rows(con) == [("Code", "Работа", 2)]
+
+    # Смена дня округляет остатки в последних отрезках: 0.8 у Code, 0.4 у Terminal теряется
+    add_ticks(log, code, "2024-04-02", datetime(2024, 4, 2, 0, 0), 1, 1)
+    log.flush(wait=True)
+    assert con.execute("""
+        SELECT a.title, t.date, t.seconds FROM track_days t JOIN apps a ON a.id = t.app_id ORDER BY 2, 1
+    """).fetchall() == [("Code", 20240401, 3), ("Code", 20240402, 1)]
+
+    add_ticks(log, code, "2024-04-02", datetime(2024, 4, 2, 0, 0, 1), 0.7, 1)
+    log.settle()
+    log.flush(wait=True)
+    assert con.execute("SELECT seconds FROM track_days WHERE date = 20240402").fetchall() == [(2,)]
+
+
+def test_open_span_is_compacted_as_it_grows(log):
+    code = Category("Работа", "Code", "code")
+    end = add_ticks(log, code, DAY, START, 1, 40)
+    log.flush(wait=True)
+    add_ticks(log, code, DAY, end, 1, 25)
+    log.flush(wait=True)
+
+    con = db.connect(db.DB_PATH)
+    assert con.execute("SELECT seconds, compacted FROM sessions").fetchall() == [(65, 65)]
+    assert day_rows(con) == [("Code", "Работа", 65)]
+    assert con.execute("SELECT TOTAL(seconds) FROM track_hours").fetchone()[0] == 65
@@ -0,0 +1,56 @@
+import pytest
+
+import db
+import stats
+
+DAY, TODAY = "2024-04-01", "2024-04-02"
+
+
+@pytest.fixture
+def con(workdir):
+    con = db.connect(db.DB_PATH)
+    db.ensure_schema(con)
+    with con:
+        con.executemany("INSERT INTO track (title, process_name, category, seconds, date) VALUES (?, ?, ?, ?, ?)",
+                        [("Code", "code", "Работа", 100, DAY), ("Terminal", "term", "Работа", 50, DAY),
+                         ("Code", "code", "Работа", 10, TODAY)])
+    yield con
+    con.close()
+
+
+def titles(result):
+    return {title: seconds for title, _, seconds in result.table_rows}
+
+
+def test_title_moves_within_a_category_refresh_the_cache(con):
+    cache = stats.QueryCache()
+    assert titles(cache.query(con, stats.MODE_YESTERDAY, DAY, TODAY)) == {"Code": 100, "Terminal": 50}
+    assert titles(cache.query(con, stats.MODE_ALL, None, TODAY)) == {"Code": 110, "Terminal": 50}
+
+    # Итоги по категориям те же, меняется только разбивка по приложениям
+    with con:
+        con.execute("UPDATE track SET seconds = 60 WHERE title = 'Code' AND date = ?", (DAY,))
+        con.execute("UPDATE track SET seconds = 90 WHERE title = 'Terminal' AND date = ?", (DAY,))
+
+    assert titles(cache.query(con, stats.MODE_YESTERDAY, DAY, TODAY)) == {"Code": 60, "Terminal": 90}
+    assert titles(cache.query(con, stats.MODE_ALL, None, TODAY)) == {"Code": 70, "Terminal": 90}
+
+
+def test_heatmap_is_computed_only_on_request(con, monkeypatch):
+    calls = []
+    heatmap = stats.analytics.heatmap
+    monkeypatch.setattr(stats.analytics, "heatmap", lambda cube: calls.append(1) or heatmap(cube))
+    worker = stats.StatsWorker(lambda: db.connect(db.DB_PATH))
+    try:
+        worker.request(stats.MODE_ALL, None)
+        kind, result = worker.results.get(timeout=5)
+        assert kind == "data" and result.heatmap is None and not calls
+
+        # Открытие окна карты при неизменных данных всё равно даёт карту, повтор - уже нет
+        worker.request(stats.MODE_ALL, None, heatmap=True)
+        kind, result = worker.results.get(timeout=5)
+        assert kind == "data" and result.heatmap.shape == (7, 24) and len(calls) == 1
+        worker.request(stats.MODE_ALL, None, heatmap=True)
+        assert worker.results.get(timeout=5) == ("unchanged", None) and len(calls) == 1
+    finally:
+        worker.close()
@@ -0,0 +1,278 @@
+import json
+import random
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Iterable, Iterator
+
+import categorizer
+from categorizer import WindowInfo, ProcessInfo, try_get_active_window_properties
+
+# Константы WinEvent API
+EVENT_SYSTEM_FOREGROUND = 0x0003
+EVENT_OBJECT_NAMECHANGE = 0x800C
+WINEVENT_OUTOFCONTEXT = 0x0000
+WINEVENT_SKIPOWNPROCESS = 0x0002
+OBJID_WINDOW = 0
+WM_QUIT = 0x0012
+# pid больше PID_MAX_LIMIT Linux и Windows не бывает: правило ограничений не завершит настоящий процесс
+FAKE_PID = (1 << 22) + 1000
+
+
+class WindowSource:
+    """
+    Источник активного окна для цикла трекера.
+    poll() возвращает текущее окно, wait() ждёт до timeout секунд
+    и возвращает True, если фокус сменился раньше.
+    Часы источника используются трекером для учёта времени.
+    kills - можно ли завершать процессы окон этого источника по правилам ограничений.
+    """
+    exhausted = False
+    kills = True
+
+    def poll(self) -> WindowInfo | None:
+        raise NotImplementedError
+
+    def wait(self, timeout: float) -> bool:
+        time.sleep(timeout)
+        return False
+
+    def monotonic(self) -> float:
+        return time.monotonic()
+
+    def now(self) -> datetime:
+        return datetime.now()
+
+    def close(self):
+        pass
+
+
+class PollingWindowSource(WindowSource):
+    """Опрос win32gui на каждом тике"""
+    def __init__(self):
+        if categorizer.win32gui is None:
+            raise RuntimeError("Polling window source requires pywin32")
+
+    def poll(self) -> WindowInfo | None:
+        return try_get_active_window_properties()
+
+
+class EventWindowSource(WindowSource):
+    """
+    Источник на уведомлениях SetWinEventHook о смене активного окна и его заголовка.
+    Пока фокус не меняется, poll() возвращает закэшированное окно без обращений к системе.
+    """
+    def __init__(self):
+        if categorizer.win32gui is None:
+            raise RuntimeError("Event window source requires pywin32")
+        self._window: WindowInfo | None = None
+        self._dirty = True
+        self._changed = threading.Event()
+        self._ready = threading.Event()
+        self._thread_id = None
+        self._error: Exception | None = None
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        self._ready.wait()
+        if self._error:
+            raise self._error
+
+    def _run(self):
+        try:
+            self._hook_loop()
+        except Exception as e:
+            self._error = e
+        finally:
+            self._ready.set()
+
+    def _hook_loop(self):
+        # Хуки должны жить в потоке с циклом сообщений
+        import ctypes
+        from ctypes import wintypes
+
+        user32 = ctypes.windll.user32
+        kernel32 = ctypes.windll.kernel32
+        user32.SetWinEventHook.restype = wintypes.HANDLE
+        user32.GetForegroundWindow.restype = wintypes.HWND
+        proc_type = ctypes.WINFUNCTYPE(None, wintypes.HANDLE, wintypes.DWORD, wintypes.HWND,
+                                       wintypes.LONG, wintypes.LONG, wintypes.DWORD, wintypes.DWORD)
+
+        def callback(hook, event, hwnd, id_object, id_child, thread, timestamp):
+            if event == EVENT_OBJECT_NAMECHANGE and (
+                    id_object != OBJID_WINDOW or hwnd != user32.GetForegroundWindow()):
+                return
+            self._dirty = True
+            self._changed.set()
+
+        # Ссылка на callback должна жить, пока установлены хуки
+        self._callback = proc_type(callback)
+        flags = WINEVENT_OUTOFCONTEXT | WINEVENT_SKIPOWNPROCESS
+        hooks = [user32.SetWinEventHook(event, event, 0, self._callback, 0, 0, flags)
+                 for event in (EVENT_SYSTEM_FOREGROUND, EVENT_OBJECT_NAMECHANGE)]
+        if not all(hooks):
+            raise OSError("SetWinEventHook failed")
+
+        self._thread_id = kernel32.GetCurrentThreadId()
+        self._ready.set()
+        msg = wintypes.MSG()
+        while user32.GetMessageW(ctypes.byref(msg), 0, 0, 0) > 0:
+            user32.TranslateMessage(ctypes.byref(msg))
+            user32.DispatchMessageW(ctypes.byref(msg))
+        for hook in hooks:
+            user32.UnhookWinEvent(hook)
+
+    def poll(self) -> WindowInfo | None:
+        if self._dirty or self._window is None:
+            self._dirty = False
+            self._window = try_get_active_window_properties()
+        return self._window
+
+    def wait(self, timeout: float) -> bool:
+        changed = self._changed.wait(timeout)
+        self._changed.clear()
+        return changed
+
+    def close(self):
+        if self._thread_id:
+            import ctypes
+            ctypes.windll.user32.PostThreadMessageW(self._thread_id, WM_QUIT, 0, 0)
+            self._thread_id = None
+
+
+class ReplayWindowSource(WindowSource):
+    """
+    Детерминированное воспроизведение последовательности (окно, длительность).
+    Время виртуальное: wait() не спит, а сдвигает часы источника,
+    поэтому цикл трекера можно прогонять без рабочего стола и быстрее реального времени.
+    С realtime=True источник действительно ждёт, деля паузы на speed.
+    pid в записи мог достаться другому процессу, поэтому ограничения ничего не завершают.
+    """
+    kills = False
+
+    def __init__(self, frames: Iterable[tuple[WindowInfo | None, float]],
+                 start: datetime = datetime(2024, 1, 1, 9, 0),
+                 realtime: bool = False, speed: float = 1.0):
+        self._frames: Iterator[tuple[WindowInfo | None, float]] = iter(frames)
+        self._start = start
+        self._clock = 0.0
+        self.realtime = realtime
+        self.speed = speed
+        self._current: WindowInfo | None = None
+        self._remaining = 0.0
+        self._advance()
+
+    def _advance(self) -> bool:
+        for window, seconds in self._frames:
+            if seconds > 0:
+                self._current, self._remaining = window, float(seconds)
+                return True
+        self._current, self._remaining = None, 0.0
+        self.exhausted = True
+        return False
+
+    def poll(self) -> WindowInfo | None:
+        return self._current
+
+    def wait(self, timeout: float) -> bool:
+        if self.exhausted:
+            self._clock += timeout
+            return False
+        step = min(timeout, self._remaining)
+        if self.realtime:
+            time.sleep(step / self.speed)
+        self._clock += step
+        self._remaining -= step
+        if self._remaining > 0:
+            return False
+        return self._advance()
+
+    def monotonic(self) -> float:
+        return self._clock
+
+    def now(self) -> datetime:
+        return self._start + timedelta(seconds=self._clock)
+
+    @classmethod
+    def from_file(cls, path: str, **kwargs) -> "ReplayWindowSource":
+        return cls(read_frames(path), **kwargs)
+
+
+def read_frames(path: str) -> Iterator[tuple[WindowInfo | None, float]]:
+    """
+    Читает записанную последовательность в формате JSON Lines:
+    {"title": ..., "process_name": ..., "pid": ..., "exe_path": ..., "seconds": ...}
+    Строка без title означает отсутствие активного окна, без pid - вымышленный FAKE_PID.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            frame = json.loads(line)
+            window = None
+            if "title" in frame:
+                window = WindowInfo(frame["title"], ProcessInfo(
+                    frame.get("pid", FAKE_PID),
+                    frame.get("process_name", "unk"),
+                    frame.get("exe_path", "unk")
+                ))
+            yield window, frame["seconds"]
+
+
+def write_frames(path: str, frames: Iterable[tuple[WindowInfo | None, float]]):
+    with open(path, "w", encoding="utf-8") as f:
+        for window, seconds in frames:
+            frame = {"seconds": seconds}
+            if window:
+                frame.update(title=window.title, process_name=window.info.process_name,
+                             pid=window.info.pid, exe_path=window.info.exe_path)
+            f.write(json.dumps(frame, ensure_ascii=False) + "\n")
+
+
+SYNTHETIC_APPS = [
+    ("YouTube - Mozilla Firefox", "firefox.exe"),
+    ("main.py - PyCharm", "pycharm64.exe"),
+    ("Telegram", "Telegram.exe"),
+    ("Discord", "Discord.exe"),
+    ("Jira - Google Chrome", "chrome.exe"),
+    ("GitHub - Google Chrome", "chrome.exe"),
+    ("Steam", "steam.exe"),
+    ("Проводник", "explorer.exe"),
+    ("Диспетчер задач", "Taskmgr.exe"),
+    ("Документ1 - WPS Office", "wps.exe"),
+]
+
+
+def synthetic_frames(count: int, apps: list[tuple[str, str]] = None, seed: int = 0,
+                     mean_seconds: float = 60, skew: float = 1.2
+                     ) -> Iterator[tuple[WindowInfo | None, float]]:
+    """
+    Генерирует count переключений окон. Популярность приложений
+    распределена по Ципфу с параметром skew, длительность - экспоненциально.
+    """
+    rng = random.Random(seed)
+    apps = apps or SYNTHETIC_APPS
+    weights = [1 / (rank + 1) ** skew for rank in range(len(apps))]
+    for _ in range(count):
+        index = rng.choices(range(len(apps)), weights)[0]
+        title, process_name = apps[index]
+        window = WindowInfo(title, ProcessInfo(FAKE_PID + index, process_name, f"C:\\Apps\\{process_name}"))
+        yield window, max(1, round(rng.expovariate(1 / mean_seconds)))
+
+
+def create_source(cfg: dict) -> WindowSource:
+    """Создаёт источник по секции window_source конфига"""
+    source_cfg = cfg.get("window_source", {})
+    backend = source_cfg.get("backend", "polling")
+
+    if backend == "replay":
+        return ReplayWindowSource.from_file(
+            source_cfg["replay_file"],
+            realtime=source_cfg.get("realtime", True),
+            speed=source_cfg.get("speed", 1.0)
+        )
+    if backend == "events":
+        try:
+            return EventWindowSource()
+        except (OSError, RuntimeError, AttributeError) as e:
+            print(f"Event window source unavailable, falling back to polling: {e}")
+    return PollingWindowSource()